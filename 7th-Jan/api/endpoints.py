@@ -1,57 +1,75 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from typing import List
 from models.schemas import QueryWithVector, Document, SearchResult, HealthResponse
-from services.search import search_service
-from services.embedding import embedding_service
+from services.providers import get_embedding_service, get_search_service, get_warmup_state
+from services.search import SearchService
+from services.warmup import WarmupState
 
 # Create router - THIS LINE WAS MISSING
 router = APIRouter()
 
 @router.post("/search", response_model=List[SearchResult])
-async def search_documents(query_data: QueryWithVector):
+async def search_documents(query_data: QueryWithVector,
+                           search_service: SearchService = Depends(get_search_service)):
     """Search documents"""
     try:
-        results = search_service.search(query_data)
+        results = await search_service.asearch(query_data)
         return results
+    except ValueError as e:
+        # Malformed metadata filter or custom vectors
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/add-documents")
-async def add_documents(documents: List[Document]):
+async def add_documents(documents: List[Document],
+                        search_service: SearchService = Depends(get_search_service)):
     """Add documents"""
     try:
         # Extract documents and metadata
         doc_texts = [doc.content for doc in documents]
         metadata_list = [doc.metadata for doc in documents]
         
-        result = search_service.add_documents(doc_texts, metadata_list)
+        result = await search_service.aadd_documents(doc_texts, metadata_list)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/ingest")
+async def ingest_documents(request: Request,
+                           search_service: SearchService = Depends(get_search_service)):
+    """Bulk-add documents streamed as NDJSON: one {"content": ..., "metadata": {...}} per line"""
+    try:
+        return await search_service.aingest_ndjson(request.stream())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/store-info")
-async def get_store_info():
+async def get_store_info(search_service: SearchService = Depends(get_search_service)):
     """Get vector store info"""
     try:
-        info = search_service.get_store_info()
+        info = await search_service.run_blocking(search_service.get_store_info)
         return info
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/clear-store")
-async def clear_store():
+async def clear_store(search_service: SearchService = Depends(get_search_service)):
     """Clear all documents"""
     try:
-        result = search_service.clear_store()
+        result = await search_service.run_blocking(search_service.clear_store)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/health")
-async def health_check():
+async def health_check(search_service: SearchService = Depends(get_search_service),
+                       embedding_service=Depends(get_embedding_service),
+                       warmup: WarmupState = Depends(get_warmup_state)):
     """Health check"""
-    ollama_available = embedding_service.test_connection()
-    store_info = search_service.get_store_info()
+    ollama_available = await embedding_service.atest_connection()
+    store_info = await search_service.run_blocking(search_service.get_store_info)
     
     return HealthResponse(
         status="healthy" if ollama_available else "degraded",
@@ -60,6 +78,12 @@ async def health_check():
         details={
             "ollama_model": store_info['ollama_model'],
             "total_documents": store_info['total_documents'],
-            "embedding_dimension": store_info['embedding_dimension']
+            "embedding_dimension": store_info['embedding_dimension'],
+            "warmup": warmup.status
         }
-    )
\ No newline at end of file
+    )
+
+@router.get("/ready")
+async def readiness(warmup: WarmupState = Depends(get_warmup_state)):
+    """Readiness probe: 200 once the startup warm-up has completed, 503 until then"""
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.to_dict())
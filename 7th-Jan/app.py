@@ -1,23 +1,68 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 import ollama
-import chromadb
-from chromadb.config import Settings
-import uuid
+import threading
 import os
 import time
-
-app = FastAPI(title="Ollama Vector Search")
-
-# Setup ChromaDB
-os.makedirs("./chroma_db", exist_ok=True)
-client = chromadb.PersistentClient(path="./chroma_db")
-collection = client.get_or_create_collection(name="documents")
+from services.vector_store import make_document_id
+from services.warmup import WarmupState
 
 # Use SMALLER model
 EMBEDDING_MODEL = "all-minilm"  # Changed from nomic-embed-text
 
+# ChromaDB is opened on first use (importing chromadb alone takes about a second)
+_collection = None
+_collection_lock = threading.Lock()
+_document_count = 0  # Counted once when the collection opens, then kept up to date locally
+
+def get_collection():
+    global _collection, _document_count
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                import chromadb
+                os.makedirs("./chroma_db", exist_ok=True)
+                client = chromadb.PersistentClient(path="./chroma_db")
+                collection = client.get_or_create_collection(name="documents")
+                _document_count = collection.count()
+                _collection = collection
+    return _collection
+
+def document_count() -> int:
+    get_collection()
+    return _document_count
+
+warmup = WarmupState()
+
+def warm_up_collection():
+    """Open the collection and query it once so its HNSW index is loaded"""
+    collection = get_collection()
+    count = collection.count()
+    if count:
+        sample = collection.peek(limit=1)
+        collection.query(query_embeddings=sample['embeddings'][:1], n_results=1, include=["distances"])
+    return {"documents": count}
+
+def warm_up_model():
+    """Dummy embed so Ollama loads the model now rather than on the first request"""
+    embedding = ollama.embeddings(model=EMBEDDING_MODEL, prompt="warm-up").get("embedding", [])
+    if not embedding:
+        raise RuntimeError(f"Ollama returned no embedding for model {EMBEDDING_MODEL}")
+    return {"model": EMBEDDING_MODEL, "dimension": len(embedding)}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Without Ollama the endpoints fall back to dummy embeddings, so a missing model
+    # leaves the server degraded but ready, and it stops retrying after a few tries
+    warmup.start([("vector_store", warm_up_collection), ("embedding_model", warm_up_model)],
+                 retry_seconds=2, max_attempts=3, optional=("embedding_model",))
+    yield
+
+app = FastAPI(title="Ollama Vector Search", lifespan=lifespan)
+
 # Models
 class QueryRequest(BaseModel):
     query: str
@@ -59,14 +104,6 @@ def get_embedding_safe(text: str):
         # Return simple fallback embedding
         return [0.1] * 384
 
-# Test Ollama connection on startup
-print("🔍 Testing Ollama connection...")
-try:
-    ollama.list()
-    print("✅ Ollama is connected")
-except:
-    print("⚠️ Ollama not connected, using fallback mode")
-
 # API Endpoints
 @app.get("/")
 def home():
@@ -76,6 +113,11 @@ def home():
         "status": "running"
     }
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the startup warm-up has completed (degraded without Ollama), 503 until then"""
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.to_dict())
+
 @app.get("/health")
 def health():
     try:
@@ -84,39 +126,45 @@ def health():
             "status": "healthy",
             "ollama": "connected",
             "model": EMBEDDING_MODEL,
-            "documents": collection.count()
+            "documents": document_count()
         }
     except:
         return {
             "status": "degraded",
             "ollama": "not_connected",
-            "documents": collection.count(),
+            "documents": document_count(),
             "message": "Using fallback embeddings"
         }
 
 @app.post("/add")
 def add_document(doc: Document):
-    embedding = get_embedding_safe(doc.content)
+    global _document_count
+    # Same content and metadata, same id: re-adding a document is a no-op
+    doc_id = make_document_id(doc.content, doc.metadata)
+    if get_collection().get(ids=[doc_id], include=[])['ids']:
+        return {"message": "Document already stored", "id": doc_id, "total": document_count()}
     
-    doc_id = str(uuid.uuid4())
-    collection.add(
+    embedding = get_embedding_safe(doc.content)
+    get_collection().upsert(
         ids=[doc_id],
         embeddings=[embedding],
         documents=[doc.content],
-        metadatas=[doc.metadata]
+        metadatas=[doc.metadata or None]  # Chroma rejects empty metadata dicts
     )
+    with _collection_lock:
+        _document_count += 1
     
     return {
         "message": "Document added",
         "id": doc_id,
-        "total": collection.count()
+        "total": _document_count
     }
 
 @app.post("/search")
 def search(request: QueryRequest):
     query_embedding = get_embedding_safe(request.query)
     
-    results = collection.query(
+    results = get_collection().query(
         query_embeddings=[query_embedding],
         n_results=request.top_k
     )
@@ -140,19 +188,26 @@ def search(request: QueryRequest):
 @app.post("/quick-test")
 def quick_test():
     """Quick test with pre-defined data"""
+    global _document_count
     test_text = "Cascade policies example"
     embedding = get_embedding_safe(test_text)
     
-    # Add test document
-    collection.add(
-        ids=["test_123"],
+    # Add test document (upsert under its content id, so repeat calls store it once)
+    test_metadata = {"test": True}
+    doc_id = make_document_id(test_text, test_metadata)
+    is_new = not get_collection().get(ids=[doc_id], include=[])['ids']
+    get_collection().upsert(
+        ids=[doc_id],
         embeddings=[embedding],
         documents=[test_text],
-        metadatas=[{"test": True}]
+        metadatas=[test_metadata]
     )
+    if is_new:
+        with _collection_lock:
+            _document_count += 1
     
     # Search for it
-    results = collection.query(
+    results = get_collection().query(
         query_embeddings=[embedding],
         n_results=1
     )
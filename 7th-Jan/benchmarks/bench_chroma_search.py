@@ -0,0 +1,87 @@
+"""
+Search latency of ChromaVectorStore at realistic collection sizes: the old
+path (query, then a full collection.get() per result to look the document up
+by position) vs. the current single query that returns ids, documents,
+metadata and distances together.
+
+The store is built in a temporary directory with random unit vectors, so no
+Ollama server is needed.
+
+Usage (from the 7th-Jan directory):
+    python benchmarks/bench_chroma_search.py
+    python benchmarks/bench_chroma_search.py --docs 100000 --queries 200 --legacy-queries 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_search(store, query, top_k):
+    """The pre-fix lookup: positional results resolved with one full scan each"""
+    results = store.collection.query(query_embeddings=[query], n_results=top_k,
+                                     include=["documents", "metadatas", "distances"])
+    found = []
+    for i, distance in enumerate(results["distances"][0]):
+        all_docs = store.collection.get()
+        found.append((all_docs["documents"][i], all_docs["metadatas"][i], 1 - distance / 2))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--legacy-queries", type=int, default=3, help="the old path is O(N) per result")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_chroma_")
+    os.environ["CHROMA_DB_PATH"] = workdir
+    os.environ["EMBEDDING_DIMENSION"] = str(args.dimension)
+    from services.vector_store import ChromaVectorStore
+
+    store = ChromaVectorStore()
+    rng = np.random.default_rng(0)
+    batch = store.client.get_max_batch_size()
+
+    t0 = time.perf_counter()
+    for start in range(0, args.docs, batch):
+        count = min(batch, args.docs - start)
+        vectors = rng.standard_normal((count, args.dimension), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store.add_documents(
+            [f"document {start + i}" for i in range(count)],
+            vectors,
+            [{"n": start + i} for i in range(count)]
+        )
+    print(f"built {store.document_count} docs (dim {args.dimension}) in {time.perf_counter() - t0:.1f}s")
+
+    queries = rng.standard_normal((max(args.queries, args.legacy_queries), args.dimension), dtype=np.float32)
+    print(f"{'path':<24} {'queries':>8} {'mean ms':>10} {'p99 ms':>10}")
+
+    for label, run, n in [
+        ("legacy (get per result)", lambda q: legacy_search(store, q.tolist(), args.top_k), args.legacy_queries),
+        ("single query", lambda q: store.search(q.tolist(), args.top_k), args.queries),
+    ]:
+        latencies = []
+        for query in queries[:n]:
+            t0 = time.perf_counter()
+            results = run(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            assert len(results) == args.top_k
+        print(f"{label:<24} {n:>8} {np.mean(latencies):>10.2f} {np.percentile(latencies, 99):>10.2f}")
+
+    # The returned documents are the ones the ids point at
+    hit = store.search(queries[0].tolist(), args.top_k)[0]
+    assert store.get_by_ids([hit["id"]])[0]["content"] == hit["content"]
+
+
+if __name__ == "__main__":
+    main()
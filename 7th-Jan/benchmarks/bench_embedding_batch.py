@@ -0,0 +1,103 @@
+"""
+Embedding throughput against a local stub Ollama server that simulates model
+latency: the old one-request-per-text loop vs. batched /api/embed requests
+with a bounded number in flight.
+
+The stub charges a fixed per-request overhead plus a per-text cost, and
+serves requests concurrently, like an Ollama server with parallel slots.
+
+Usage (from the 7th-Jan directory):
+    python benchmarks/bench_embedding_batch.py
+    python benchmarks/bench_embedding_batch.py --texts 5000 --request-ms 5 --item-ms 0.5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_stub(dimension: int, request_ms: float, item_ms: float):
+    class StubOllama(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path == "/api/embed":
+                inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                payload = {"model": body["model"], "embeddings": [[0.01] * dimension for _ in inputs]}
+            elif self.path == "/api/embeddings":
+                inputs = [body["prompt"]]
+                payload = {"embedding": [0.01] * dimension}
+            else:
+                self.send_error(404)
+                return
+            time.sleep((request_ms + item_ms * len(inputs)) / 1000)
+            data = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return StubOllama
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--request-ms", type=float, default=5.0, help="simulated per-request overhead")
+    parser.add_argument("--item-ms", type=float, default=0.5, help="simulated per-text model time")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub(args.dimension, args.request_ms, args.item_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["EMBEDDING_DIMENSION"] = str(args.dimension)
+    os.environ["EMBEDDING_CACHE_PATH"] = ""  # measure the network path, not the cache
+    from services.embedding import OllamaEmbeddingService
+
+    texts = [f"document number {i}" for i in range(args.texts)]
+
+    def fresh_service():
+        service = OllamaEmbeddingService()
+        service.cache.max_bytes = 0
+        return service
+
+    print(f"{args.texts} texts, stub latency {args.request_ms} ms/request + {args.item_ms} ms/text")
+    print(f"{'mode':<28} {'seconds':>9} {'texts/s':>10}")
+
+    service = fresh_service()
+    t0 = time.perf_counter()
+    for text in texts:
+        service.generate_embedding(text)
+    elapsed = time.perf_counter() - t0
+    print(f"{'sequential (old loop)':<28} {elapsed:>9.2f} {args.texts / elapsed:>10.1f}")
+
+    for batch_size in args.batch_sizes:
+        for in_flight in args.in_flight:
+            service = fresh_service()
+            t0 = time.perf_counter()
+            embeddings = service.batch_generate_embeddings(texts, batch_size=batch_size, max_in_flight=in_flight)
+            elapsed = time.perf_counter() - t0
+            assert all(e is not None for e in embeddings)
+            label = f"batch={batch_size} in_flight={in_flight}"
+            print(f"{label:<28} {elapsed:>9.2f} {args.texts / elapsed:>10.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Import time of the API modules against a budget. Each import runs in a fresh
+interpreter, so nothing is shared between runs; the median is compared to the
+budget and the script exits non-zero if any module is over it. Also fails if
+an import pulls in chromadb or ollama, which should only load on first use.
+
+Usage (from the 7th-Jan directory):
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --modules main app --runs 7 --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {project!r})
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [m for m in ("chromadb", "ollama") if m in sys.modules]}}))
+"""
+
+# Modules allowed to import these eagerly
+EAGER_OK = {"app": {"ollama"}}
+
+
+def measure(module: str, workdir: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(project=PROJECT_DIR, module=module)],
+        cwd=workdir, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["main", "app"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    failed = False
+    # Run from an empty directory: importing must not create data directories
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'module':<10} {'median ms':>10} {'min ms':>10} {'budget':>8}  heavy imports")
+        for module in args.modules:
+            runs = [measure(module, workdir) for _ in range(args.runs)]
+            times = [run["ms"] for run in runs]
+            heavy = sorted(set(runs[-1]["heavy"]) - EAGER_OK.get(module, set()))
+            median = statistics.median(times)
+            over = median > args.budget_ms or heavy
+            failed |= bool(over)
+            print(f"{module:<10} {median:>10.1f} {min(times):>10.1f} {'OVER' if over else 'ok':>8}  "
+                  f"{', '.join(heavy) or '-'}")
+            if os.listdir(workdir):
+                print(f"  {module} created {os.listdir(workdir)} at import time")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Bulk ingestion throughput in docs/sec: streaming NDJSON into POST /ingest
+vs. the one-document-per-request pattern of app.py's /add (run on a smaller
+sample, since it is orders of magnitude slower).
+
+Runs the API in-process over ASGI against a temporary Chroma directory and
+the stub Ollama server from bench_embedding_batch.py, so embedding cost is
+only the HTTP round-trips (set --request-ms/--item-ms to simulate a model).
+
+Usage (from the 7th-Jan directory):
+    python benchmarks/bench_ingest_stream.py
+    python benchmarks/bench_ingest_stream.py --docs 100000 --baseline-docs 1000 --dimension 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_embedding_batch import make_stub
+
+
+def ndjson_body(count: int, offset: int = 0, chunk_bytes: int = 64 * 1024):
+    """Small documents as NDJSON, yielded in chunks the way a client would upload them"""
+    chunk = []
+    size = 0
+    for i in range(offset, offset + count):
+        line = json.dumps({"content": f"item {i} in category {i % 97}", "metadata": {"n": i}}) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield "".join(chunk).encode()
+            chunk, size = [], 0
+    if chunk:
+        yield "".join(chunk).encode()
+
+
+async def run(args):
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench/api/v1", timeout=None) as client:
+        print(f"{'mode':<32} {'docs':>9} {'seconds':>9} {'docs/s':>10}")
+
+        if args.baseline_docs:
+            t0 = time.perf_counter()
+            for i in range(args.baseline_docs):
+                response = await client.post("/add-documents", json=[{"content": f"single {i}", "metadata": {"n": i}}])
+                response.raise_for_status()
+            elapsed = time.perf_counter() - t0
+            print(f"{'one document per request':<32} {args.baseline_docs:>9} {elapsed:>9.2f} "
+                  f"{args.baseline_docs / elapsed:>10.1f}")
+
+        async def body():
+            for chunk in ndjson_body(args.docs):
+                yield chunk
+
+        t0 = time.perf_counter()
+        response = await client.post("/ingest", content=body(), headers={"Content-Type": "application/x-ndjson"})
+        response.raise_for_status()
+        elapsed = time.perf_counter() - t0
+        result = response.json()
+        assert result["ingested"] == args.docs, result
+        print(f"{'streaming NDJSON /ingest':<32} {args.docs:>9} {elapsed:>9.2f} {args.docs / elapsed:>10.1f}")
+
+        info = (await client.get("/store-info")).json()
+        print(f"store now holds {info['total_documents']} documents")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1_000_000)
+    parser.add_argument("--baseline-docs", type=int, default=1000)
+    parser.add_argument("--dimension", type=int, default=64)
+    parser.add_argument("--request-ms", type=float, default=0.0, help="simulated per-request overhead")
+    parser.add_argument("--item-ms", type=float, default=0.0, help="simulated per-text model time")
+    parser.add_argument("--write-batch", type=int, default=5000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub(args.dimension, args.request_ms, args.item_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["EMBEDDING_DIMENSION"] = str(args.dimension)
+    os.environ["EMBEDDING_CACHE_PATH"] = ""
+    os.environ["CHROMA_DB_PATH"] = tempfile.mkdtemp(prefix="bench_ingest_")
+    os.environ["INGEST_WRITE_BATCH_SIZE"] = str(args.write_batch)
+
+    asyncio.run(run(args))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Concurrent-client load test for the search API: p50/p99 latency and
+throughput of POST /search at increasing client counts.
+
+Start the API first (for example `uvicorn main:app`), optionally with
+OLLAMA_BASE_URL pointing at the stub server from bench_embedding_batch.py.
+
+Usage (from the 7th-Jan directory):
+    python benchmarks/load_test.py --url http://127.0.0.1:8000/api/v1
+    python benchmarks/load_test.py --concurrency 1 8 32 64 --requests 2000 --seed-docs 500
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+
+async def seed(client: httpx.AsyncClient, count: int):
+    docs = [{"content": f"seed document {i} about topic {i % 17}", "metadata": {"seed": i}} for i in range(count)]
+    for start in range(0, count, 200):
+        response = await client.post("/add-documents", json=docs[start:start + 200])
+        response.raise_for_status()
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, total: int, top_k: int):
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            payload = {"query": f"query about topic {i % 17} number {i}", "top_k": top_k}
+            t0 = time.perf_counter()
+            try:
+                response = await client.post("/search", json=payload)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return latencies, errors, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=500, help="requests per concurrency level")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed-docs", type=int, default=0, help="documents to add before the test")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        if args.seed_docs:
+            await seed(client, args.seed_docs)
+
+        print(f"{'clients':>8} {'ok':>7} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for concurrency in args.concurrency:
+            latencies, errors, elapsed = await run_level(client, concurrency, args.requests, args.top_k)
+            p50 = np.percentile(latencies, 50) if latencies else float("nan")
+            p99 = np.percentile(latencies, 99) if latencies else float("nan")
+            print(f"{concurrency:>8} {len(latencies):>7} {errors:>7} {len(latencies) / elapsed:>9.1f} "
+                  f"{p50:>9.2f} {p99:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
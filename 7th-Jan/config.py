@@ -15,6 +15,37 @@ class Settings:
     EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "768"))
     TOP_K_RESULTS = int(os.getenv("TOP_K_RESULTS", "5"))
     
+    # Batched embedding requests
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "2"))
+    
+    # Embedding Cache Configuration (empty path disables the disk tier)
+    EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.sqlite")
+    
+    # Query result cache (invalidated whenever the vector store changes)
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+    QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "300"))
+    
+    # Streaming NDJSON ingestion: documents per collection.add call (capped by Chroma's limit)
+    INGEST_WRITE_BATCH_SIZE = int(os.getenv("INGEST_WRITE_BATCH_SIZE", "5000"))
+    
+    # Hybrid search: candidates taken from each ranking before reciprocal rank fusion
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    
+    # Near-duplicate collapse: candidates fetched per requested result
+    COLLAPSE_OVERFETCH = int(os.getenv("COLLAPSE_OVERFETCH", "3"))
+    
+    # Thread pool for blocking vector store calls from async handlers
+    VECTOR_STORE_THREADS = int(os.getenv("VECTOR_STORE_THREADS", "8"))
+    
+    # Startup warm-up (readiness is reported only once it has completed)
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+    WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+    WARMUP_MAX_ATTEMPTS = int(os.getenv("WARMUP_MAX_ATTEMPTS", "0"))  # 0 = keep retrying
+    
     # API Configuration
     API_HOST = "0.0.0.0"
     API_PORT = 8000
@@ -0,0 +1,31 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from api.endpoints import router as api_router
+from config import settings
+from services.providers import get_warmup_state, warmup_steps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: liveness answers at once, /ready waits for this
+    if settings.WARMUP_ON_STARTUP:
+        get_warmup_state().start(
+            warmup_steps(),
+            retry_seconds=settings.WARMUP_RETRY_SECONDS,
+            max_attempts=settings.WARMUP_MAX_ATTEMPTS
+        )
+    else:
+        get_warmup_state().skip()
+    yield
+
+app = FastAPI(
+    title="Ollama Vector Search API",
+    description="Vector search over documents embedded with Ollama and stored in ChromaDB",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+app.include_router(api_router, prefix="/api/v1")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("main:app", host=settings.API_HOST, port=settings.API_PORT)
@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional, Dict, Any, Union
+
+class QueryWithVector(BaseModel):
+    query: str
+    vectors: Optional[Union[List[float], List[List[float]]]] = None  # One vector or a list of them
+    top_k: int = 5
+    weight_text: float = 0.7
+    weight_custom: float = 0.3  # Shared equally by the custom vectors
+    vector_weights: Optional[List[float]] = None  # Per-vector weights, overriding weight_custom
+    where: Optional[Dict[str, Any]] = None  # Chroma metadata filter, e.g. {"source": "manual"}
+    mode: Literal["vector", "lexical", "hybrid"] = "vector"
+    collapse_threshold: Optional[float] = None  # Merge hits with cosine similarity >= this (e.g. 0.95)
+
+class Document(BaseModel):
+    content: str
+    metadata: Dict[str, Any] = {}
+
+class SearchResult(BaseModel):
+    id: str
+    content: str
+    similarity: Optional[float]  # None for lexical-only searches
+    metadata: Dict[str, Any] = {}
+    index: int  # Rank within the result list
+    lexical_score: Optional[float] = None  # BM25 score (lexical and hybrid modes)
+    score: Optional[float] = None  # Reciprocal rank fusion score (hybrid mode)
+    duplicates: List[str] = []  # Ids of near-duplicate hits collapsed into this one
+
+class HealthResponse(BaseModel):
+    status: str
+    ollama_available: bool
+    vector_store_ready: bool
+    details: Dict[str, Any] = {}
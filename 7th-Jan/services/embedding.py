@@ -1,8 +1,12 @@
 import ollama
 import numpy as np
-from typing import List, Optional
+from typing import List, Optional, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import time
 from config import settings
+from services.embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,21 @@ class OllamaEmbeddingService:
         self.model = settings.OLLAMA_MODEL
         self.base_url = settings.OLLAMA_BASE_URL
         self.dimension = settings.EMBEDDING_DIMENSION
+        # Vectors are padded or truncated to the dimension, so cache on both
+        self._cache_model = f"{self.model}/{self.dimension}"
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE
+        self.max_in_flight = settings.EMBEDDING_MAX_IN_FLIGHT
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES
+        # One client for the service so HTTP connections are pooled and reused
+        self.client = ollama.Client(host=self.base_url)
+        self._async_client = None  # Created on first use, inside the serving event loop
+        self._in_flight = None  # Semaphore over every async Ollama request of this service
+        # Cleared if the client or server has no multi-input embed API
+        self.supports_batch_embed = hasattr(self.client, "embed")
+        self.cache = EmbeddingCache(
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            path=settings.EMBEDDING_CACHE_PATH or None
+        )
         
     def generate_embedding(self, text: str) -> Optional[List[float]]:
         """
@@ -24,91 +43,280 @@ class OllamaEmbeddingService:
         Returns:
             List of floats representing the embedding
         """
+        cached = self.cache.get(self._cache_model, text)
+        if cached is not None:
+            return cached.tolist()
+        return self._embed_and_cache(text)
+    
+    def generate_query_vector(self, text: str) -> Optional[np.ndarray]:
+        """generate_embedding as a float32 array (cache hits are returned without copying)"""
+        cached = self.cache.get(self._cache_model, text)
+        if cached is not None:
+            return cached
+        embedding = self._embed_and_cache(text)
+        return np.asarray(embedding, dtype=np.float32) if embedding is not None else None
+    
+    def _embed_and_cache(self, text: str) -> Optional[List[float]]:
+        """Embed a text already looked up in the cache (so the miss is counted once)"""
         try:
-            response = ollama.embeddings(
-                model=self.model,
-                prompt=text
-            )
-            embedding = response.get("embedding", [])
-            
-            if not embedding:
-                logger.warning(f"No embedding returned for text: {text[:50]}...")
-                return None
-                
-            # Ensure the embedding has correct dimension
-            if len(embedding) != self.dimension:
-                logger.warning(f"Embedding dimension mismatch: {len(embedding)} != {self.dimension}")
-                # Pad or truncate to correct dimension
-                if len(embedding) < self.dimension:
-                    embedding = embedding + [0.0] * (self.dimension - len(embedding))
-                else:
-                    embedding = embedding[:self.dimension]
-            
-            return embedding
-            
+            embedding = self._embed_single(text)
         except Exception as e:
             logger.error(f"Error generating embedding: {str(e)}")
             return None
+        
+        if embedding is not None:
+            self.cache.put(self._cache_model, text, embedding)
+        return embedding
+    
+    def _embed_single(self, text: str) -> Optional[List[float]]:
+        """One /api/embeddings round-trip; raises on transport errors"""
+        response = self.client.embeddings(
+            model=self.model,
+            prompt=text
+        )
+        embedding = response.get("embedding", [])
+        
+        if not embedding:
+            logger.warning(f"No embedding returned for text: {text[:50]}...")
+            return None
+        
+        return self._fit_dimension(list(embedding))
+    
+    def _fit_dimension(self, embedding: List[float]) -> List[float]:
+        """Ensure the embedding has the configured dimension"""
+        if len(embedding) != self.dimension:
+            logger.warning(f"Embedding dimension mismatch: {len(embedding)} != {self.dimension}")
+            # Pad or truncate to correct dimension
+            if len(embedding) < self.dimension:
+                embedding = embedding + [0.0] * (self.dimension - len(embedding))
+            else:
+                embedding = embedding[:self.dimension]
+        return embedding
     
-    def batch_generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+    def batch_generate_embeddings(self, texts: List[str],
+                                  batch_size: Optional[int] = None,
+                                  max_in_flight: Optional[int] = None) -> List[Optional[List[float]]]:
         """
         Generate embeddings for multiple texts
         
+        Cached texts are served locally. The rest are sent in batches of
+        `batch_size` through Ollama's multi-input embed API, with at most
+        `max_in_flight` requests outstanding. Items of a failed batch are retried
+        one by one with backoff.
+        
         Args:
             texts: List of texts to embed
+            batch_size: Texts per embed request (default: EMBEDDING_BATCH_SIZE)
+            max_in_flight: Concurrent requests (default: EMBEDDING_MAX_IN_FLIGHT)
             
         Returns:
             List of embeddings (some may be None if failed)
         """
-        embeddings = []
-        for text in texts:
-            embedding = self.generate_embedding(text)
-            embeddings.append(embedding)
+        batch_size = batch_size or self.batch_size
+        max_in_flight = max_in_flight or self.max_in_flight
+        
+        embeddings = [e.tolist() if e is not None else None for e in self.cache.get_many(self._cache_model, texts)]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+        
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        with ThreadPoolExecutor(max_workers=min(max_in_flight, len(batches))) as pool:
+            results = pool.map(lambda batch: self._embed_batch([texts[i] for i in batch]), batches)
+            for batch, batch_embeddings in zip(batches, results):
+                for i, embedding in zip(batch, batch_embeddings):
+                    embeddings[i] = embedding
+        
+        self.cache.put_many(self._cache_model, [texts[i] for i in missing], [embeddings[i] for i in missing])
         return embeddings
     
+    def _embed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed one batch in a single request, falling back to per-item calls"""
+        if self.supports_batch_embed:
+            try:
+                response = self.client.embed(model=self.model, input=texts)
+                vectors = response.get("embeddings", [])
+                if len(vectors) == len(texts):
+                    return [self._fit_dimension(list(v)) if v else None for v in vectors]
+                logger.warning(f"Embed returned {len(vectors)} vectors for {len(texts)} texts")
+            except ollama.ResponseError as e:
+                if e.status_code == 404:
+                    logger.warning("Ollama server has no /api/embed, using per-item embeddings")
+                    self.supports_batch_embed = False
+                else:
+                    logger.warning(f"Batch embed failed, retrying items: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Batch embed failed, retrying items: {str(e)}")
+        
+        return [self._embed_with_retry(text) for text in texts]
+    
+    def _embed_with_retry(self, text: str) -> Optional[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._embed_single(text)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error generating embedding after {attempt + 1} attempts: {str(e)}")
+                    return None
+                time.sleep(0.1 * 2 ** attempt)
+    
+    @property
+    def async_client(self) -> ollama.AsyncClient:
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient(host=self.base_url)
+        return self._async_client
+    
+    @property
+    def in_flight(self) -> asyncio.Semaphore:
+        """Caps concurrent async requests to Ollama across all callers at max_in_flight"""
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        return self._in_flight
+    
+    async def agenerate_embedding(self, text: str) -> Optional[List[float]]:
+        """Async generate_embedding; never blocks the event loop on Ollama"""
+        return (await self.abatch_generate_embeddings([text]))[0]
+    
+    async def agenerate_query_vector(self, text: str) -> Optional[np.ndarray]:
+        """Async generate_query_vector"""
+        cached = self.cache.get(self._cache_model, text)
+        if cached is not None:
+            return cached
+        # Straight to Ollama: the batch path would look the text up (and miss) again
+        embedding = (await self._aembed_batch([text]))[0]
+        if embedding is None:
+            return None
+        self.cache.put(self._cache_model, text, embedding)
+        return np.asarray(embedding, dtype=np.float32)
+    
+    async def abatch_generate_embeddings(self, texts: List[str],
+                                         batch_size: Optional[int] = None) -> List[Optional[List[float]]]:
+        """
+        Async batch_generate_embeddings. Batches are fanned out at once; every
+        request, including per-item fallbacks, waits for the service's in_flight
+        semaphore, so the limit holds across concurrent calls
+        """
+        batch_size = batch_size or self.batch_size
+        
+        embeddings = [e.tolist() if e is not None else None for e in self.cache.get_many(self._cache_model, texts)]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+        
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        results = await asyncio.gather(*(self._aembed_batch([texts[i] for i in batch]) for batch in batches))
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        
+        self.cache.put_many(self._cache_model, [texts[i] for i in missing], [embeddings[i] for i in missing])
+        return embeddings
+    
+    async def _aembed_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Async _embed_batch"""
+        if self.supports_batch_embed:
+            try:
+                async with self.in_flight:
+                    response = await self.async_client.embed(model=self.model, input=texts)
+                vectors = response.get("embeddings", [])
+                if len(vectors) == len(texts):
+                    return [self._fit_dimension(list(v)) if v else None for v in vectors]
+                logger.warning(f"Embed returned {len(vectors)} vectors for {len(texts)} texts")
+            except ollama.ResponseError as e:
+                if e.status_code == 404:
+                    logger.warning("Ollama server has no /api/embed, using per-item embeddings")
+                    self.supports_batch_embed = False
+                else:
+                    logger.warning(f"Batch embed failed, retrying items: {str(e)}")
+            except Exception as e:
+                logger.warning(f"Batch embed failed, retrying items: {str(e)}")
+        
+        return list(await asyncio.gather(*(self._aembed_with_retry(text) for text in texts)))
+    
+    async def _aembed_with_retry(self, text: str) -> Optional[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.in_flight:  # Not held during the backoff below
+                    response = await self.async_client.embeddings(model=self.model, prompt=text)
+                embedding = response.get("embedding", [])
+                if not embedding:
+                    logger.warning(f"No embedding returned for text: {text[:50]}...")
+                    return None
+                return self._fit_dimension(list(embedding))
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error generating embedding after {attempt + 1} attempts: {str(e)}")
+                    return None
+                await asyncio.sleep(0.1 * 2 ** attempt)
+    
     def combine_vectors(self, 
-                       text_embedding: List[float], 
-                       custom_vector: List[float],
+                       text_embedding: Union[np.ndarray, List[float]], 
+                       custom_vector: Union[np.ndarray, List[float], List[List[float]]],
                        weight_text: float = 0.7,
-                       weight_custom: float = 0.3) -> List[float]:
+                       weight_custom: Union[float, Sequence[float]] = 0.3) -> np.ndarray:
         """
-        Combine text embedding with custom vector using weighted sum
+        Combine text embedding with one or more custom vectors using a weighted sum
         
         Args:
             text_embedding: Text embedding from Ollama
-            custom_vector: Custom vector provided by user
+            custom_vector: Custom vector, or an (n, dim) matrix of custom vectors
             weight_text: Weight for text embedding
-            weight_custom: Weight for custom vector
+            weight_custom: Total weight shared equally by the custom vectors, or
+                one weight per custom vector
             
         Returns:
-            Combined vector
+            Combined, L2-normalized float32 vector
         """
+        text = np.asarray(text_embedding, dtype=np.float32)
+        custom = np.asarray(custom_vector, dtype=np.float32)  # ValueError if ragged
+        if custom.ndim == 1:
+            custom = custom[np.newaxis, :]
+        if custom.ndim != 2 or custom.size == 0:
+            raise ValueError("custom vectors must be a non-empty vector or matrix")
+        
+        weights = np.asarray(weight_custom, dtype=np.float32)
+        if weights.ndim == 0:
+            weights = np.full(len(custom), weights / len(custom), dtype=np.float32)
+        elif weights.shape != (len(custom),):
+            raise ValueError(f"expected {len(custom)} custom vector weights, got {weights.size}")
+        
         # Ensure vectors have same dimension
-        min_dim = min(len(text_embedding), len(custom_vector))
-        text_embedding = text_embedding[:min_dim]
-        custom_vector = custom_vector[:min_dim]
+        min_dim = min(len(text), custom.shape[1])
         
-        # Weighted combination
-        combined = [
-            (weight_text * t + weight_custom * c) 
-            for t, c in zip(text_embedding, custom_vector)
-        ]
+        # Weighted combination: one matrix-vector product for all custom vectors
+        combined = weight_text * text[:min_dim] + weights @ custom[:, :min_dim]
         
         # Normalize the combined vector
         norm = np.linalg.norm(combined)
         if norm > 0:
-            combined = [v / norm for v in combined]
+            combined /= norm
         
         return combined
     
+    def warm_up(self) -> dict:
+        """
+        Embed a dummy text, bypassing the cache, so Ollama loads the model before
+        the first real request; raises if no embedding comes back
+        """
+        embedding = self._embed_batch(["warm-up"])[0]
+        if embedding is None:
+            raise RuntimeError(f"Ollama returned no embedding for model {self.model}")
+        return {"model": self.model, "dimension": len(embedding)}
+    
     def test_connection(self) -> bool:
         """Test if Ollama is available"""
         try:
-            ollama.list()
+            self.client.list()
             return True
         except Exception as e:
             logger.error(f"Ollama connection test failed: {str(e)}")
             return False
-
-# Singleton instance
-embedding_service = OllamaEmbeddingService()
\ No newline at end of file
+    
+    async def atest_connection(self) -> bool:
+        """Async test_connection"""
+        try:
+            await self.async_client.list()
+            return True
+        except Exception as e:
+            logger.error(f"Ollama connection test failed: {str(e)}")
+            return False
\ No newline at end of file
@@ -0,0 +1,136 @@
+# Kept identical in 7th-Jan/services and 8th-Jan/services; tests/test_shared_modules.py checks
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by (model, normalized-text hash).
+
+    Tier 1 is an in-memory LRU bounded by `max_bytes` of vector data; tier 2 is an
+    optional SQLite file that survives restarts. Disk hits are promoted to memory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).digest()
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Iterable[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for texts, None where missing"""
+        keys = [self.make_key(model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.append(i)
+
+            if missing and self._db is not None:
+                found = self._read_disk([keys[i] for i in missing])
+                still_missing = []
+                for i in missing:
+                    vector = found.get(keys[i])
+                    if vector is None:
+                        still_missing.append(i)
+                        continue
+                    results[i] = vector
+                    self.disk_hits += 1
+                    self._remember(keys[i], vector)
+                missing = still_missing
+
+            self.misses += len(missing)
+        return results
+
+    def put(self, model: str, text: str, vector) -> None:
+        self.put_many(model, [text], [vector])
+
+    def put_many(self, model: str, texts: Iterable[str], vectors: Iterable) -> None:
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                if vector is None:
+                    continue
+                key = self.make_key(model, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            if rows and self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._db.commit()
+
+    def _read_disk(self, keys: List[bytes], chunk: int = 500) -> Dict[bytes, np.ndarray]:
+        found = {}
+        for start in range(0, len(keys), chunk):
+            part = keys[start:start + chunk]
+            placeholders = ",".join("?" * len(part))
+            for key, blob in self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        """Insert into the memory tier and evict least recently used entries over budget"""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        if vector.nbytes > self.max_bytes:
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_bytes": self.max_bytes,
+            "disk_enabled": self._db is not None
+        }
@@ -0,0 +1,144 @@
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+# Words, keeping joined runs like "ERR-404", "v1.2.3" or "a/b" together as one token
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_PART = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of `text`. Compound tokens such as part numbers and error
+    codes are indexed whole and also split into their parts, so "ERR-404"
+    matches queries for "err-404", "err" and "404".
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring.
+
+    Postings are append-only arrays per term (row, term frequency), so adding
+    documents is incremental and scoring a query is a handful of vectorized
+    scatter-adds over the postings of its terms. Removed documents keep their
+    postings but are masked out of every search and of term document frequencies.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._postings: Dict[str, Tuple[array, array]] = {}
+            self._doc_lengths = array("I")
+            self._ids: List[str] = []
+            self._rows: Dict[str, int] = {}  # Live documents only
+            self._removed = array("I")  # Rows of removed documents
+            self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """Index documents; re-adding an existing id is ignored"""
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                if doc_id in self._rows:
+                    continue
+                row = len(self._ids)
+                self._ids.append(doc_id)
+                self._rows[doc_id] = row
+
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                self._doc_lengths.append(length)
+                self._total_length += length
+                for term, tf in counts.items():
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        postings = self._postings[term] = (array("I"), array("I"))
+                    postings[0].append(row)
+                    postings[1].append(tf)
+
+    def remove(self, ids: Iterable[str]):
+        """Drop documents from search results; unknown ids are ignored"""
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is not None:
+                    self._removed.append(row)
+                    self._total_length -= self._doc_lengths[row]
+
+    def search(self, query: str, top_k: int = 5,
+               allowed_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Best `top_k` (id, BM25 score) pairs for `query`, optionally restricted to
+        `allowed_ids`. Documents sharing no term with the query are not returned.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n_docs = len(self._rows)
+            if n_docs == 0 or not terms or top_k <= 0:
+                return []
+
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32).astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / n_docs))
+            live = np.ones(len(self._ids), dtype=bool)
+            live[np.frombuffer(self._removed, dtype=np.uint32)] = False
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                rows = np.frombuffer(postings[0], dtype=np.uint32)
+                tf = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float32)
+                # Document frequency over live documents, matching n_docs
+                keep = live[rows]
+                rows, tf = rows[keep], tf[keep]
+                idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm[rows])
+
+            if allowed_ids is not None:
+                allowed = [self._rows[i] for i in allowed_ids if i in self._rows]
+                mask = np.zeros(len(self._ids), dtype=bool)
+                mask[allowed] = True
+                scores[~mask] = 0
+
+            matched = np.flatnonzero(scores > 0)
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self._ids[row], float(scores[row])) for row in matched]
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            n_docs = len(self._rows)
+            return {
+                "documents": n_docs,
+                "terms": len(self._postings),
+                "average_length": round(self._total_length / n_docs, 2) if n_docs else 0.0
+            }
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)), best first"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
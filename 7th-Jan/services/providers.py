@@ -0,0 +1,62 @@
+"""
+Lazily constructed service instances, injected into the API with FastAPI's
+Depends. Nothing here imports Ollama or Chroma, connects to anything or opens
+the database at import time; each instance is built on first use (normally by
+the startup warm-up) and shared afterwards. Tests can swap them out with
+app.dependency_overrides.
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+from services.warmup import WarmupState, WarmupStep
+
+if TYPE_CHECKING:
+    from services.embedding import OllamaEmbeddingService
+    from services.search import SearchService
+    from services.vector_store import ChromaVectorStore
+
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()  # Re-entrant: the search service builds its dependencies
+_warmup_state = WarmupState()
+
+
+def _get(name: str, factory: Callable[[], Any]) -> Any:
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_embedding_service() -> "OllamaEmbeddingService":
+    def build():
+        from services.embedding import OllamaEmbeddingService
+        return OllamaEmbeddingService()
+    return _get("embedding_service", build)
+
+
+def get_vector_store() -> "ChromaVectorStore":
+    def build():
+        from services.vector_store import ChromaVectorStore
+        return ChromaVectorStore()
+    return _get("vector_store", build)
+
+
+def get_search_service() -> "SearchService":
+    def build():
+        from services.search import SearchService
+        return SearchService(get_embedding_service(), get_vector_store())
+    return _get("search_service", build)
+
+
+def get_warmup_state() -> WarmupState:
+    return _warmup_state
+
+
+def warmup_steps() -> List[WarmupStep]:
+    """Open the store and load its index, then load the embedding model"""
+    return [
+        ("vector_store", lambda: get_vector_store().warm_up()),
+        ("embedding_model", lambda: get_embedding_service().warm_up()),
+    ]
@@ -0,0 +1,94 @@
+# Kept identical in 7th-Jan/services and 8th-Jan/services; tests/test_shared_modules.py checks
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+
+def _encode(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class QueryCache:
+    """
+    LRU + TTL cache of search results keyed by the query parameters.
+
+    Every entry records the index version it was computed against. A lookup
+    under any other version is a miss, so writes to the index (which bump the
+    version) invalidate the cache without working out which queries they affect.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[bytes, Tuple[int, float, Any]]" = OrderedDict()
+        self._version = 0  # Newest index version seen
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(**params) -> bytes:
+        """Key from query parameters (text, top_k, filters, custom vectors, ...)"""
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=_encode)
+        return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+    def get(self, key: bytes, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_version, stored_at, value = entry
+            if entry_version != version or (self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds):
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, version: int, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if version < self._version:
+                return  # Computed against an index that has since changed
+            if version > self._version:
+                # Everything cached so far is stale: drop it now rather than entry by entry
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._version = version
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "index_version": self._version
+        }
@@ -1,17 +1,98 @@
+import asyncio
+import functools
 import logging
-from typing import List, Optional
-from models.schemas import QueryWithVector, SearchResult
-from services.embedding import embedding_service
-from services.vector_store import vector_store
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+import numpy as np
+from pydantic import ValidationError
+from config import settings
+from models.schemas import Document, QueryWithVector, SearchResult
+from services.lexical_index import reciprocal_rank_fusion
+from services.query_cache import QueryCache
+from services.vector_store import make_document_id
+
+if TYPE_CHECKING:
+    from services.embedding import OllamaEmbeddingService
+    from services.vector_store import ChromaVectorStore
 
 logger = logging.getLogger(__name__)
 
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """(line number, line) for each non-blank line of a byte stream, parsed as it arrives"""
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+def collapse_near_duplicates(results: List[dict], threshold: float) -> List[dict]:
+    """
+    Drop hits that repeat a better-ranked one: same text up to case and
+    whitespace, or stored embeddings with cosine similarity >= threshold. The
+    surviving hit lists the ids it absorbed under "duplicates".
+    """
+    kept: List[dict] = []
+    kept_vectors: List[np.ndarray] = []  # Unit embeddings of kept hits
+    vector_owner: List[int] = []  # Index into kept for each of kept_vectors
+    by_text = {}
+    
+    for result in results:
+        embedding = result.pop("embedding", None)
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else None
+        
+        text_key = " ".join(result["content"].lower().split())
+        owner = by_text.get(text_key)
+        if owner is None and vector is not None and kept_vectors:
+            similarities = np.stack(kept_vectors) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                owner = vector_owner[best]
+        
+        if owner is not None:
+            kept[owner]["duplicates"].append(result["id"])
+            continue
+        
+        result["duplicates"] = []
+        by_text[text_key] = len(kept)
+        if vector is not None:
+            kept_vectors.append(vector)
+            vector_owner.append(len(kept))
+        kept.append(result)
+    return kept
+
 class SearchService:
     """Service for handling search operations"""
     
-    def __init__(self):
+    def __init__(self, embedding_service: "OllamaEmbeddingService", vector_store: "ChromaVectorStore"):
         self.embedding_service = embedding_service
         self.vector_store = vector_store
+        # Chroma calls are blocking; async callers run them on this sized pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.VECTOR_STORE_THREADS,
+            thread_name_prefix="vector-store"
+        )
+        self.query_cache = QueryCache(
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS
+        )
+    
+    async def run_blocking(self, fn, *args, **kwargs):
+        """Run a blocking call on the vector store pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
     
     def search(self, query_data: QueryWithVector) -> List[SearchResult]:
         """
@@ -23,45 +104,136 @@ class SearchService:
         Returns:
             List of SearchResult objects
         """
-        # Step 1: Generate embedding for text query
-        query_embedding = self.embedding_service.generate_embedding(query_data.query)
+        # Repeated queries are answered from the cache until the store changes
+        cache_key, version = self._cache_key(query_data), self.vector_store.version
+        cached = self.query_cache.get(cache_key, version)
+        if cached is not None:
+            return list(cached)
+        
+        combined_embedding = None
+        if query_data.mode != "lexical":
+            # Step 1: Generate embedding for text query
+            query_embedding = self.embedding_service.generate_query_vector(query_data.query)
+            
+            if query_embedding is None:
+                logger.error(f"Failed to generate embedding for query: {query_data.query}")
+                return []
+            
+            # Step 2: Combine with custom vector if provided
+            combined_embedding = self._combine_query(query_data, query_embedding)
         
-        if query_embedding is None:
-            logger.error(f"Failed to generate embedding for query: {query_data.query}")
-            return []
+        # Steps 3-4: Search in vector store and format results
+        results = self._search_embedding(query_data, combined_embedding)
+        self.query_cache.put(cache_key, version, results)
+        return list(results)
+    
+    async def asearch(self, query_data: QueryWithVector) -> List[SearchResult]:
+        """Async search: embeds with the async Ollama client and runs Chroma off the event loop"""
+        cache_key, version = self._cache_key(query_data), self.vector_store.version
+        cached = self.query_cache.get(cache_key, version)
+        if cached is not None:
+            return list(cached)
         
-        # Step 2: Combine with custom vector if provided
+        combined_embedding = None
+        if query_data.mode != "lexical":
+            query_embedding = await self.embedding_service.agenerate_query_vector(query_data.query)
+            
+            if query_embedding is None:
+                logger.error(f"Failed to generate embedding for query: {query_data.query}")
+                return []
+            
+            combined_embedding = self._combine_query(query_data, query_embedding)
+        
+        results = await self.run_blocking(self._search_embedding, query_data, combined_embedding)
+        self.query_cache.put(cache_key, version, results)
+        return list(results)
+    
+    def _cache_key(self, query_data: QueryWithVector) -> bytes:
+        """Cache key over every request field: text, top_k, mode, filters, custom vectors and weights"""
+        return self.query_cache.make_key(**query_data.model_dump())
+    
+    def _combine_query(self, query_data: QueryWithVector, query_embedding: np.ndarray) -> np.ndarray:
+        """float32 query vector, mixed with the custom vectors if any"""
         if query_data.vectors:
-            combined_embedding = self.embedding_service.combine_vectors(
+            return self.embedding_service.combine_vectors(
                 text_embedding=query_embedding,
                 custom_vector=query_data.vectors,
                 weight_text=query_data.weight_text,
-                weight_custom=query_data.weight_custom
+                weight_custom=(query_data.vector_weights if query_data.vector_weights is not None
+                               else query_data.weight_custom)
             )
+        return query_embedding
+    
+    def _search_embedding(self, query_data: QueryWithVector,
+                          combined_embedding: Optional[np.ndarray]) -> List[SearchResult]:
+        # Over-fetch when near-duplicates are collapsed, so top_k survive
+        collapse = query_data.collapse_threshold is not None
+        top_k = query_data.top_k * settings.COLLAPSE_OVERFETCH if collapse else query_data.top_k
+        
+        # Step 3: Search in vector store (filters are applied inside the store)
+        if query_data.mode == "lexical":
+            search_results = self.vector_store.lexical_search(
+                query=query_data.query,
+                top_k=top_k,
+                where=query_data.where,
+                include_embeddings=collapse
+            )
+        elif query_data.mode == "hybrid":
+            search_results = self._hybrid_search(query_data, combined_embedding, top_k, collapse)
         else:
-            combined_embedding = query_embedding
+            search_results = self.vector_store.search(
+                query_embedding=combined_embedding,
+                top_k=top_k,
+                where=query_data.where,
+                include_embeddings=collapse
+            )
         
-        # Step 3: Search in vector store
-        search_results = self.vector_store.search(
+        if collapse:
+            search_results = collapse_near_duplicates(search_results, query_data.collapse_threshold)
+            search_results = search_results[:query_data.top_k]
+        
+        # Step 4: Format results
+        return [
+            SearchResult(
+                id=result["id"],
+                content=result["content"],
+                similarity=result.get("similarity"),
+                metadata=result["metadata"],
+                index=rank,
+                lexical_score=result.get("lexical_score"),
+                score=result.get("score"),
+                duplicates=result.get("duplicates", [])
+            )
+            for rank, result in enumerate(search_results)
+        ]
+    
+    def _hybrid_search(self, query_data: QueryWithVector, combined_embedding: np.ndarray,
+                       top_k: int, include_embeddings: bool = False) -> List[dict]:
+        """Vector and BM25 candidates fused with reciprocal rank fusion"""
+        candidates = max(top_k, settings.HYBRID_CANDIDATES)
+        vector_hits = self.vector_store.search(
             query_embedding=combined_embedding,
-            top_k=query_data.top_k
+            top_k=candidates,
+            where=query_data.where,
+            include_embeddings=include_embeddings
+        )
+        lexical_hits = self.vector_store.lexical_search(
+            query=query_data.query,
+            top_k=candidates,
+            where=query_data.where,
+            query_embedding=combined_embedding,
+            include_embeddings=include_embeddings
         )
         
-        # Step 4: Format results
-        results = []
-        for idx, similarity in search_results:
-            try:
-                content, metadata = self.vector_store.get_document(idx)
-                results.append(SearchResult(
-                    content=content,
-                    similarity=similarity,
-                    metadata=metadata,
-                    index=idx
-                ))
-            except Exception as e:
-                logger.error(f"Error retrieving document {idx}: {str(e)}")
-        
-        return results
+        by_id = {hit["id"]: hit for hit in lexical_hits}
+        for hit in vector_hits:
+            by_id[hit["id"]] = dict(by_id.get(hit["id"], {}), **hit)
+        
+        fused = reciprocal_rank_fusion(
+            [[hit["id"] for hit in vector_hits], [hit["id"] for hit in lexical_hits]],
+            k=settings.RRF_K
+        )
+        return [dict(by_id[doc_id], score=score) for doc_id, score in fused[:top_k]]
     
     def add_documents(self, documents: List[str], 
                      metadata_list: Optional[List[dict]] = None) -> dict:
@@ -78,20 +250,174 @@ class SearchService:
         if metadata_list is None:
             metadata_list = [{} for _ in documents]
         
+        # Skip documents already stored before paying for their embeddings
+        documents, metadata_list, ids, skipped = self._drop_stored(documents, metadata_list)
+        if not documents:
+            return self._nothing_new(skipped)
+        
         # Generate embeddings for all documents
         logger.info(f"Generating embeddings for {len(documents)} documents...")
         embeddings = self.embedding_service.batch_generate_embeddings(documents)
         
+        return dict(self._store_embedded(documents, embeddings, metadata_list, ids), skipped=skipped)
+    
+    async def aadd_documents(self, documents: List[str],
+                             metadata_list: Optional[List[dict]] = None) -> dict:
+        """Async add_documents: async embedding, Chroma insert off the event loop"""
+        if metadata_list is None:
+            metadata_list = [{} for _ in documents]
+        
+        documents, metadata_list, ids, skipped = await self.run_blocking(
+            self._drop_stored, documents, metadata_list
+        )
+        if not documents:
+            return self._nothing_new(skipped)
+        
+        logger.info(f"Generating embeddings for {len(documents)} documents...")
+        embeddings = await self.embedding_service.abatch_generate_embeddings(documents)
+        
+        result = await self.run_blocking(self._store_embedded, documents, embeddings, metadata_list, ids)
+        return dict(result, skipped=skipped)
+    
+    def _drop_stored(self, documents: List[str], metadata_list: List[dict],
+                     seen: Optional[set] = None) -> Tuple[list, list, list, int]:
+        """
+        Dedup pass: content-addressed ids for the documents, minus repeats within
+        the batch and documents the store already holds
+        
+        Args:
+            seen: Ids already taken by earlier batches of the same stream that may
+                not be stored yet; the kept ids are added to it
+        
+        Returns:
+            (documents, metadata_list, ids) still to add, and how many were skipped
+        """
+        ids = [make_document_id(doc, meta) for doc, meta in zip(documents, metadata_list)]
+        stored = self.vector_store.existing_ids(list(set(ids)))
+        
+        keep = []
+        for i, doc_id in enumerate(ids):
+            if doc_id not in stored and (seen is None or doc_id not in seen):
+                stored.add(doc_id)  # Later repeats in this batch are skipped too
+                keep.append(i)
+        if seen is not None:
+            seen.update(ids[i] for i in keep)
+        
+        skipped = len(ids) - len(keep)
+        if skipped:
+            logger.info(f"Skipping {skipped} documents already in the vector store")
+        return [documents[i] for i in keep], [metadata_list[i] for i in keep], [ids[i] for i in keep], skipped
+    
+    @staticmethod
+    def _nothing_new(skipped: int) -> dict:
+        return {
+            "success": True,
+            "message": f"All {skipped} documents are already in the vector store",
+            "total_documents": 0,
+            "failed": 0,
+            "skipped": skipped
+        }
+    
+    async def aingest_ndjson(self, chunks: AsyncIterator[bytes], max_errors: int = 20) -> dict:
+        """
+        Ingest a stream of NDJSON documents (one {"content": ..., "metadata": {...}}
+        object per line) without holding the whole body in memory
+        
+        Lines are parsed as they arrive and embedded in micro-batches of
+        batch_size * max_in_flight texts; embedded documents are written to Chroma
+        in INGEST_WRITE_BATCH_SIZE batches, with one write in flight while the next
+        micro-batches are embedded.
+        
+        Args:
+            chunks: Request body chunks
+            max_errors: Invalid lines to report individually
+            
+        Returns:
+            Dictionary with counts, throughput and the first invalid lines
+        """
+        t0 = time.perf_counter()
+        embed_size = self.embedding_service.batch_size * self.embedding_service.max_in_flight
+        write_size = max(1, min(settings.INGEST_WRITE_BATCH_SIZE, self.vector_store.max_batch_size))
+        
+        parsed: List[Document] = []
+        embedded: Tuple[list, list, list, list] = ([], [], [], [])  # texts, embeddings, metadata, ids
+        write_task: Optional[asyncio.Future] = None
+        in_flight = 0  # Documents in the write being awaited
+        seen = set()  # Ids kept so far; repeats may still be buffered or being written
+        totals = {"ingested": 0, "skipped": 0, "failed": 0, "invalid": 0}
+        errors = []
+        
+        async def finish_write():
+            nonlocal write_task, in_flight
+            if write_task is not None:
+                stored = (await write_task).get("total_documents", 0)
+                totals["ingested"] += stored
+                totals["failed"] += in_flight - stored
+                write_task, in_flight = None, 0
+        
+        async def write(force: bool = False):
+            nonlocal write_task, in_flight, embedded
+            while len(embedded[0]) >= write_size or (force and embedded[0]):
+                batch = tuple(part[:write_size] for part in embedded)
+                embedded = tuple(part[write_size:] for part in embedded)
+                await finish_write()  # At most one write in flight
+                write_task = asyncio.ensure_future(self.run_blocking(self._store_embedded, *batch))
+                in_flight = len(batch[0])
+        
+        async def embed():
+            texts, metadata_list, ids, skipped = await self.run_blocking(
+                self._drop_stored, [doc.content for doc in parsed], [doc.metadata for doc in parsed], seen
+            )
+            parsed.clear()
+            totals["skipped"] += skipped
+            embeddings = await self.embedding_service.abatch_generate_embeddings(texts) if texts else []
+            embedded[0].extend(texts)
+            embedded[1].extend(embeddings)
+            embedded[2].extend(metadata_list)
+            embedded[3].extend(ids)
+            await write()
+        
+        async for line_number, line in aiter_lines(chunks):
+            try:
+                parsed.append(Document.model_validate_json(line))
+            except ValidationError as e:
+                totals["invalid"] += 1
+                if len(errors) < max_errors:
+                    errors.append({"line": line_number, "error": e.errors()[0]["msg"]})
+                continue
+            if len(parsed) >= embed_size:
+                await embed()
+        
+        if parsed:
+            await embed()
+        await write(force=True)
+        await finish_write()
+        
+        elapsed = time.perf_counter() - t0
+        return {
+            "success": totals["ingested"] + totals["skipped"] > 0,
+            "message": f"Ingested {totals['ingested']} documents, skipped {totals['skipped']} already stored",
+            **totals,
+            "errors": errors,
+            "total_documents": self.vector_store.document_count,
+            "seconds": round(elapsed, 3),
+            "docs_per_second": round(totals["ingested"] / elapsed, 1) if elapsed else 0.0
+        }
+    
+    def _store_embedded(self, documents: List[str], embeddings: List[Optional[List[float]]],
+                        metadata_list: List[dict], ids: List[str]) -> dict:
         # Filter out documents with failed embeddings
         valid_docs = []
         valid_embeddings = []
         valid_metadata = []
+        valid_ids = []
         
-        for doc, emb, meta in zip(documents, embeddings, metadata_list):
+        for doc, emb, meta, doc_id in zip(documents, embeddings, metadata_list, ids):
             if emb is not None:
                 valid_docs.append(doc)
                 valid_embeddings.append(emb)
                 valid_metadata.append(meta)
+                valid_ids.append(doc_id)
             else:
                 logger.warning(f"Failed to generate embedding for document: {doc[:50]}...")
         
@@ -101,8 +427,9 @@ class SearchService:
         # Add to vector store
         self.vector_store.add_documents(
             documents=valid_docs,
-            embeddings=valid_embeddings,
-            metadata_list=valid_metadata
+            embeddings=np.asarray(valid_embeddings, dtype=np.float32),
+            metadata_list=valid_metadata,
+            ids=valid_ids
         )
         
         return {
@@ -114,12 +441,12 @@ class SearchService:
     
     def get_store_info(self) -> dict:
         """Get information about the vector store"""
-        return self.vector_store.get_info()
+        info = self.vector_store.get_info()
+        info["embedding_cache"] = self.embedding_service.cache.get_stats()
+        info["query_cache"] = self.query_cache.get_stats()
+        return info
     
     def clear_store(self) -> dict:
         """Clear all documents from the vector store"""
         self.vector_store.clear()
-        return {"success": True, "message": "Vector store cleared"}
-
-# Singleton instance
-search_service = SearchService()
\ No newline at end of file
+        return {"success": True, "message": "Vector store cleared"}
\ No newline at end of file
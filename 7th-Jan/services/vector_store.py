@@ -1,18 +1,34 @@
-import chromadb
-from chromadb.config import Settings
+import hashlib
 import numpy as np
 import os
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from typing import List, Dict, Any, Optional, Sequence, Union
 from config import settings
+from services.lexical_index import BM25Index
 import json
 
 logger = logging.getLogger(__name__)
 
+
+def make_document_id(content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Deterministic id from the content and its metadata (e.g. the source it came
+    from), so re-ingesting the same document maps onto the same record
+    """
+    canonical = json.dumps(metadata or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{content}\0{canonical}".encode("utf-8")).hexdigest()[:32]
+
 class ChromaVectorStore:
     """Vector store using ChromaDB for similarity search (Windows compatible)"""
     
+    name = "chroma"
+    
     def __init__(self):
+        # Imported here: chromadb alone takes about a second to import
+        import chromadb
+        from chromadb.config import Settings
+        
         self.db_path = settings.CHROMA_DB_PATH
         self.dimension = settings.EMBEDDING_DIMENSION
         
@@ -31,105 +47,299 @@ class ChromaVectorStore:
             metadata={"hnsw:space": "cosine"}  # Cosine similarity
         )
         
-        # Track document count
+        # Track document count (counted once here, then maintained locally)
         self.document_count = self.collection.count()
         
+        # Bumped by every write, so result caches know when they are stale
+        self.version = 0
+        
+        # Largest batch a single collection.add accepts
+        self.max_batch_size = self.client.get_max_batch_size()
+        
+        # BM25 index over the stored documents, built on first keyword search
+        self._lexical_index: Optional[BM25Index] = None
+        self._lexical_lock = threading.Lock()
+        
         logger.info(f"ChromaDB initialized at {self.db_path} with {self.document_count} documents")
     
     def add_documents(self, documents: List[str], embeddings: List[List[float]], 
-                     metadata_list: Optional[List[Dict[str, Any]]] = None):
+                     metadata_list: Optional[List[Dict[str, Any]]] = None,
+                     ids: Optional[List[str]] = None):
         """
-        Add documents to the vector store
+        Add documents to the vector store (upsert: adding the same document twice
+        stores it once)
         
         Args:
             documents: List of document texts
             embeddings: List of embeddings for each document
             metadata_list: Optional list of metadata dictionaries
+            ids: Optional ids; by default derived from content and metadata
         """
         if metadata_list is None:
             metadata_list = [{} for _ in documents]
         
-        # Generate unique IDs for each document
-        import uuid
-        ids = [str(uuid.uuid4()) for _ in documents]
+        if ids is None:
+            ids = [make_document_id(doc, meta) for doc, meta in zip(documents, metadata_list)]
         
-        # Add to ChromaDB collection
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=documents,
-            metadatas=metadata_list
-        )
+        # Chroma rejects repeated ids within one call; keep the first of each
+        first: Dict[str, int] = {}
+        for i, doc_id in enumerate(ids):
+            first.setdefault(doc_id, i)
+        if len(first) < len(ids):
+            first = list(first.values())
+            ids = [ids[i] for i in first]
+            documents = [documents[i] for i in first]
+            embeddings = [embeddings[i] for i in first]
+            metadata_list = [metadata_list[i] for i in first]
         
-        # Update document count
-        self.document_count = self.collection.count()
+        new_ids = len(ids) - len(self.existing_ids(ids))
+        
+        # Upsert into ChromaDB collection, in slices no larger than it accepts
+        metadatas = [metadata or None for metadata in metadata_list]  # Chroma rejects empty dicts
+        for start in range(0, len(ids), self.max_batch_size):
+            end = start + self.max_batch_size
+            self.collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=documents[start:end],
+                metadatas=metadatas[start:end]
+            )
+        
+        # Update document count locally rather than with a count() round-trip
+        self.document_count += new_ids
+        self.version += 1
+        
+        # Keep the lexical index in step (if it has not been built yet it will
+        # pick these up from the collection when it is)
+        with self._lexical_lock:
+            if self._lexical_index is not None:
+                self._lexical_index.add(ids, documents)
         
         logger.info(f"Added {len(documents)} documents to vector store. Total: {self.document_count}")
         
         return ids
     
-    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Tuple[int, float]]:
+    def add_batch(self, embeddings, texts: Sequence[str],
+                  metadata_list: Optional[Sequence[Dict[str, Any]]] = None,
+                  ids: Optional[Sequence[str]] = None) -> List[str]:
+        """VectorBackend.add_batch"""
+        return self.add_documents(list(texts), embeddings,
+                                  list(metadata_list) if metadata_list is not None else None,
+                                  list(ids) if ids is not None else None)
+    
+    def delete(self, ids: Sequence[str]) -> int:
+        """Remove documents by id; returns how many existed"""
+        existing = list(self.existing_ids(list(dict.fromkeys(ids))))
+        for start in range(0, len(existing), self.max_batch_size):
+            self.collection.delete(ids=existing[start:start + self.max_batch_size])
+        if existing:
+            self.document_count -= len(existing)
+            self.version += 1
+            with self._lexical_lock:
+                if self._lexical_index is not None:
+                    self._lexical_index.remove(existing)
+        return len(existing)
+    
+    def existing_ids(self, ids: List[str]) -> set:
+        """The subset of `ids` already stored (an id-only lookup, no documents or vectors)"""
+        found = set()
+        for start in range(0, len(ids), self.max_batch_size):
+            found.update(self.collection.get(ids=ids[start:start + self.max_batch_size], include=[])['ids'])
+        return found
+    
+    def search(self, query_embedding: Union[np.ndarray, List[float]], top_k: int = 5,
+               where: Optional[Dict[str, Any]] = None,
+               include_embeddings: bool = False) -> List[Dict[str, Any]]:
         """
         Search for similar documents
         
         Args:
-            query_embedding: Query embedding vector
+            query_embedding: Query embedding vector (float32 arrays are passed through as-is)
             top_k: Number of results to return
+            where: Optional Chroma metadata filter, applied inside the query
+            include_embeddings: Also return each hit's stored embedding
             
         Returns:
-            List of tuples (index, similarity_score)
+            List of dicts with id, content, metadata and similarity, best first
         """
         if self.document_count == 0:
             return []
         
         try:
-            # Search in ChromaDB
+            # One query returns everything needed; no follow-up fetches
             results = self.collection.query(
-                query_embeddings=[query_embedding],
+                query_embeddings=np.asarray(query_embedding, dtype=np.float32).reshape(1, -1),
                 n_results=min(top_k, self.document_count),
-                include=["documents", "metadatas", "distances"]
+                where=where or None,
+                include=["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
             )
             
             search_results = []
             
-            if results['distances'] and results['distances'][0]:
-                for i, (distance, doc, metadata) in enumerate(zip(
+            if results['ids'] and results['ids'][0]:
+                for doc_id, distance, doc, metadata in zip(
+                    results['ids'][0],
                     results['distances'][0],
                     results['documents'][0],
                     results['metadatas'][0]
-                )):
-                    # Convert distance to similarity score
-                    # ChromaDB returns cosine distance (0-2), convert to similarity (0-1)
-                    similarity = 1 - (distance / 2) if distance is not None else 0.0
-                    
-                    # We need to return the index, but ChromaDB doesn't give us the original index
-                    # We'll use the position in results as a pseudo-index
-                    search_results.append((i, float(similarity)))
+                ):
+                    # ChromaDB returns cosine distance (0-2); similarity is plain cosine (-1-1),
+                    # as in search_batch and the VectorBackend protocol
+                    similarity = 1 - distance if distance is not None else 0.0
+                    search_results.append({
+                        "id": doc_id,
+                        "content": doc or "",
+                        "metadata": metadata or {},
+                        "similarity": float(similarity)
+                    })
+                if include_embeddings:
+                    for result, embedding in zip(search_results, results['embeddings'][0]):
+                        result["embedding"] = embedding
             
             return search_results
             
+        except ValueError:
+            raise  # Invalid filter: the caller's error, not the store's
         except Exception as e:
             logger.error(f"Search error: {str(e)}")
             return []
     
-    def get_document(self, result_index: int) -> Tuple[str, Dict[str, Any]]:
-        """Get document and metadata by result index"""
-        try:
-            # Get all documents from the collection
-            all_docs = self.collection.get()
+    def search_batch(self, query_vectors, top_k: int = 5,
+                     where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        VectorBackend.search_batch: every query in one collection.query call.
+        Similarities are cosine, as in search().
+        """
+        queries = np.array(query_vectors, dtype=np.float32, ndmin=2)
+        if self.document_count == 0 or len(queries) == 0:
+            return [[] for _ in queries]
+        
+        results = self.collection.query(
+            query_embeddings=queries,
+            n_results=min(top_k, self.document_count),
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                {"id": doc_id, "text": doc or "", "metadata": metadata or {}, "similarity": 1.0 - float(distance)}
+                for doc_id, distance, doc, metadata in zip(ids, distances, documents, metadatas)
+            ]
+            for ids, distances, documents, metadatas in zip(
+                results['ids'], results['distances'], results['documents'], results['metadatas']
+            )
+        ]
+    
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index over every stored document, built from the collection on first use"""
+        with self._lexical_lock:
+            if self._lexical_index is None:
+                index = BM25Index()
+                page_size = self.client.get_max_batch_size()
+                offset = 0
+                while True:
+                    page = self.collection.get(limit=page_size, offset=offset, include=["documents"])
+                    if not page['ids']:
+                        break
+                    index.add(page['ids'], [doc or "" for doc in page['documents']])
+                    offset += len(page['ids'])
+                self._lexical_index = index
+                logger.info(f"Built lexical index over {len(index)} documents")
+            return self._lexical_index
+    
+    def lexical_search(self, query: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+                       query_embedding: Optional[Union[np.ndarray, List[float]]] = None,
+                       include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """
+        BM25 keyword search
+        
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            where: Optional Chroma metadata filter; matching ids are resolved by Chroma
+            query_embedding: If given, each hit's vector similarity is filled in too
+            include_embeddings: Also return each hit's stored embedding
             
-            if result_index < len(all_docs['documents']):
-                return (
-                    all_docs['documents'][result_index],
-                    all_docs['metadatas'][result_index] if all_docs['metadatas'] else {}
-                )
-            else:
-                logger.error(f"Document index {result_index} out of range")
-                return "", {}
-                
+        Returns:
+            List of dicts with id, content, metadata, lexical_score and similarity, best first
+        """
+        allowed_ids = None
+        if where:
+            allowed_ids = self.collection.get(where=where, include=[])['ids']
+        
+        hits = self.lexical_index.search(query, top_k=top_k, allowed_ids=allowed_ids)
+        documents = self.get_by_ids([doc_id for doc_id, _ in hits],
+                                    include_embeddings=include_embeddings or query_embedding is not None)
+        
+        results = []
+        for (doc_id, score), document in zip(hits, documents):
+            if document is None:
+                continue
+            embedding = document["embedding"] if include_embeddings else document.pop("embedding", None)
+            document["lexical_score"] = score
+            document["similarity"] = (
+                self._similarity(query_embedding, embedding)
+                if embedding is not None and query_embedding is not None else None
+            )
+            results.append(document)
+        return results
+    
+    @staticmethod
+    def _similarity(query_embedding: Union[np.ndarray, List[float]], embedding) -> float:
+        """Cosine similarity, the same scale as search()"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        denominator = float(np.linalg.norm(query) * np.linalg.norm(embedding))
+        cosine = float(query @ embedding) / denominator if denominator else 0.0
+        return cosine
+    
+    def get_by_ids(self, ids: List[str], include_embeddings: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch documents by id in one call
+        
+        Returns:
+            One dict with id, content and metadata (and embedding, if asked for) per
+            requested id (None if missing), in the order requested
+        """
+        if not ids:
+            return []
+        
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        try:
+            found = self.collection.get(ids=ids, include=include)
         except Exception as e:
-            logger.error(f"Error getting document: {str(e)}")
-            return "", {}
+            logger.error(f"Error getting documents: {str(e)}")
+            return [None] * len(ids)
+        
+        by_id = {}
+        for i, doc_id in enumerate(found['ids']):
+            document = {
+                "id": doc_id,
+                "content": found['documents'][i] or "",
+                "metadata": found['metadatas'][i] or {}
+            }
+            if include_embeddings:
+                document["embedding"] = found['embeddings'][i]
+            by_id[doc_id] = document
+        return [by_id.get(doc_id) for doc_id in ids]
+    
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Load the HNSW index into memory by querying it with a stored vector, so the
+        first real search does not pay for it
+        """
+        self.document_count = self.collection.count()
+        if self.document_count == 0:
+            return {"documents": 0}
+        
+        sample = self.collection.peek(limit=1)
+        self.collection.query(
+            query_embeddings=np.asarray(sample['embeddings'][:1], dtype=np.float32),
+            n_results=min(10, self.document_count),
+            include=["distances"]
+        )
+        return {"documents": self.document_count}
     
     def get_info(self) -> Dict[str, Any]:
         """Get information about the vector store"""
@@ -138,7 +348,21 @@ class ChromaVectorStore:
             'embedding_dimension': self.dimension,
             'chroma_db_path': self.db_path,
             'ollama_model': settings.OLLAMA_MODEL,
-            'collection_name': 'documents'
+            'collection_name': 'documents',
+            'lexical_index': self._lexical_index.get_stats() if self._lexical_index is not None else None
+        }
+    
+    def flush(self):
+        """Nothing to do: the persistent client writes through"""
+    
+    def stats(self) -> Dict[str, Any]:
+        """VectorBackend.stats (Chroma does not report its memory use)"""
+        return {
+            "backend": self.name,
+            "documents": self.document_count,
+            "dimension": self.dimension,
+            "memory_bytes": None,
+            "db_path": self.db_path
         }
     
     def clear(self):
@@ -157,8 +381,8 @@ class ChromaVectorStore:
         )
         
         self.document_count = 0
+        self.version += 1
+        with self._lexical_lock:
+            self._lexical_index = BM25Index()
         
         logger.info("Cleared vector store")
-
-# Singleton instance
-vector_store = ChromaVectorStore()
\ No newline at end of file
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Tuple[str, Callable[[], Any]]
+
+
+class WarmupState:
+    """
+    Startup warm-up progress: runs named steps in order and records their
+    timings. Readiness is reported from here, so a worker only takes traffic
+    once every step has succeeded, or every required one has.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # pending -> warming -> ready, degraded (an optional step failed) or failed
+        # (after max_attempts); skipped when warm-up is turned off
+        self.status = "pending"
+        self.attempts = 0
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded", "skipped")
+
+    def skip(self):
+        """Report ready without warming up; the first requests pay the start-up cost"""
+        with self._lock:
+            if self.status == "pending":
+                self.status = "skipped"
+
+    def run(self, steps: List[WarmupStep], retry_seconds: float = 5.0, max_attempts: int = 0,
+            optional: Sequence[str] = ()) -> bool:
+        """
+        Run every step, retrying the whole sequence after a failure (a dependency
+        may still be starting). max_attempts=0 retries until it succeeds.
+
+        Steps named in `optional` are ones the service has a fallback for: while
+        only they fail, the state is "degraded", which counts as ready, and the
+        sequence is still retried in case the dependency comes up.
+        """
+        with self._lock:
+            if self.status in ("warming", "ready", "degraded"):
+                return self.ready
+            self.status = "warming"
+            self.started_at = time.time()
+
+        while True:
+            self.attempts += 1
+            degraded = None
+            try:
+                for name, step in steps:
+                    t0 = time.perf_counter()
+                    try:
+                        result = step()
+                    except Exception as e:
+                        if name not in optional:
+                            raise
+                        degraded = f"{name}: {str(e)}"
+                        continue
+                    self.steps[name] = {
+                        "seconds": round(time.perf_counter() - t0, 3),
+                        "result": result
+                    }
+                    logger.info(f"Warm-up step '{name}' done in {self.steps[name]['seconds']}s")
+            except Exception as e:
+                self.error = f"{name}: {str(e)}"
+                logger.warning(f"Warm-up attempt {self.attempts} failed at {self.error}")
+                if max_attempts and self.attempts >= max_attempts:
+                    self.status = "failed"
+                    self.finished_at = time.time()
+                    return False
+                time.sleep(retry_seconds)
+                continue
+
+            if degraded is not None:
+                self.error = degraded
+                self.status = "degraded"
+                logger.warning(f"Warm-up attempt {self.attempts} degraded at {self.error}")
+                if max_attempts and self.attempts >= max_attempts:
+                    self.finished_at = time.time()
+                    return True
+                time.sleep(retry_seconds)
+                continue
+
+            self.error = None
+            self.status = "ready"
+            self.finished_at = time.time()
+            logger.info(f"Warm-up complete in {self.finished_at - self.started_at:.2f}s")
+            return True
+
+    def start(self, steps: List[WarmupStep], retry_seconds: float = 5.0, max_attempts: int = 0,
+              optional: Sequence[str] = ()) -> threading.Thread:
+        """Run the warm-up on a background thread so the server can answer liveness checks"""
+        thread = threading.Thread(
+            target=self.run,
+            args=(steps, retry_seconds, max_attempts, optional),
+            name="warm-up",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "steps": self.steps,
+            "seconds": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else None
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import numpy as np
+import pytest
+from config import settings
+from services.embedding import OllamaEmbeddingService
+
+DIM = 8
+
+
+class FakeAsyncClient:
+    """Per-item /api/embeddings only, recording how many calls overlap"""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def embeddings(self, model, prompt):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        return {"embedding": [float(len(prompt))] * DIM}
+
+
+class FakeClient:
+    """Multi-input /api/embed that fails any batch holding "bad", plus per-item /api/embeddings"""
+
+    def __init__(self, failures):
+        self.failures = failures  # Per-item failures left before a prompt succeeds
+        self.batches = []
+        self.prompts = []
+
+    def embed(self, model, input):
+        self.batches.append(list(input))
+        if any("bad" in text for text in input):
+            raise ConnectionError("batch dropped")
+        return {"embeddings": [[float(len(text))] * DIM for text in input]}
+
+    def embeddings(self, model, prompt):
+        self.prompts.append(prompt)
+        if self.failures.get(prompt, 0):
+            self.failures[prompt] -= 1
+            raise ConnectionError("item dropped")
+        return {"embedding": [float(len(prompt))] * DIM}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", "")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIM)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_IN_FLIGHT", 3)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 4)
+    service = OllamaEmbeddingService()
+    service.supports_batch_embed = False
+    service._async_client = FakeAsyncClient()
+    return service
+
+
+def test_per_item_fallback_respects_in_flight_limit(service):
+    async def run():
+        # Two concurrent requests share the service-wide limit
+        return await asyncio.gather(
+            service.abatch_generate_embeddings([f"a{i}" for i in range(20)]),
+            service.abatch_generate_embeddings([f"bb{i}" for i in range(20)]),
+        )
+
+    first, second = asyncio.run(run())
+    assert first[0] == [2.0] * DIM and second[0] == [3.0] * DIM
+    assert service.async_client.calls == 40
+    assert service.async_client.peak == 3
+
+
+def test_sync_batches_fall_back_to_retried_items(service, monkeypatch):
+    monkeypatch.setattr("services.embedding.time.sleep", lambda seconds: None)
+    service.supports_batch_embed = True
+    service.client = FakeClient({"bad": 1, "bad-always": service.max_retries + 1})
+    texts = ["a", "bb", "ccc", "dddd", "e", "bad", "bad-always", "ff"]
+
+    embeddings = service.batch_generate_embeddings(texts, max_in_flight=1)
+    assert service.client.batches == [texts[:4], texts[4:]]
+    # Only the failed batch went item by item; a transient error was retried
+    assert service.client.prompts == ["e", "bad", "bad", "bad-always"] + \
+        ["bad-always"] * service.max_retries + ["ff"]
+    assert embeddings[:6] == [[float(len(text))] * DIM for text in texts[:6]]
+    assert embeddings[6] is None and embeddings[7] == [2.0] * DIM
+    assert service.supports_batch_embed
+
+
+def test_query_vector_counts_one_miss_then_hits(service):
+    service.client.embeddings = lambda model, prompt: {"embedding": [1.0] * DIM}
+
+    assert service.generate_query_vector("q").tolist() == [1.0] * DIM
+    assert asyncio.run(service.agenerate_query_vector("r")).tolist() == [1.0] * DIM
+    assert service.generate_query_vector("q") is not None
+    assert asyncio.run(service.agenerate_query_vector("r")) is not None
+    stats = service.cache.get_stats()
+    assert (stats["misses"], stats["memory_hits"]) == (2, 2)
+
+
+def test_disk_cache_is_keyed_on_dimension(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    for dimension in (4, 6):
+        monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", dimension)
+        service = OllamaEmbeddingService()
+        service.client.embeddings = lambda model, prompt: {"embedding": [1.0] * 5}
+        assert len(service.generate_embedding("same text")) == dimension
+
+
+def test_combine_vectors_weights(service):
+    text = [1.0, 0.0, 0.0]
+    combined = service.combine_vectors(text, [0.0, 1.0, 0.0], weight_text=0.5, weight_custom=0.5)
+    np.testing.assert_allclose(combined, [2 ** -0.5, 2 ** -0.5, 0.0], rtol=1e-6)
+    assert combined.dtype == np.float32
+
+    # A scalar weight is shared equally; per-vector weights are used as given
+    shared = service.combine_vectors(text, [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], weight_text=0.0, weight_custom=1.0)
+    np.testing.assert_allclose(shared, [0.0, 2 ** -0.5, 2 ** -0.5], rtol=1e-6)
+    weighted = service.combine_vectors(text, [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], weight_text=0.0, weight_custom=[3.0, 4.0])
+    np.testing.assert_allclose(weighted, [0.0, 0.6, 0.8], rtol=1e-6)
+
+    # Mismatched dimensions use the common prefix; a zero sum stays zero
+    np.testing.assert_allclose(service.combine_vectors(text, [0.0, 1.0]), [0.7 / np.hypot(0.7, 0.3), 0.3 / np.hypot(0.7, 0.3)], rtol=1e-6)
+    assert not service.combine_vectors(text, [-1.0, 0.0, 0.0], weight_text=1.0, weight_custom=1.0).any()
+
+
+@pytest.mark.parametrize("custom, weights", [
+    ([], 0.3),
+    ([[1.0, 0.0], [1.0]], 0.3),
+    ([[[1.0]]], 0.3),
+    ([[1.0, 0.0], [0.0, 1.0]], [0.1, 0.2, 0.3]),
+])
+def test_combine_vectors_rejects_bad_input(service, custom, weights):
+    with pytest.raises(ValueError):
+        service.combine_vectors([1.0, 0.0], custom, weight_custom=weights)
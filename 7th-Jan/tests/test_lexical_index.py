@@ -0,0 +1,46 @@
+import pytest
+from services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_removed_documents_do_not_skew_idf():
+    index = BM25Index()
+    index.add(["a", "b", "c", "d"], ["error in parser", "error in lexer", "error on disk", "all good"])
+    index.remove(["a", "b"])
+
+    assert [doc_id for doc_id, _ in index.search("error")] == ["c"]
+    assert len(index) == 2
+    index.remove(["c"])
+    assert index.search("error") == []
+
+
+def test_tokenize_keeps_compound_tokens_and_their_parts():
+    assert tokenize("See ERR-404 in v1.2, not a/b!") == [
+        "see", "err-404", "err", "404", "in", "v1.2", "v1", "2", "not", "a/b", "a", "b"
+    ]
+
+
+def test_bm25_ranking_and_filters():
+    index = BM25Index()
+    index.add(["a", "b", "c", "a"], [
+        "disk error on node",
+        "disk disk disk full",
+        "the node rebooted after a long and otherwise uneventful disk check",
+        "ignored: the id is already indexed",
+    ])
+
+    assert len(index) == 3
+    assert [doc_id for doc_id, _ in index.search("error")] == ["a"]
+    ranked = index.search("disk node")
+    assert [doc_id for doc_id, _ in ranked] == ["a", "c", "b"]  # Both terms beat repeats of one
+    assert all(score > 0 for _, score in ranked)
+    assert [doc_id for doc_id, _ in index.search("disk node", top_k=1)] == ["a"]
+    assert [doc_id for doc_id, _ in index.search("disk", allowed_ids=["c", "x"])] == ["c"]
+    assert index.search("missing") == [] and index.search("") == []
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=1)
+
+    assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+    assert dict(fused)["b"] == pytest.approx(1 / 3 + 1 / 2)
+    assert reciprocal_rank_fusion([]) == []
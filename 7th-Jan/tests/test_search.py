@@ -0,0 +1,112 @@
+import asyncio
+import json
+import pytest
+from config import settings
+from services.search import SearchService, aiter_lines, collapse_near_duplicates
+from services.vector_store import make_document_id
+
+
+class FakeEmbeddingService:
+    batch_size = 2
+    max_in_flight = 1
+
+    async def abatch_generate_embeddings(self, texts):
+        return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+
+class FakeVectorStore:
+    """The parts of ChromaVectorStore the ingestion path uses, in memory"""
+    max_batch_size = 1000
+
+    def __init__(self):
+        self.documents = {}
+
+    @property
+    def document_count(self):
+        return len(self.documents)
+
+    def existing_ids(self, ids):
+        return {doc_id for doc_id in ids if doc_id in self.documents}
+
+    def add_documents(self, documents, embeddings, metadata_list, ids):
+        for doc, doc_id in zip(documents, ids):
+            self.documents[doc_id] = doc
+
+
+async def stream(lines, chunk_size=7):
+    body = "\n".join(lines).encode()
+    for start in range(0, len(body), chunk_size):
+        yield body[start:start + chunk_size]
+
+
+def test_ndjson_repeats_are_ingested_once(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_WRITE_BATCH_SIZE", 3)
+    store = FakeVectorStore()
+    service = SearchService(FakeEmbeddingService(), store)
+    contents = [f"doc {i}" for i in range(8)] + ["doc 1", "doc 6", "doc 7"]
+    lines = [json.dumps({"content": c, "metadata": {}}) for c in contents]
+
+    result = asyncio.run(service.aingest_ndjson(stream(lines)))
+
+    assert (result["ingested"], result["skipped"]) == (8, 3)
+    assert store.document_count == 8
+    again = asyncio.run(service.aingest_ndjson(stream(lines[:2])))
+    assert (again["ingested"], again["skipped"]) == (0, 2)
+
+
+async def collect(chunks):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+    return [item async for item in aiter_lines(source())]
+
+
+@pytest.mark.parametrize("chunks", [
+    [b'{"a": 1}\n\n{"b": 2}\n  \n{"c": 3}'],
+    [b'{"a"', b': 1}\n', b'\n{"b": 2}', b'\n  \n{"c": ', b'3}'],
+    [bytes([byte]) for byte in b'{"a": 1}\n\n{"b": 2}\n  \n{"c": 3}\n'],
+])
+def test_aiter_lines_across_chunk_boundaries(chunks):
+    assert asyncio.run(collect(chunks)) == [(1, b'{"a": 1}'), (3, b'{"b": 2}'), (5, b'{"c": 3}')]
+
+
+def test_document_ids_are_content_addressed():
+    doc_id = make_document_id("text", {"source": "a", "page": 1})
+
+    assert doc_id == make_document_id("text", {"page": 1, "source": "a"})
+    assert doc_id != make_document_id("text", {"source": "b", "page": 1})
+    assert doc_id != make_document_id("text ", {"source": "a", "page": 1})
+    assert make_document_id("text") == make_document_id("text", {}) and len(doc_id) == 32
+
+
+def test_drop_stored_skips_stored_and_repeated_documents():
+    store = FakeVectorStore()
+    service = SearchService(FakeEmbeddingService(), store)
+    store.documents[make_document_id("old", {})] = "old"
+    seen = {make_document_id("earlier", {})}
+
+    documents, metadata_list, ids, skipped = service._drop_stored(
+        ["old", "new", "new", "new", "earlier"], [{}, {}, {}, {"p": 2}, {}], seen
+    )
+
+    assert (documents, metadata_list, skipped) == (["new", "new"], [{}, {"p": 2}], 3)
+    assert ids == [make_document_id("new", {}), make_document_id("new", {"p": 2})]
+    assert set(ids) <= seen
+
+
+def test_collapse_near_duplicates():
+    results = [
+        {"id": "a", "content": "Disk  full", "embedding": [1.0, 0.0]},
+        {"id": "b", "content": "disk full", "embedding": [0.0, 1.0]},  # Same text
+        {"id": "c", "content": "other", "embedding": [0.99, 0.05]},  # Near vector
+        {"id": "d", "content": "unrelated", "embedding": [0.0, 1.0]},
+        {"id": "e", "content": "no vector"},
+        {"id": "f", "content": "zero", "embedding": [0.0, 0.0]},
+    ]
+
+    kept = collapse_near_duplicates(results, threshold=0.95)
+
+    assert [(hit["id"], hit["duplicates"]) for hit in kept] == [
+        ("a", ["b", "c"]), ("d", []), ("e", []), ("f", [])
+    ]
+    assert all("embedding" not in hit for hit in kept)
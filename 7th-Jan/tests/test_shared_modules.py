@@ -0,0 +1,15 @@
+import os
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SHARED = ["backend.py", "embedding_cache.py", "query_cache.py"]
+
+
+@pytest.mark.parametrize("name", SHARED)
+def test_shared_modules_match_between_projects(name):
+    """Both projects have a top-level `services` package, so these are copies; they must not drift"""
+    copies = []
+    for project in ("7th-Jan", "8th-Jan"):
+        with open(os.path.join(ROOT, project, "services", name), "rb") as f:
+            copies.append(f.read())
+    assert copies[0] == copies[1], f"7th-Jan/services/{name} and 8th-Jan/services/{name} differ"
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from config import settings
+from services.vector_store import ChromaVectorStore
+
+DIM = 8
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_DB_PATH", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", DIM)
+    rng = np.random.default_rng(0)
+    store = ChromaVectorStore()
+    store.add_documents([f"doc {i}" for i in range(20)], rng.normal(size=(20, DIM)).tolist(),
+                        [{"source": f"s{i % 3}"} for i in range(20)], ids=[f"id{i}" for i in range(20)])
+    return store
+
+
+def test_search_and_search_batch_report_the_same_cosine(store):
+    rng = np.random.default_rng(1)
+    queries = rng.normal(size=(3, DIM)).astype(np.float32)
+    batch = store.search_batch(queries, top_k=5)
+    for query, hits in zip(queries, batch):
+        single = store.search(query, top_k=5)
+        assert [hit["id"] for hit in single] == [hit["id"] for hit in hits]
+        np.testing.assert_allclose([hit["similarity"] for hit in single],
+                                   [hit["similarity"] for hit in hits], rtol=1e-6)
+
+    # Cosine: a stored vector scores 1 against itself, its negation about -1
+    stored = np.asarray(store.get_by_ids(["id4"], include_embeddings=True)[0]["embedding"])
+    assert store.search(stored, top_k=1)[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    assert store.search(-stored, top_k=20)[-1]["similarity"] == pytest.approx(-1.0, abs=1e-5)
+    assert store._similarity(stored, -stored) == pytest.approx(-1.0, abs=1e-6)
+
+
+def test_search_returns_ranked_hits_from_one_query(store):
+    stored = store.get_by_ids(["id7"], include_embeddings=True)[0]["embedding"]
+
+    hits = store.search(stored, top_k=4)
+    assert [sorted(hit) for hit in hits] == [["content", "id", "metadata", "similarity"]] * 4
+    assert (hits[0]["id"], hits[0]["content"], hits[0]["metadata"]) == ("id7", "doc 7", {"source": "s1"})
+    assert [hit["similarity"] for hit in hits] == sorted((hit["similarity"] for hit in hits), reverse=True)
+
+    filtered = store.search(stored, top_k=50, where={"source": "s0"}, include_embeddings=True)
+    assert {hit["id"] for hit in filtered} == {f"id{i}" for i in range(0, 20, 3)}
+    assert all(len(hit["embedding"]) == DIM for hit in filtered)
+
+
+def test_get_by_ids_keeps_the_requested_order(store):
+    documents = store.get_by_ids(["id5", "missing", "id2"])
+
+    assert [doc and doc["id"] for doc in documents] == ["id5", None, "id2"]
+    assert documents[0] == {"id": "id5", "content": "doc 5", "metadata": {"source": "s2"}}
+    assert "embedding" not in documents[2]
+    assert store.get_by_ids([]) == []
+
+
+def test_empty_store_searches_return_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_DB_PATH", str(tmp_path / "empty"))
+    store = ChromaVectorStore()
+    assert store.search([1.0] * DIM) == []
+    assert store.search_batch([[1.0] * DIM, [0.0] * DIM]) == [[], []]
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import threading
+from fastapi.testclient import TestClient
+from config import settings
+from services import providers
+from services.warmup import WarmupState
+
+
+def failing(message):
+    def step():
+        raise RuntimeError(message)
+    return step
+
+
+def test_steps_run_in_order_and_report_ready():
+    state = WarmupState()
+    order = []
+    assert state.run([("a", lambda: order.append("a") or 1), ("b", lambda: order.append("b") or 2)])
+    assert order == ["a", "b"]
+    assert state.ready and state.status == "ready"
+    assert {name: step["result"] for name, step in state.steps.items()} == {"a": 1, "b": 2}
+
+
+def test_required_step_retries_then_fails():
+    state = WarmupState()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise RuntimeError("not up yet")
+
+    assert state.run([("store", flaky)], retry_seconds=0, max_attempts=3)
+    assert (state.status, state.attempts, state.error) == ("ready", 2, None)
+
+    state = WarmupState()
+    assert not state.run([("store", failing("down"))], retry_seconds=0, max_attempts=2)
+    assert (state.ready, state.status, state.error) == (False, "failed", "store: down")
+
+
+def test_optional_step_failing_leaves_it_degraded_but_ready():
+    state = WarmupState()
+    assert state.run([("store", lambda: 1), ("model", failing("no ollama"))],
+                     retry_seconds=0, max_attempts=3, optional=("model",))
+    assert (state.ready, state.status, state.attempts) == (True, "degraded", 3)
+    assert state.to_dict()["error"] == "model: no ollama"
+    assert "store" in state.steps and "model" not in state.steps
+
+
+def test_skipped_warmup_is_ready():
+    state = WarmupState()
+    state.skip()
+    assert state.ready and state.to_dict()["status"] == "skipped"
+
+
+def test_ready_endpoint_when_warmup_is_disabled(monkeypatch):
+    import main
+    monkeypatch.setattr(settings, "WARMUP_ON_STARTUP", False)
+    monkeypatch.setattr(providers, "_warmup_state", WarmupState())
+    with TestClient(main.app) as client:
+        response = client.get("/api/v1/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "skipped"
+
+
+def test_providers_build_each_service_once(monkeypatch):
+    monkeypatch.setattr(providers, "_instances", {})
+    built = []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        built.append(1)
+        return object()
+
+    def get():
+        barrier.wait()
+        return providers._get("thing", factory)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and len({id(result) for result in results}) == 1
+
+
+def test_importing_the_api_does_not_load_backends():
+    script = "import sys, main; print(sorted({'chromadb', 'ollama'} & set(sys.modules)))"
+    child = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert child.stdout.strip().splitlines()[-1] == "[]"
@@ -1,18 +1,23 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
+import asyncio
 import os
 import shutil
+import tempfile
 from datetime import datetime
 
 from models.schemas import (
-    SearchRequest, SearchResponse, PDFUploadResponse, HealthResponse
+    SearchRequest, SearchResponse, PDFUploadResponse, HealthResponse,
+    BatchSearchRequest, BatchSearchResponse, IngestionJobResponse, PDFDeleteResponse
 )
 from services.search import SearchService
-from services.vector_store import VectorStore
+from services.jobs import IngestionJobManager, QueueFullError, JobConflictError
+from services.chunker import validate_window
 
 router = APIRouter(tags=["Search"])
 search_service = SearchService()
-vector_store = VectorStore()
+ingestion_jobs = IngestionJobManager()
 
 @router.post("/search", response_model=SearchResponse)
 async def search_documents(request: SearchRequest):
@@ -24,7 +29,9 @@ async def search_documents(request: SearchRequest):
     - **pdf_filter**: Filter results by specific PDF filename
     """
     try:
-        results = search_service.search_documents(
+        # With SEARCH_SHARDS set this waits on the shard workers; keep the event loop free
+        results = await run_in_threadpool(
+            search_service.search_documents,
             query=request.query,
             top_k=request.top_k,
             pdf_filter=request.pdf_filter
@@ -33,11 +40,33 @@ async def search_documents(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(request: BatchSearchRequest):
+    """
+    Search with many queries in one request
+    
+    - **queries**: List of search query texts, embedded and scored together
+    - **top_k**: Number of results to return per query (default: 5)
+    - **pdf_filter**: Filter results by specific PDF filename
+    """
+    try:
+        # Thousands of queries take a while to score; keep the event loop free meanwhile
+        results = await run_in_threadpool(
+            search_service.search_many,
+            queries=request.queries,
+            top_k=request.top_k,
+            pdf_filter=request.pdf_filter
+        )
+        return results
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
 @router.post("/upload-pdf", response_model=PDFUploadResponse)
 async def upload_pdf(
     file: UploadFile = File(..., description="PDF file to upload and index"),
-    chunk_size: int = Query(500, description="Chunk size in characters"),
-    overlap: int = Query(50, description="Overlap between chunks")
+    chunk_size: int = Query(500, description="Chunk size in words"),
+    overlap: int = Query(50, description="Overlap between chunks in words"),
+    wait: bool = Query(False, description="Block until indexing finishes instead of returning a job id")
 ):
     """
     Upload and index a PDF document
@@ -47,39 +76,125 @@ async def upload_pdf(
     2. Extracted text content
     3. Split into chunks
     4. Embedded and indexed in vector database
+    
+    Steps 2-4 run as a background job; poll `/jobs/{job_id}` for progress.
+    
+    The upload is kept under a name of its own until it is indexed, then moved
+    over any saved file of that name. Uploading a file with the name of one
+    already indexed replaces its chunks once the new ones are embedded; until
+    then searches keep returning the old chunks. A second upload of a name
+    whose job is still pending is refused with 409.
     """
     try:
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        try:
+            validate_window(chunk_size, overlap)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Create upload directory
         upload_dir = "data/uploaded_pdfs"
         os.makedirs(upload_dir, exist_ok=True)
         
-        # Save file
+        # Save file where no other upload or job touches it
         file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        fd, upload_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".pdf")
+        def save_upload():
+            with os.fdopen(fd, "wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+        
+        def index(progress):
+            try:
+                total_chunks = search_service.process_and_index_pdf(
+                    upload_path, chunk_size=chunk_size, overlap=overlap, progress=progress,
+                    pdf_name=file.filename
+                )
+                os.replace(upload_path, file_path)
+                return total_chunks
+            finally:
+                if os.path.exists(upload_path):
+                    os.remove(upload_path)
+        
+        try:
+            await run_in_threadpool(save_upload)
+            # Process and index PDF on the bounded ingestion pool
+            job = ingestion_jobs.submit(file.filename, index)
+        except Exception:
+            os.remove(upload_path)
+            raise
         
-        # Process and index PDF
-        total_chunks = search_service.process_and_index_pdf(file_path)
+        if not wait:
+            return PDFUploadResponse(
+                message="PDF uploaded and queued for indexing",
+                filename=file.filename,
+                total_chunks=0,
+                processed_at=datetime.now(),
+                job_id=job.job_id,
+                status=job.status
+            )
         
+        total_chunks = await asyncio.wrap_future(job.future)
         return PDFUploadResponse(
             message="PDF uploaded and indexed successfully",
             filename=file.filename,
             total_chunks=total_chunks,
-            processed_at=datetime.now()
+            processed_at=datetime.now(),
+            job_id=job.job_id,
+            status=job.status
         )
         
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Upload rejected: {str(e)}")
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=f"Upload rejected: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@router.delete("/pdf/{filename}", response_model=PDFDeleteResponse)
+async def delete_pdf(filename: str):
+    """
+    Remove an uploaded PDF and all of its chunks from the index
+    
+    Refused with 409 while the PDF has an ingestion job queued or running, which
+    would otherwise keep indexing chunks after they were deleted.
+    """
+    filename = os.path.basename(filename)
+    file_path = os.path.join("data/uploaded_pdfs", filename)
+    
+    def delete():
+        with ingestion_jobs.exclusive(filename):
+            deleted_chunks = search_service.delete_pdf(filename)
+            file_removed = os.path.isfile(file_path)
+            if file_removed:
+                os.remove(file_path)
+            return deleted_chunks, file_removed
+    
+    try:
+        deleted_chunks, file_removed = await run_in_threadpool(delete)
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=f"Delete rejected: {str(e)}")
+    
+    if not deleted_chunks and not file_removed:
+        raise HTTPException(status_code=404, detail=f"PDF {filename} not found")
+    return PDFDeleteResponse(filename=filename, deleted_chunks=deleted_chunks, file_removed=file_removed)
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_job(job_id: str):
+    """Progress of a background PDF ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Check API and vector database health"""
     try:
-        stats = vector_store.get_stats()
+        stats = search_service.vector_store.get_stats()
         return HealthResponse(
             status="healthy",
             vector_db_connected=True,
@@ -97,9 +212,13 @@ async def health_check():
 @router.get("/stats")
 async def get_statistics():
     """Get search statistics"""
-    stats = vector_store.get_stats()
+    stats = search_service.vector_store.get_stats()
     return {
         "vector_store_stats": stats,
+        "ingestion_jobs": ingestion_jobs.get_stats(),
+        "embedding_cache": search_service.embedding_service.cache.get_stats(),
+        "query_cache": search_service.query_cache.get_stats(),
+        "sharded_search": search_service.sharded_search.get_stats() if search_service.sharded_search else None,
         "timestamp": datetime.now(),
         "service": "PDF Vector Search"
     }
\ No newline at end of file
@@ -1,7 +1,14 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
-from api.endpoints import router as api_router
+from api.endpoints import router as api_router, search_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Write index changes the periodic save has not picked up yet
+    search_service.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -9,7 +16,8 @@ app = FastAPI(
     description="API for searching through PDF documents using vector embeddings",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -50,11 +58,21 @@ async def root():
                 <strong>/api/v1/upload-pdf</strong> - Upload and index a PDF
             </div>
             
+            <div class="endpoint">
+                <span class="method get">GET</span>
+                <strong>/api/v1/jobs/{job_id}</strong> - Check PDF indexing progress
+            </div>
+            
             <div class="endpoint">
                 <span class="method post">POST</span>
                 <strong>/api/v1/search</strong> - Search through indexed documents
             </div>
             
+            <div class="endpoint">
+                <span class="method post">POST</span>
+                <strong>/api/v1/search/batch</strong> - Run many search queries in one request
+            </div>
+            
             <div class="endpoint">
                 <span class="method get">GET</span>
                 <strong>/api/v1/health</strong> - Check API health
@@ -83,7 +101,9 @@ async def test_endpoint():
         "timestamp": "2024-01-08",
         "endpoints": [
             {"method": "POST", "path": "/api/v1/upload-pdf", "desc": "Upload PDF"},
+            {"method": "GET", "path": "/api/v1/jobs/{job_id}", "desc": "Indexing job progress"},
             {"method": "POST", "path": "/api/v1/search", "desc": "Search documents"},
+            {"method": "POST", "path": "/api/v1/search/batch", "desc": "Batch search documents"},
             {"method": "GET", "path": "/docs", "desc": "API Documentation"}
         ]
     }
@@ -0,0 +1,78 @@
+"""
+Recall@k vs. latency of the IVF index against exact brute-force search.
+
+Data is a Gaussian mixture (real embeddings are clustered; uniform noise is
+a worst case for any partitioning index).
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_ann.py
+    python benchmarks/bench_ann.py --size 1000000 --nprobe 4 16 64
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vector_store import VectorStore  # noqa: E402
+
+
+def clustered_vectors(rng, n, dimension, n_clusters=256, spread=0.3):
+    centers = rng.normal(size=(n_clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, n)
+    return centers[labels] + spread * rng.normal(size=(n, dimension)).astype(np.float32)
+
+
+def timed_search(store, queries, top_k, **kwargs):
+    ids, latencies = [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        results = store.search(query, top_k=top_k, **kwargs)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ids.append({r["id"] for r in results})
+    return ids, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng, args.size, args.dimension)
+    queries = clustered_vectors(rng, args.queries, args.dimension)
+    texts = [""] * args.size
+    metas = [{} for _ in range(args.size)]
+
+    exact = VectorStore(dimension=args.dimension)
+    exact.add_documents(vectors, texts, metas)
+
+    t0 = time.perf_counter()
+    ann = VectorStore(dimension=args.dimension, index_type="ivf", n_lists=args.n_lists,
+                      ann_train_size=args.size)
+    ann.add_documents(vectors, texts, metas)
+    build_s = time.perf_counter() - t0
+
+    truth, exact_lat = timed_search(exact, queries, args.top_k)
+    stats = ann.get_stats()["ann_index"]
+    print(f"{args.size} vectors, dim {args.dimension}, n_lists {stats['n_lists']}, build {build_s:.1f}s")
+    print(f"{'mode':<12} {'recall@k':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    print(f"{'exact':<12} {1.0:>9.3f} {np.percentile(exact_lat, 50):>9.3f} {np.percentile(exact_lat, 99):>9.3f}")
+
+    for nprobe in args.nprobe:
+        found, lat = timed_search(ann, queries, args.top_k, nprobe=nprobe)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"{'nprobe=' + str(nprobe):<12} {recall:>9.3f} {np.percentile(lat, 50):>9.3f} "
+              f"{np.percentile(lat, 99):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Run the same workload against every VectorBackend (services/backend.py):
+ingest rate, single-query and batched QPS, recall@k against exact search,
+delete latency and memory.
+
+Backends:
+    numpy       VectorStore, in-memory brute force (8th-Jan)
+    numpy-mmap  MmapVectorStore, flushed to disk and searched memory-mapped (8th-Jan)
+    chroma      ChromaVectorStore, HNSW in a temporary database (7th-Jan)
+
+Both projects have a top-level `services` package, so each backend runs in its
+own subprocess with only its project on sys.path; ru_maxrss then reflects that
+backend alone. The corpus is clustered random vectors generated from a fixed
+seed, so every backend sees the same data and no embedding model is needed.
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --docs 20000 --backends numpy chroma --top-k 5
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROJECTS = {"numpy": "8th-Jan", "numpy-mmap": "8th-Jan", "chroma": "7th-Jan"}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024)
+
+
+def make_workload(docs: int, dimension: int, queries: int, clusters: int = 256, seed: int = 0):
+    """Clustered corpus plus queries drawn near it, both float32"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    corpus = centers[rng.integers(0, clusters, docs)] + 0.5 * rng.normal(size=(docs, dimension)).astype(np.float32)
+    picks = corpus[rng.integers(0, docs, queries)]
+    query_vectors = picks + 0.5 * rng.normal(size=(queries, dimension)).astype(np.float32)
+    return corpus, query_vectors
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, top_k: int, block_size: int = 64) -> np.ndarray:
+    """Ground-truth row ids by cosine similarity, a block of queries at a time"""
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = []
+    for start in range(0, len(queries), block_size):
+        scores = queries[start:start + block_size] @ corpus.T
+        truth.append(np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k])
+    return np.concatenate(truth)
+
+
+def open_backend(name: str, directory: str, dimension: int):
+    sys.path.insert(0, os.path.join(ROOT, PROJECTS[name]))
+    if name == "chroma":
+        os.environ["CHROMA_DB_PATH"] = directory
+        os.environ["EMBEDDING_DIMENSION"] = str(dimension)
+        from services.vector_store import ChromaVectorStore
+        backend = ChromaVectorStore()
+    elif name == "numpy-mmap":
+        from services.vector_store import MmapVectorStore
+        backend = MmapVectorStore.open(os.path.join(directory, "index"))
+    else:
+        from services.vector_store import VectorStore
+        backend = VectorStore()
+
+    from services.backend import VectorBackend
+    if not isinstance(backend, VectorBackend):
+        raise TypeError(f"{type(backend).__name__} does not implement VectorBackend")
+    return backend
+
+
+def run_single(name: str, args) -> dict:
+    corpus, queries = make_workload(args.docs, args.dimension, args.queries)
+    truth = exact_top_k(corpus, queries, args.top_k)
+    ids = [str(row) for row in range(args.docs)]
+    texts = [f"document {row}" for row in range(args.docs)]
+    metadata = [{"source_pdf": f"doc_{row % 100}.pdf"} for row in range(args.docs)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = open_backend(name, directory, args.dimension)
+
+        start = time.perf_counter()
+        for offset in range(0, args.docs, args.batch_size):
+            end = offset + args.batch_size
+            backend.add_batch(corpus[offset:end], texts[offset:end], metadata[offset:end], ids=ids[offset:end])
+        backend.flush()
+        ingest_s = time.perf_counter() - start
+
+        backend.search_batch(queries[:1], top_k=args.top_k)  # Warm-up
+        latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            backend.search_batch(query[None], top_k=args.top_k)
+            latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        hits = []
+        for offset in range(0, len(queries), args.query_batch):
+            hits.extend(backend.search_batch(queries[offset:offset + args.query_batch], top_k=args.top_k))
+        batch_s = time.perf_counter() - start
+
+        recall = np.mean([
+            len({hit["id"] for hit in found} & {str(row) for row in expected}) / args.top_k
+            for found, expected in zip(hits, truth)
+        ])
+        stats = backend.stats()
+
+        doomed = ids[::100]
+        start = time.perf_counter()
+        deleted = backend.delete(doomed)
+        backend.flush()
+        delete_ms = (time.perf_counter() - start) * 1000
+
+    memory_bytes = stats.get("memory_bytes")
+    return {
+        "backend": name,
+        "docs": args.docs,
+        "ingest_docs_per_s": round(args.docs / ingest_s),
+        "qps_single": round(len(queries) / sum(latencies), 1),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "qps_batch": round(len(queries) / batch_s, 1),
+        f"recall@{args.top_k}": round(float(recall), 4),
+        "delete_ms": round(delete_ms, 1),
+        "deleted": deleted,
+        "store_mb": round(memory_bytes / (1024 * 1024), 1) if memory_bytes is not None else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(PROJECTS), choices=list(PROJECTS))
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per add_batch call")
+    parser.add_argument("--query-batch", type=int, default=64, help="queries per batched search_batch call")
+    parser.add_argument("--single", metavar="BACKEND", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.single, args)))
+        return
+
+    columns = ["backend", "ingest_docs_per_s", "qps_single", "p99_ms", "qps_batch",
+               f"recall@{args.top_k}", "delete_ms", "store_mb", "peak_rss_mb"]
+    print(f"{args.docs} documents x {args.dimension} dims, {args.queries} queries")
+    print("".join(f"{column:>18}" for column in columns))
+    for name in args.backends:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", name,
+             "--docs", str(args.docs), "--dimension", str(args.dimension), "--queries", str(args.queries),
+             "--top-k", str(args.top_k), "--batch-size", str(args.batch_size), "--query-batch", str(args.query_batch)],
+            capture_output=True, text=True, cwd=os.path.join(ROOT, PROJECTS[name])
+        )
+        if proc.returncode != 0:
+            print(f"{name:>18} failed: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print("".join(f"{str(result[column]):>18}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Chunking throughput in MB/s: the old split/join chunker vs. the offset-based
+chunker, per page and streaming across page boundaries.
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_chunker.py
+    python benchmarks/bench_chunker.py --pages 2000 --chunk-size 200 --overlap 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chunker import split_text, iter_page_chunks  # noqa: E402
+
+
+def legacy_split(text, chunk_size, overlap):
+    words = text.split()
+    chunks = []
+    for i in range(0, len(words), chunk_size - overlap):
+        chunks.append(' '.join(words[i:i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    return chunks
+
+
+def make_pages(n_pages, words_per_page, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(["lorem", "ipsum", "dolor", "sit", "amet", "vector", "search", "embedding",
+                           "página", "chunk", "overlap", "index", "manual", "section", "2024-01-08"])
+    pages = []
+    for page in range(n_pages):
+        words = vocabulary[rng.integers(0, len(vocabulary), words_per_page)]
+        lines = [" ".join(words[i:i + 12]) for i in range(0, words_per_page, 12)]
+        pages.append({"text": "\n".join(lines), "page_number": page + 1})
+    return pages
+
+
+def measure(name, fn, megabytes, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        count = fn()
+        best = min(best, time.perf_counter() - t0)
+    print(f"{name:<28} {count:>8} chunks {megabytes / best:>9.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--words-per-page", type=int, default=600)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.words_per_page)
+    megabytes = sum(len(p["text"].encode("utf-8")) for p in pages) / 1e6
+    print(f"{args.pages} pages, {megabytes:.1f} MB, chunk_size={args.chunk_size}, overlap={args.overlap}")
+
+    size, overlap = args.chunk_size, args.overlap
+    measure("legacy split/join per page", lambda: sum(len(legacy_split(p["text"], size, overlap)) for p in pages),
+            megabytes, args.repeat)
+    measure("offset spans per page", lambda: sum(len(split_text(p["text"], size, overlap)) for p in pages),
+            megabytes, args.repeat)
+    measure("streaming across pages", lambda: sum(1 for _ in iter_page_chunks(pages, size, overlap)),
+            megabytes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
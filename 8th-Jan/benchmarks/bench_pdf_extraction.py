@@ -0,0 +1,75 @@
+"""
+Pages/sec of PDFProcessor.iter_pages against the number of worker processes.
+
+Without --pdf a synthetic text PDF is generated (PyPDF2 cannot author text,
+so the PDF objects are written by hand).
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_pdf_extraction.py --pages 400
+    python benchmarks/bench_pdf_extraction.py --pdf manual.pdf --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.pdf_processor import PDFProcessor  # noqa: E402
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 45):
+    """Minimal PDF with one Helvetica text stream per page"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"({page + 1}.{line} The quick brown fox jumps over the lazy dog near section {line}) Tj T*"
+                 for line in range(lines_per_page)]
+        content = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to extract (default: generate one)")
+    parser.add_argument("--pages", type=int, default=400, help="pages in the generated PDF")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--pages-per-shard", type=int, default=8)
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if pdf_path is None:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+        write_text_pdf(pdf_path, args.pages)
+
+    print(f"{'workers':>8} {'pages':>7} {'seconds':>9} {'pages/s':>9}")
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        pages = sum(1 for _ in PDFProcessor.iter_pages(pdf_path, workers=workers,
+                                                        pages_per_shard=args.pages_per_shard))
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:>8} {pages:>7} {elapsed:>9.2f} {pages / elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
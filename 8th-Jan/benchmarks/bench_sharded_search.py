@@ -0,0 +1,86 @@
+"""
+Measure whole-corpus search in-process against ShardedSearch with 1..N worker
+processes: QPS and p50/p99 latency for single queries, QPS for query batches,
+and whether the sharded top-k matches the in-process one.
+
+Sharding pays off once a query's scoring outweighs the pipe round trip to the
+workers, i.e. on large corpora, and only up to the number of physical cores.
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_sharded_search.py
+    python benchmarks/bench_sharded_search.py --docs 500000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.sharded_search import ShardedSearch  # noqa: E402
+from services.vector_store import VectorStore  # noqa: E402
+
+
+def measure(search_many, queries: np.ndarray, top_k: int, query_batch: int):
+    search_many(queries[:1], top_k)  # Warm-up (starts and syncs the shards)
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        search_many(query[None], top_k)
+        latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    hits = []
+    for offset in range(0, len(queries), query_batch):
+        hits.extend(search_many(queries[offset:offset + query_batch], top_k))
+    batch_s = time.perf_counter() - start
+    return {
+        "qps_single": round(len(queries) / sum(latencies), 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "qps_batch": round(len(queries) / batch_s, 1),
+    }, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--query-batch", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = VectorStore(initial_capacity=args.docs)
+    for offset in range(0, args.docs, 10_000):
+        n = min(10_000, args.docs - offset)
+        store.add_documents(rng.normal(size=(n, args.dimension)).astype(np.float32),
+                            [f"document {offset + i}" for i in range(n)],
+                            [{"source_pdf": f"doc_{(offset + i) % 100}.pdf"} for i in range(n)])
+    queries = rng.normal(size=(args.queries, args.dimension)).astype(np.float32)
+
+    columns = ["mode", "qps_single", "p50_ms", "p99_ms", "qps_batch", "matches"]
+    print(f"{args.docs} documents x {args.dimension} dims, {args.queries} queries, {os.cpu_count()} CPUs")
+    print("".join(f"{column:>14}" for column in columns))
+
+    result, expected = measure(lambda q, k: store.search_many(q, top_k=k), queries, args.top_k, args.query_batch)
+    expected_ids = [[hit["id"] for hit in hits] for hits in expected]
+    print("".join(f"{str(value):>14}" for value in ["in-process", *result.values(), "-"]))
+
+    for workers in args.workers:
+        sharded = ShardedSearch(store, workers=workers)
+        try:
+            result, hits = measure(lambda q, k: sharded.search_many(q, top_k=k), queries, args.top_k, args.query_batch)
+        finally:
+            sharded.close()
+        matches = np.mean([[hit["id"] for hit in found] == want for found, want in zip(hits, expected_ids)])
+        print("".join(f"{str(value):>14}" for value in [f"{workers} workers", *result.values(), f"{matches:.0%}"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark VectorStore query latency and peak RSS: list-of-lists (before)
+vs. the preallocated float32 matrix (after), plus the int8 storage mode.
+
+Each (implementation, size) pair runs in its own subprocess so ru_maxrss
+reflects only that configuration.
+
+Usage (from the 8th-Jan directory):
+    python benchmarks/bench_vector_store.py
+    python benchmarks/bench_vector_store.py --sizes 10000 100000 --queries 50
+
+Note: the legacy store at 1M x 384 holds ~400M Python floats and needs
+well over 10 GB of RAM; pass --sizes to skip it on smaller machines.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DIMENSION = 384
+
+
+class LegacyVectorStore:
+    """The original list-based store, kept here for comparison only"""
+
+    def __init__(self):
+        self.vectors = []
+        self.metadata = []
+        self.documents = []
+
+    def add_document(self, embedding, text, metadata):
+        self.vectors.append(embedding)
+        self.documents.append(text)
+        self.metadata.append(metadata)
+
+    def search(self, query_vector, top_k=5, pdf_filter=None):
+        query_vec = np.array(query_vector)
+        vectors = np.array(self.vectors)
+        similarities = np.dot(vectors, query_vec) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vec)
+        )
+        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        return [{"id": idx, "similarity": float(similarities[idx])} for idx in top_indices]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / (1024 * 1024)
+
+
+def run_single(impl: str, size: int, queries: int, top_k: int) -> dict:
+    rng = np.random.default_rng(0)
+    batch = 10000
+
+    if impl == "legacy":
+        store = LegacyVectorStore()
+    else:
+        from services.vector_store import VectorStore
+        store = VectorStore(dimension=DIMENSION, storage="int8" if impl == "int8" else "float32")
+
+    start = time.perf_counter()
+    for offset in range(0, size, batch):
+        n = min(batch, size - offset)
+        block = rng.random((n, DIMENSION), dtype=np.float32)
+        metas = [{"source_pdf": f"doc_{(offset + i) % 100}.pdf"} for i in range(n)]
+        texts = [""] * n
+        if impl == "legacy":
+            for row, text, meta in zip(block.tolist(), texts, metas):
+                store.add_document(row, text, meta)
+        else:
+            store.add_documents(block, texts, metas)
+    ingest_s = time.perf_counter() - start
+
+    query_vectors = rng.random((queries, DIMENSION), dtype=np.float32)
+    if impl == "legacy":
+        query_vectors = query_vectors.tolist()
+
+    store.search(query_vectors[0], top_k=top_k)  # warm-up
+    latencies = []
+    for q in query_vectors:
+        t0 = time.perf_counter()
+        store.search(q, top_k=top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "impl": impl,
+        "size": size,
+        "ingest_s": round(ingest_s, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--impls", nargs="+", default=["legacy", "matrix"], choices=["legacy", "matrix", "int8"])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--single", nargs=2, metavar=("IMPL", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        impl, size = args.single[0], int(args.single[1])
+        print(json.dumps(run_single(impl, size, args.queries, args.top_k)))
+        return
+
+    print(f"{'impl':<8} {'chunks':>10} {'ingest s':>10} {'p50 ms':>10} {'p99 ms':>10} {'peak RSS MB':>12}")
+    for size in args.sizes:
+        for impl in args.impls:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--single", impl, str(size),
+                 "--queries", str(args.queries), "--top-k", str(args.top_k)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"{impl:<8} {size:>10} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{r['impl']:<8} {r['size']:>10} {r['ingest_s']:>10} {r['p50_ms']:>10} "
+                  f"{r['p99_ms']:>10} {r['peak_rss_mb']:>12}")
+
+
+if __name__ == "__main__":
+    main()
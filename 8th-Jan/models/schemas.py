@@ -7,12 +7,37 @@ class PDFUploadResponse(BaseModel):
     filename: str
     total_chunks: int
     processed_at: datetime
+    job_id: Optional[str] = None
+    status: str = "completed"
+
+class PDFDeleteResponse(BaseModel):
+    filename: str
+    deleted_chunks: int
+    file_removed: bool
+
+class IngestionJobResponse(BaseModel):
+    job_id: str
+    filename: str
+    status: str
+    pages_done: int
+    total_pages: int
+    chunks_indexed: int
+    chunks_per_second: float
+    error: Optional[str] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     pdf_filter: Optional[str] = None
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    pdf_filter: Optional[str] = None
+
 class ChunkResult(BaseModel):
     text: str
     similarity_score: float
@@ -27,6 +52,11 @@ class SearchResponse(BaseModel):
     pdf_distribution: Dict[str, int]
     search_time: datetime
 
+class BatchSearchResponse(BaseModel):
+    total_queries: int
+    results: List[SearchResponse]
+    search_duration_ms: float
+
 class HealthResponse(BaseModel):
     status: str
     vector_db_connected: bool
@@ -0,0 +1,121 @@
+from typing import List, Optional
+import numpy as np
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over normalized vectors.
+
+    Vectors are bucketed by their nearest k-means centroid; a query only scores the
+    rows in its `nprobe` closest buckets. The index holds row ids, not vectors, so the
+    owning store keeps a single copy of the embeddings.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, nprobe: int = 8,
+                 n_iter: int = 20, seed: int = 0):
+        self.n_lists = n_lists  # Picked from corpus size at train time when None
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []  # Cached np views of _lists
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, max_train_points: int = 100_000):
+        """Fit centroids with spherical k-means on (a sample of) the vectors"""
+        rng = np.random.default_rng(self.seed)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        n_lists = min(n_lists, len(vectors))
+
+        sample_size = min(len(vectors), max(n_lists * 64, max_train_points))
+        if sample_size < len(vectors):
+            sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        else:
+            sample = vectors
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._nearest(sample, centroids)
+            counts = np.bincount(assignment, minlength=n_lists)
+
+            # Per-cluster sums via one sort + reduceat (np.add.at is far slower)
+            order = np.argsort(assignment, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            sums = np.zeros_like(centroids)
+            filled = counts > 0
+            sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+
+            # Re-seed empty clusters from random points so no list stays dead
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.n_lists = n_lists
+        self.centroids = centroids
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, block_size: int = 16384) -> np.ndarray:
+        """Closest centroid per vector, blocked to bound the score matrix"""
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block_size):
+            scores = vectors[start:start + block_size] @ centroids.T
+            assignment[start:start + block_size] = scores.argmax(axis=1)
+        return assignment
+
+    def add(self, row_ids: np.ndarray, vectors: np.ndarray):
+        """Assign new rows to their buckets; centroids are not retrained"""
+        assignment = self._nearest(vectors, self.centroids)
+        for row, bucket in zip(row_ids.tolist(), assignment.tolist()):
+            rows = self._lists[bucket]
+            if isinstance(rows, np.ndarray):  # Restored from a snapshot
+                rows = self._lists[bucket] = rows.tolist()
+            rows.append(row)
+            self._list_arrays[bucket] = None
+
+    def restore(self, centroids: np.ndarray, buckets: List[np.ndarray]):
+        """Adopt centroids and row id buckets from a snapshot without copying them"""
+        self.centroids = centroids
+        self.n_lists = len(centroids)
+        self._lists = list(buckets)
+        self._list_arrays = list(buckets)
+
+    def _bucket(self, bucket: int) -> np.ndarray:
+        # Buckets only grow, so a cached array of the wrong length is stale (a search
+        # can cache one while a concurrent add appends to the bucket)
+        rows = self._lists[bucket]
+        cached = self._list_arrays[bucket]
+        if cached is None or len(cached) != len(rows):
+            cached = np.asarray(rows, dtype=np.int64)
+            self._list_arrays[bucket] = cached
+        return cached
+
+    def candidates(self, queries: np.ndarray, nprobe: Optional[int] = None) -> List[np.ndarray]:
+        """Row ids in the `nprobe` closest buckets of each query"""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = queries @ self.centroids.T
+        if nprobe < self.n_lists:
+            probes = np.argpartition(centroid_scores, -nprobe, axis=1)[:, -nprobe:]
+        else:
+            probes = np.broadcast_to(np.arange(self.n_lists), centroid_scores.shape)
+        return [
+            np.concatenate([self._bucket(b) for b in query_probes])
+            for query_probes in probes
+        ]
+
+    def get_stats(self) -> dict:
+        sizes = [len(bucket) for bucket in self._lists]
+        return {
+            "n_lists": self.n_lists or 0,
+            "nprobe": self.nprobe,
+            "trained": self.is_trained,
+            "largest_list": max(sizes) if sizes else 0
+        }
@@ -0,0 +1,44 @@
+# Kept identical in 7th-Jan/services and 8th-Jan/services; tests/test_shared_modules.py checks
+"""
+The interface every vector-store backend implements, so stores can be swapped
+behind the services and run through the same benchmarks.
+
+Backends: ChromaVectorStore (7th-Jan), VectorStore (NumPy brute force) and
+MmapVectorStore (NumPy, persisted and memory-mapped) in 8th-Jan.
+"""
+from typing import Any, Dict, List, Optional, Protocol, Sequence, TypedDict, runtime_checkable
+
+
+class Hit(TypedDict):
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+    similarity: float  # Cosine similarity
+
+
+@runtime_checkable
+class VectorBackend(Protocol):
+    name: str
+
+    def add_batch(self, embeddings, texts: Sequence[str],
+                  metadata_list: Optional[Sequence[Dict[str, Any]]] = None,
+                  ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Store documents with their embeddings (an (n, dim) array or list of rows); returns their ids"""
+        ...
+
+    def search_batch(self, query_vectors, top_k: int = 5,
+                     where: Optional[Dict[str, Any]] = None) -> List[List[Hit]]:
+        """Best top_k hits per query, best first; `where` keeps documents whose metadata has those values"""
+        ...
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Remove documents by id; returns how many existed"""
+        ...
+
+    def flush(self) -> None:
+        """Make added and deleted documents durable (a no-op for in-memory backends)"""
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        """At least: backend, documents, dimension and memory_bytes (None if unknown)"""
+        ...
@@ -0,0 +1,138 @@
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+
+# Code points str.split() treats as whitespace (all are below U+3001)
+_WHITESPACE = np.array([c for c in range(0x3001) if chr(c).isspace()], dtype=np.uint32)
+_IS_SPACE = np.zeros(0x3001, dtype=bool)
+_IS_SPACE[_WHITESPACE] = True
+
+
+def _space_mask(codes: np.ndarray) -> np.ndarray:
+    """Whitespace flags for an array of code points (ASCII fast path, table for the rest)"""
+    mask = (codes == 32) | ((codes >= 9) & (codes <= 13)) | ((codes >= 28) & (codes <= 31))
+    high = np.flatnonzero(codes > 127)
+    if len(high):
+        high_codes = codes[high]
+        in_table = high_codes < len(_IS_SPACE)
+        mask[high[in_table]] = _IS_SPACE[high_codes[in_table]]
+    return mask
+
+
+def word_spans(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start/end character offsets of the whitespace-separated words in `text`,
+    found with array ops over the code points instead of building word strings.
+    """
+    # One byte per character when possible, so byte offsets are character offsets
+    try:
+        codes = np.frombuffer(text.encode("latin-1"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+    padded = np.ones(len(codes) + 2, dtype=np.int8)
+    padded[1:-1] = _space_mask(codes)
+    edges = np.diff(padded)  # -1 where a word starts, +1 just past where it ends
+    return np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+
+
+def window_starts(n_words: int, chunk_size: int, overlap: int) -> np.ndarray:
+    """First word of every window; the last window is the first that reaches the end"""
+    validate_window(chunk_size, overlap)
+    if n_words == 0:
+        return np.empty(0, dtype=np.int64)
+    starts = np.arange(0, n_words, chunk_size - overlap)
+    reaches_end = starts + chunk_size >= n_words
+    return starts[:np.argmax(reaches_end) + 1]
+
+
+def validate_window(chunk_size: int, overlap: int):
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("overlap must be non-negative and smaller than chunk_size")
+
+
+def chunk_spans(text: str, chunk_size: int = 500, overlap: int = 50) -> np.ndarray:
+    """(n_chunks, 2) array of character [start, end) spans of overlapping word windows"""
+    starts, ends = word_spans(text)
+    first = window_starts(len(starts), chunk_size, overlap)
+    last = np.minimum(first + chunk_size, len(starts)) - 1
+    return np.stack([starts[first], ends[last]], axis=1) if len(first) else np.empty((0, 2), dtype=np.int64)
+
+
+def iter_page_chunks(pages: Iterable[Dict[str, Any]], chunk_size: int = 500, overlap: int = 50,
+                     across_pages: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Stream word-window chunks over page records (as yielded by PDFProcessor.iter_pages).
+
+    Each chunk carries its span: `page`/`char_start` of its first word and
+    `end_page`/`char_end` after its last word, offsets into the page texts. With
+    across_pages=True windows continue over page breaks; only the words of the
+    current window are buffered, so memory does not grow with the document.
+    """
+    validate_window(chunk_size, overlap)
+    step = chunk_size - overlap
+    texts: Dict[int, str] = {}  # Page texts still referenced by buffered words
+    page_ids = starts = ends = np.empty(0, dtype=np.int64)
+    covered = 0  # Leading buffered words already included in an emitted chunk
+    chunk_index = 0
+    last_page = None
+
+    def make_chunk(lo: int, hi: int) -> Dict[str, Any]:
+        first_page, last_page_id = int(page_ids[lo]), int(page_ids[hi - 1])
+        char_start, char_end = int(starts[lo]), int(ends[hi - 1])
+        if first_page == last_page_id:
+            text = texts[first_page][char_start:char_end]
+        else:
+            parts = [texts[first_page][char_start:]]
+            parts.extend(texts[p] for p in range(first_page + 1, last_page_id) if p in texts)
+            parts.append(texts[last_page_id][:char_end])
+            text = "\n".join(parts)
+        return {
+            "text": text,
+            "page": first_page,
+            "end_page": last_page_id,
+            "char_start": char_start,
+            "char_end": char_end,
+            "chunk_index": chunk_index,
+            "word_count": hi - lo
+        }
+
+    def flush():
+        nonlocal page_ids, starts, ends, covered, chunk_index
+        if len(starts) > covered:
+            yield make_chunk(0, len(starts))
+            chunk_index += 1
+        page_ids = starts = ends = np.empty(0, dtype=np.int64)
+        covered = 0
+        texts.clear()
+
+    for page in pages:
+        page_number = page["page_number"]
+        if not across_pages and last_page is not None:
+            yield from flush()
+        last_page = page
+
+        page_starts, page_ends = word_spans(page["text"])
+        if len(page_starts) == 0:
+            continue
+        texts[page_number] = page["text"]
+        page_ids = np.concatenate([page_ids, np.full(len(page_starts), page_number, dtype=np.int64)])
+        starts = np.concatenate([starts, page_starts])
+        ends = np.concatenate([ends, page_ends])
+
+        # Emit every full window, then keep only the words later windows need
+        while len(starts) >= chunk_size:
+            yield make_chunk(0, chunk_size)
+            chunk_index += 1
+            page_ids, starts, ends = page_ids[step:], starts[step:], ends[step:]
+            covered = overlap
+        for page_id in [p for p in texts if p < (page_ids[0] if len(page_ids) else page_number)]:
+            del texts[page_id]
+
+    yield from flush()
+
+
+def split_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    """Overlapping word-window chunks of a single text"""
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap).tolist()]
@@ -1,26 +1,93 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional
 import numpy as np
-from typing import List
+from services.embedding_cache import EmbeddingCache
+
+_TOKEN = re.compile(r"\w+")
+_HASHES_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1 << 18)
+def _token_hashes(token: str) -> bytes:
+    """Four 32-bit hashes of a token: stable across processes, unlike hash()"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=4 * _HASHES_PER_TOKEN).digest()
+
 
 class EmbeddingService:
-    def __init__(self, model_name: str = "text-embedding-ada-002"):
+    def __init__(self, model_name: str = "text-embedding-ada-002", cache: Optional[EmbeddingCache] = None,
+                 dimension: Optional[int] = None):
         self.model_name = model_name
+        self.dimension = dimension or int(os.getenv("EMBEDDING_DIMENSION", 384))
+        # Names the vector space (embedder and dimension), not just the model: cache
+        # keys and saved indexes record it, so vectors from another space are not reused
+        self.embedder_id = f"{model_name}/hashed-{self.dimension}"
+        self.cache = cache if cache is not None else EmbeddingCache(
+            max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+            path=os.getenv("EMBEDDING_CACHE_PATH")
+        )
         # In production, load actual model like sentence-transformers or OpenAI
         print(f"Initialized embedding model: {model_name}")
-    
+
     def get_embedding(self, text: str) -> List[float]:
+        """Embedding for text, served from the cache when possible"""
+        return self.embed_batch([text])[0].tolist()
+
+    def _compute_embeddings(self, texts: List[str]) -> np.ndarray:
         """
-        Generate embedding for text
-        For demo, returns random embedding. Replace with actual model.
+        Stand-in model: hashed bag-of-words features, one float32 row per text.
+
+        Each lowercased word adds +-1 at four hashed positions, and rows are
+        L2-normalized, so texts sharing words score higher and the same text gets
+        the same vector in every process. There is no shared RNG state, so it is
+        safe to call from several threads. Replace with an actual model.
         """
-        # Simulate embedding generation
-        np.random.seed(hash(text) % 10000)
-        embedding = np.random.rand(384).tolist()  # 384-dim vector
-        return embedding
-    
+        vocabulary = {}
+        token_ids, row_ids = [], []
+        for row, text in enumerate(texts):
+            # Texts without words still get a (whole-text) feature, not a zero row
+            tokens = _TOKEN.findall(text.lower()) or [text.strip()]
+            token_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+            row_ids.extend([row] * len(tokens))
+
+        # Hash each distinct token once, then place every occurrence with one bincount
+        hashes = np.frombuffer(b"".join(_token_hashes(token) for token in vocabulary), dtype="<u4")
+        hashes = hashes.reshape(len(vocabulary), _HASHES_PER_TOKEN)
+        columns = (hashes % self.dimension).astype(np.int64)
+        signs = np.where(hashes >> 31, 1.0, -1.0)
+
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        flat = np.asarray(row_ids, dtype=np.int64)[:, None] * self.dimension + columns[token_ids]
+        embeddings = np.bincount(flat.ravel(), weights=signs[token_ids].ravel(),
+                                 minlength=len(texts) * self.dimension)
+        embeddings = embeddings.reshape(len(texts), self.dimension).astype(np.float32)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0  # Signs can cancel out; leave such rows at zero
+        embeddings /= norms
+        return embeddings
+
     def embed_query(self, query: str) -> List[float]:
         """Alias for get_embedding"""
         return self.get_embedding(query)
-    
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Embed multiple texts"""
-        return [self.get_embedding(text) for text in texts]
\ No newline at end of file
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed multiple texts as a float32 (len(texts), dimension) matrix, computing only the cache misses"""
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        cached = self.cache.get_many(self.embedder_id, texts)
+        missing = []
+        for i, embedding in enumerate(cached):
+            if embedding is None:
+                missing.append(i)
+            else:
+                embeddings[i] = embedding
+
+        if missing:
+            computed = self._compute_embeddings([texts[i] for i in missing])
+            embeddings[missing] = computed
+            # Rows are copied so cached vectors do not keep the whole batch alive
+            self.cache.put_many(self.embedder_id, [texts[i] for i in missing], [row.copy() for row in computed])
+
+        return embeddings
@@ -0,0 +1,144 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+class QueueFullError(Exception):
+    """Raised when too many ingestion jobs are already waiting"""
+
+
+class JobConflictError(Exception):
+    """Raised when a file is busy: it has an ingestion job pending or is being deleted"""
+
+
+class IngestionJob:
+    def __init__(self, filename: str):
+        self.job_id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.pages_done = 0
+        self.total_pages = 0
+        self.chunks_indexed = 0
+        self.error: Optional[str] = None
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.future: Optional[Future] = None
+
+    def update_progress(self, pages_done: int, total_pages: int, chunks_indexed: int):
+        self.pages_done = pages_done
+        self.total_pages = total_pages
+        self.chunks_indexed = chunks_indexed
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at:
+            elapsed = ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "chunks_indexed": self.chunks_indexed,
+            "chunks_per_second": round(self.chunks_indexed / elapsed, 2) if elapsed else 0.0,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class IngestionJobManager:
+    """
+    Runs PDF ingestion in the background on a bounded thread pool.
+
+    `max_concurrent` caps how many PDFs are indexed at once (protecting search
+    latency), and `max_queued` caps how many may wait before submissions are refused.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_queued: Optional[int] = None,
+                 max_history: int = 1000):
+        self.max_concurrent = max_concurrent or int(os.getenv("INGEST_MAX_CONCURRENT", 1))
+        self.max_queued = max_queued or int(os.getenv("INGEST_MAX_QUEUED", 100))
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._held = set()  # Filenames reserved by exclusive()
+        self._lock = threading.Lock()
+
+    def submit(self, filename: str, work: Callable[[Callable[[int, int, int], None]], int]) -> IngestionJob:
+        """
+        Queue `work(progress)`; it must call progress(pages_done, total_pages, chunks_indexed).
+        Only one job per filename may be pending: another raises JobConflictError
+        """
+        with self._lock:
+            if filename in self._held:
+                raise JobConflictError(f"{filename} is being deleted")
+            if self._pending(filename):
+                raise JobConflictError(f"{filename} already has an ingestion job pending")
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_concurrent + self.max_queued:
+                raise QueueFullError(f"{pending} ingestion jobs already pending")
+            job = IngestionJob(filename)
+            self._jobs[job.job_id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job: IngestionJob, work) -> int:
+        job.status = "running"
+        job.started_at = datetime.now()
+        try:
+            job.chunks_indexed = work(job.update_progress)
+            job.status = "completed"
+            return job.chunks_indexed
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            raise
+        finally:
+            job.finished_at = datetime.now()
+
+    def _pending(self, filename: str) -> bool:
+        """Whether a job for `filename` is queued or running (caller holds the lock)"""
+        return any(job.filename == filename and not job.finished for job in self._jobs.values())
+
+    @contextmanager
+    def exclusive(self, filename: str) -> Iterator[None]:
+        """
+        Keep new jobs for `filename` out while the block runs, e.g. to delete it.
+        Raises JobConflictError if a job for it is queued or running, since that
+        job would go on indexing chunks after the block has removed them.
+        """
+        with self._lock:
+            if filename in self._held or self._pending(filename):
+                raise JobConflictError(f"{filename} has an ingestion job pending")
+            self._held.add(filename)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._held.discard(filename)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_history"""
+        excess = len(self._jobs) - self.max_history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "completed", "failed")}
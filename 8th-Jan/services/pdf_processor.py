@@ -1,45 +1,92 @@
 import PyPDF2
+import multiprocessing
 import os
-from typing import List, Dict, Any
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Tuple
+from services.chunker import split_text
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker: extract pages [start, end) from its own reader, as (page_number, text)"""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(page_num + 1, pdf_reader.pages[page_num].extract_text()) for page_num in range(start, end)]
+
 
 class PDFProcessor:
     @staticmethod
-    def extract_text_from_pdf(pdf_path: str) -> List[Dict[str, Any]]:
+    def extract_text_from_pdf(pdf_path: str, workers: int = 1) -> List[Dict[str, Any]]:
         """Extract text from PDF with page numbers and metadata"""
-        text_chunks = []
-        
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                for page_num in range(total_pages):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    
-                    if text.strip():
-                        text_chunks.append({
-                            "text": text,
-                            "page_number": page_num + 1,
-                            "total_pages": total_pages,
-                            "pdf_name": os.path.basename(pdf_path)
-                        })
-                
-            return text_chunks
+            return list(PDFProcessor.iter_pages(pdf_path, workers=workers))
         except Exception as e:
             raise Exception(f"Failed to process PDF: {str(e)}")
-    
+
+    @staticmethod
+    def iter_pages(pdf_path: str, workers: int = 1, pages_per_shard: int = 8,
+                   min_parallel_pages: int = 32) -> Iterator[Dict[str, Any]]:
+        """
+        Yield non-empty pages in page order.
+
+        With workers > 1 and a large enough PDF, page ranges are sharded across a
+        process pool; at most 2 * workers shards are in flight, so results stream
+        back in order with bounded memory.
+        """
+        pdf_name = os.path.basename(pdf_path)
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            total_pages = len(pdf_reader.pages)
+
+            if workers <= 1 or total_pages < min_parallel_pages:
+                pages = ((page_num + 1, pdf_reader.pages[page_num].extract_text()) for page_num in range(total_pages))
+                yield from PDFProcessor._page_records(pages, total_pages, pdf_name)
+                return
+
+        yield from PDFProcessor._page_records(
+            PDFProcessor._extract_parallel(pdf_path, total_pages, workers, pages_per_shard),
+            total_pages,
+            pdf_name
+        )
+
+    @staticmethod
+    def _extract_parallel(pdf_path: str, total_pages: int, workers: int,
+                          pages_per_shard: int) -> Iterator[Tuple[int, str]]:
+        shards = iter(range(0, total_pages, pages_per_shard))
+        # Spawned, not forked: this runs on ingestion pipeline threads, and forking
+        # a multi-threaded process can leave a child holding a lock it never gets back
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            in_flight = deque()
+
+            def submit_next() -> bool:
+                start = next(shards, None)
+                if start is None:
+                    return False
+                end = min(start + pages_per_shard, total_pages)
+                in_flight.append(pool.submit(_extract_page_range, pdf_path, start, end))
+                return True
+
+            for _ in range(2 * workers):
+                if not submit_next():
+                    break
+
+            # Futures are consumed in submission order, which is page order
+            while in_flight:
+                pages = in_flight.popleft().result()
+                submit_next()
+                yield from pages
+
+    @staticmethod
+    def _page_records(pages: Iterator[Tuple[int, str]], total_pages: int, pdf_name: str) -> Iterator[Dict[str, Any]]:
+        for page_number, text in pages:
+            if text.strip():
+                yield {
+                    "text": text,
+                    "page_number": page_number,
+                    "total_pages": total_pages,
+                    "pdf_name": pdf_name
+                }
+
     @staticmethod
     def split_into_chunks(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
-        """Split text into overlapping chunks"""
-        words = text.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            chunks.append(chunk)
-            
-            if i + chunk_size >= len(words):
-                break
-        
-        return chunks
\ No newline at end of file
+        """Split text into overlapping chunks of chunk_size words"""
+        return split_text(text, chunk_size, overlap)
@@ -0,0 +1,180 @@
+import json
+import os
+import shutil
+import time
+from typing import Any, Callable, Iterable, List, Tuple
+import numpy as np
+
+def write_blob(directory: str, name: str, items: Iterable[bytes]):
+    """Write items as one concatenated blob plus an int64 offsets array"""
+    offsets = [0]
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as blob:
+        for item in items:
+            blob.write(item)
+            offsets.append(offsets[-1] + len(item))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+
+
+def read_blob(directory: str, name: str, mmap: bool):
+    """Offsets array and blob bytes written by write_blob"""
+    offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"), mmap_mode="r" if mmap else None)
+    path = os.path.join(directory, f"{name}.bin")
+    if os.path.getsize(path) == 0:
+        blob = np.empty(0, dtype=np.uint8)
+    elif mmap:
+        blob = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        blob = np.fromfile(path, dtype=np.uint8)
+    return offsets, blob
+
+
+class BlobRecords:
+    """
+    List-like view over a snapshot blob: records are decoded on access, so opening
+    a snapshot costs nothing per record. Appends go to an in-memory tail.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, decode: Callable[[bytes], Any]):
+        self._offsets = offsets
+        self._blob = blob
+        self._decode = decode
+        self._base = len(offsets) - 1
+        self._tail: List[Any] = []
+
+    def __len__(self) -> int:
+        return self._base + len(self._tail)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("record index out of range")
+        if idx >= self._base:
+            return self._tail[idx - self._base]
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return self._decode(self._blob[start:end].tobytes())
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def append(self, item: Any):
+        self._tail.append(item)
+
+    def extend(self, items: Iterable[Any]):
+        self._tail.extend(items)
+
+
+def decode_text(raw: bytes) -> str:
+    return raw.decode("utf-8")
+
+
+def decode_json(raw: bytes) -> Any:
+    return json.loads(raw)
+
+
+def encode_json(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+# Where symlinks need no privileges, `path` is a symlink to the current version;
+# elsewhere (Windows) it is a directory holding a CURRENT file that names it
+USE_SYMLINKS = os.name != "nt"
+POINTER_FILE = "CURRENT"
+
+
+def replace_directory(tmp_path: str, path: str):
+    """
+    Publish a freshly written snapshot at `path` in one atomic step. The snapshot
+    goes to a versioned directory (`<path>.v<time>-<pid>`), and `path` is switched
+    to it by a rename: of a symlink, or of the CURRENT pointer file where symlinks
+    are not available. So `path` always names a complete snapshot; resolve it with
+    resolve_directory(). The previous version is kept for readers still opening
+    it; older ones are removed. Their files are unlinked rather than truncated, so
+    readers that have them memory-mapped keep working (Windows refuses to delete
+    mapped files; those versions are retried on later saves).
+    """
+    if USE_SYMLINKS:
+        if os.path.isdir(path) and not os.path.islink(path):
+            # Written before snapshots were versioned: becomes the first version
+            os.rename(path, f"{path}.v0-0")
+            os.symlink(os.path.basename(f"{path}.v0-0"), path)
+        previous = os.readlink(path) if os.path.islink(path) else None
+    else:
+        # An unversioned snapshot's files may be mapped, so they stay where they are;
+        # the pointer file written next to them takes precedence
+        os.makedirs(path, exist_ok=True)
+        previous = _read_pointer(path)
+
+    version_path = f"{path}.v{time.time_ns()}-{os.getpid()}"
+    os.rename(tmp_path, version_path)
+    if USE_SYMLINKS:
+        link_path = f"{path}.link-{os.getpid()}"
+        if os.path.lexists(link_path):
+            os.remove(link_path)
+        os.symlink(os.path.basename(version_path), link_path)
+        os.replace(link_path, path)
+    else:
+        pointer_path = os.path.join(path, f"{POINTER_FILE}.tmp-{os.getpid()}")
+        with open(pointer_path, "w") as f:
+            f.write(os.path.basename(version_path))
+        os.replace(pointer_path, os.path.join(path, POINTER_FILE))
+
+    # Only versions older than the previous one: a concurrent save's newer
+    # directory may not be linked yet
+    if previous is not None:
+        for old_path in snapshot_versions(path):
+            if _version_key(old_path) < _version_key(previous):
+                shutil.rmtree(old_path, ignore_errors=True)
+
+
+def resolve_directory(path: str) -> str:
+    """The directory holding the snapshot `path` currently names"""
+    if os.path.islink(path):
+        return os.path.realpath(path)
+    version = _read_pointer(path)
+    if version is not None:
+        return os.path.join(os.path.dirname(os.path.abspath(path)), version)
+    return path
+
+
+def _read_pointer(path: str):
+    try:
+        with open(os.path.join(path, POINTER_FILE)) as f:
+            return f.read().strip()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def snapshot_versions(path: str) -> List[str]:
+    """Versioned snapshot directories behind `path`, oldest first"""
+    directory = os.path.dirname(os.path.abspath(path))
+    prefix = f"{os.path.basename(path)}.v"
+    names = [name for name in os.listdir(directory) if name.startswith(prefix)]
+    return [os.path.join(directory, name) for name in sorted(names, key=_version_key)]
+
+
+def _version_key(name: str) -> Tuple[int, int]:
+    stamp, _, pid = os.path.basename(name).rpartition(".v")[2].partition("-")
+    return int(stamp), int(pid or 0)
+
+
+def save_groups(directory: str, name: str, groups: List[Iterable[int]]):
+    """Store variable-length row id groups as one concatenated array plus offsets"""
+    arrays = [np.asarray(group, dtype=np.int64) for group in groups]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(a) for a in arrays])
+    rows = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.int64)
+    np.save(os.path.join(directory, f"{name}_rows.npy"), rows)
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+
+
+def load_groups(directory: str, name: str, mmap: bool) -> List[np.ndarray]:
+    """Row id groups written by save_groups, as views into one (mapped) array"""
+    mode = "r" if mmap else None
+    rows = np.load(os.path.join(directory, f"{name}_rows.npy"), mmap_mode=mode)
+    offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"))
+    return [rows[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
@@ -0,0 +1,67 @@
+import queue
+import threading
+from typing import Any, Iterable, Iterator, List
+
+_DONE = object()
+
+def pipelined(items: Iterable[Any], maxsize: int) -> Iterator[Any]:
+    """
+    Run `items` in a background thread and yield its output through a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, which bounds memory and
+    lets the producer and consumer stages overlap. Producer exceptions are re-raised
+    in the consumer; closing the generator early stops the producer.
+    """
+    buffer: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            # Propagate an early stop to upstream stages
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        thread.join()
+
+
+def batched(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Group an iterable into lists of up to batch_size items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
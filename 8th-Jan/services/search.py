@@ -1,17 +1,113 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple, Callable
 from datetime import datetime
+import os
+import threading
+import numpy as np
 from services.embedding import EmbeddingService
 from services.vector_store import VectorStore
 from services.pdf_processor import PDFProcessor
+from services.pipeline import pipelined, batched
+from services.chunker import iter_page_chunks, validate_window
+from services.query_cache import QueryCache
+from services.sharded_search import ShardedSearch
 
 class SearchService:
-    def __init__(self):
+    def __init__(self, index_path: Optional[str] = None):
         self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStore()
         self.pdf_processor = PDFProcessor()
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", 64))
+        self.pipeline_depth = int(os.getenv("INGEST_PIPELINE_DEPTH", 4))
+        self.extraction_workers = int(os.getenv("PDF_EXTRACTION_WORKERS", os.cpu_count() or 1))
+        self.index_path = index_path if index_path is not None else os.getenv("VECTOR_INDEX_PATH", "data/vector_index")
+        self.query_cache = QueryCache(
+            max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 1024)),
+            ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", 300))
+        )
+        
+        # Reopen the persisted index if there is one; it is memory-mapped, so
+        # this is cheap and the pages are shared between workers
+        rebuilt = False
+        if self.index_path and VectorStore.exists(self.index_path):
+            self.vector_store = VectorStore.load(self.index_path, mmap=True)
+            if self.vector_store.embedder != self.embedding_service.embedder_id:
+                self.vector_store = self._reembed(self.vector_store)
+                rebuilt = True
+        else:
+            self.vector_store = VectorStore()
+            self.vector_store.embedder = self.embedding_service.embedder_id
+            # Load sample data for demonstration
+            self._load_sample_data()
+        self.vector_store.compact_threshold = float(os.getenv("VECTOR_COMPACT_THRESHOLD", 0.25))
+        
+        # SEARCH_SHARDS > 1 scores unfiltered queries on that many worker processes
+        # sharing one copy of the rows; run a single server worker with it
+        shards = int(os.getenv("SEARCH_SHARDS", 0))
+        self.sharded_search = ShardedSearch(self.vector_store, workers=shards) if shards > 1 else None
         
-        # Load sample data for demonstration
-        self._load_sample_data()
+        # Changes are written every VECTOR_SAVE_INTERVAL_SECONDS (0: only on close)
+        # rather than per upload, since a save rewrites the whole index. Only one
+        # process may save to index_path, so run a single server worker with it
+        self.save_interval = float(os.getenv("VECTOR_SAVE_INTERVAL_SECONDS", 60))
+        self._saved_version = None if rebuilt else self.vector_store.version
+        self._save_lock = threading.Lock()
+        self._stop_saving = threading.Event()
+        if self.index_path and self.save_interval > 0:
+            threading.Thread(target=self._save_periodically, name="vector-index-saver", daemon=True).start()
+    
+    def save_index(self, force: bool = True) -> bool:
+        """
+        Persist the vector store snapshot, if persistence is enabled; with
+        force=False only if it changed since the last save. Returns whether it wrote
+        """
+        if not self.index_path:
+            return False
+        with self._save_lock:
+            version = self.vector_store.version
+            if not force and version == self._saved_version:
+                return False
+            self.vector_store.save(self.index_path)
+            self._saved_version = version
+            return True
+    
+    def _save_periodically(self):
+        while not self._stop_saving.wait(self.save_interval):
+            try:
+                self.save_index(force=False)
+            except Exception as e:
+                print(f"Failed to save vector index: {str(e)}")
+    
+    def close(self):
+        """Stop the periodic saves, write unsaved changes and stop the search shards"""
+        self._stop_saving.set()
+        self.save_index(force=False)
+        if self.sharded_search is not None:
+            self.sharded_search.close()
+    
+    def _reembed(self, store: VectorStore) -> VectorStore:
+        """
+        A copy of `store` with every chunk embedded again by the current embedder.
+        Vectors from another embedder or dimension cannot be scored against its
+        query vectors, so a saved index that recorded a different one is rebuilt
+        from its texts (and saved again by the next periodic save).
+        """
+        print(f"Index embedded with {store.embedder}, not {self.embedding_service.embedder_id}: re-embedding it")
+        rebuilt = VectorStore(
+            index_type=store.index_type,
+            n_lists=store._n_lists,
+            nprobe=store.ann_index.nprobe if store.ann_index is not None else 8,
+            ann_train_size=store.ann_train_size,
+            storage=store.storage,
+            rerank_factor=store.rerank_factor
+        )
+        rebuilt.embedder = self.embedding_service.embedder_id
+        snap = store._snapshot
+        live = snap.live(np.arange(snap.size)).tolist()
+        for rows in batched(live, self.embed_batch_size):
+            texts = [snap.documents[row] for row in rows]
+            rebuilt.add_documents(self.embedding_service.embed_batch(texts), texts,
+                                  [snap.metadata[row] for row in rows], ids=[snap.doc_ids[row] for row in rows])
+        rebuilt._next_id = store._next_id
+        return rebuilt
     
     def _load_sample_data(self):
         """Load sample documents for testing"""
@@ -46,17 +142,68 @@ class SearchService:
         """Main search function"""
         start_time = datetime.now()
         
+        # Repeated queries are answered from the cache until the index changes
+        cache_key = self.query_cache.make_key(query=query, top_k=top_k, pdf_filter=pdf_filter)
+        version = self.vector_store.version
+        cached = self.query_cache.get(cache_key, version)
+        if cached is not None:
+            search_time = datetime.now() - start_time
+            return dict(cached, search_duration_ms=round(search_time.total_seconds() * 1000, 2))
+        
         # 1. Embed query
         query_vector = self.embedding_service.get_embedding(query)
         
         # 2. Search in vector store
-        search_results = self.vector_store.search(
-            query_vector=query_vector,
-            top_k=top_k,
-            pdf_filter=pdf_filter
-        )
+        search_results = self._search_vectors([query_vector], top_k, pdf_filter)[0]
         
         # 3. Process results
+        response = self._build_response(query, search_results)
+        self.query_cache.put(cache_key, version, response)
+        
+        # 4. Calculate search time
+        search_time = datetime.now() - start_time
+        
+        response["search_duration_ms"] = round(search_time.total_seconds() * 1000, 2)
+        return response
+    
+    def search_many(self, queries: List[str], top_k: int = 5, pdf_filter: str = None) -> Dict[str, Any]:
+        """Embed a batch of queries at once and score them together"""
+        start_time = datetime.now()
+        
+        # Serve repeated queries from the cache; only the rest are embedded and scored
+        version = self.vector_store.version
+        keys = [self.query_cache.make_key(query=query, top_k=top_k, pdf_filter=pdf_filter) for query in queries]
+        responses = [self.query_cache.get(key, version) for key in keys]
+        missing = [i for i, response in enumerate(responses) if response is None]
+        
+        if missing:
+            # 1. Embed all queries in one batch
+            query_vectors = self.embedding_service.embed_batch([queries[i] for i in missing])
+            
+            # 2. Score every query against the store in one pass
+            batch_results = self._search_vectors(query_vectors, top_k, pdf_filter)
+            
+            # 3. Process results
+            for i, search_results in zip(missing, batch_results):
+                responses[i] = self._build_response(queries[i], search_results)
+                self.query_cache.put(keys[i], version, responses[i])
+        
+        search_time = datetime.now() - start_time
+        
+        return {
+            "total_queries": len(queries),
+            "results": responses,
+            "search_duration_ms": round(search_time.total_seconds() * 1000, 2)
+        }
+    
+    def _search_vectors(self, query_vectors, top_k: int, pdf_filter: Optional[str]) -> List[List[Dict[str, Any]]]:
+        """Whole-corpus queries go to the shards when enabled; filtered ones stay in-process"""
+        if self.sharded_search is not None and not pdf_filter:
+            return self.sharded_search.search_many(query_vectors, top_k=top_k)
+        return self.vector_store.search_many(query_vectors=query_vectors, top_k=top_k, pdf_filter=pdf_filter)
+    
+    def _build_response(self, query: str, search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Shape raw vector store hits into a search response"""
         chunks = []
         pdf_counts = {}
         
@@ -75,42 +222,99 @@ class SearchService:
             pdf_name = metadata.get("source_pdf", "unknown")
             pdf_counts[pdf_name] = pdf_counts.get(pdf_name, 0) + 1
         
-        # 4. Calculate search time
-        search_time = datetime.now() - start_time
-        
         return {
             "query": query,
             "total_chunks_found": len(chunks),
             "chunks": chunks,
             "pdf_distribution": pdf_counts,
-            "search_time": datetime.now(),
-            "search_duration_ms": round(search_time.total_seconds() * 1000, 2)
+            "search_time": datetime.now()
         }
     
-    def process_and_index_pdf(self, pdf_path: str) -> int:
-        """Process PDF and index its content"""
-        # Extract text from PDF
-        text_chunks = self.pdf_processor.extract_text_from_pdf(pdf_path)
+    def process_and_index_pdf(self, pdf_path: str, chunk_size: int = 500, overlap: int = 50,
+                              batch_size: Optional[int] = None,
+                              progress: Optional[Callable[[int, int, int], None]] = None,
+                              pdf_name: Optional[str] = None) -> int:
+        """
+        Process PDF and index its content
+        
+        Runs as a streaming pipeline: extract -> chunk -> micro-batch embed -> bulk
+        append, with each stage in its own thread and bounded queues in between, so
+        memory stays flat regardless of PDF size. `progress` is called after every
+        batch with (pages_done, total_pages, chunks_indexed).
+        
+        Chunks are windows of `chunk_size` words overlapping by `overlap` words and
+        may span a page break; their metadata records the character span they cover.
+        
+        Re-indexing a PDF that is already in the store replaces its chunks: the new
+        ones are collected first and swapped in at once, so searches never see a
+        mix of old and new chunks.
+        
+        Chunks are recorded under `pdf_name`, which defaults to the file's name.
+        """
+        validate_window(chunk_size, overlap)
+        batch_size = batch_size or self.embed_batch_size
+        
+        pdf_name = pdf_name or os.path.basename(pdf_path)
+        chunks = pipelined(self._iter_chunks(pdf_path, chunk_size, overlap, pdf_name),
+                           maxsize=self.pipeline_depth * batch_size)
+        embedded = pipelined(self._embed_batches(chunks, batch_size), maxsize=self.pipeline_depth)
+        
+        replacing = self.vector_store.has_source(pdf_name)
+        staged = []
         
         total_indexed = 0
-        for chunk_data in text_chunks:
-            # Split into smaller chunks
-            smaller_chunks = self.pdf_processor.split_into_chunks(chunk_data["text"])
+        for embeddings, texts, metadata_list in embedded:
+            # Add to vector store (or hold back until every new chunk is embedded)
+            if replacing:
+                staged.append((embeddings, texts, metadata_list))
+            else:
+                self.vector_store.add_documents(embeddings, texts, metadata_list)
+            total_indexed += len(texts)
             
-            for i, chunk_text in enumerate(smaller_chunks):
-                # Generate embedding
-                embedding = self.embedding_service.get_embedding(chunk_text)
-                
-                # Prepare metadata
-                metadata = {
-                    "source_pdf": chunk_data["pdf_name"],
-                    "page": chunk_data["page_number"],
-                    "chunk_index": i,
-                    "total_pages": chunk_data["total_pages"]
-                }
-                
-                # Add to vector store
-                self.vector_store.add_document(embedding, chunk_text, metadata)
-                total_indexed += 1
-        
-        return total_indexed
\ No newline at end of file
+            if progress:
+                last = metadata_list[-1]
+                progress(last["page"], last["total_pages"], total_indexed)
+        
+        if replacing:
+            self.vector_store.replace_document(
+                pdf_name,
+                [row for embeddings, _, _ in staged for row in embeddings],
+                [text for _, texts, _ in staged for text in texts],
+                [meta for _, _, metadata_list in staged for meta in metadata_list]
+            )
+        
+        return total_indexed
+    
+    def delete_pdf(self, pdf_name: str) -> int:
+        """Remove every chunk of a PDF from the index; returns how many there were"""
+        return self.vector_store.delete_source(pdf_name)
+    
+    def _iter_chunks(self, pdf_path: str, chunk_size: int, overlap: int,
+                     pdf_name: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Extract pages and split them into (chunk text, metadata) pairs"""
+        total_pages = {"count": 0}
+        
+        def pages():
+            for page in self.pdf_processor.iter_pages(pdf_path, workers=self.extraction_workers):
+                total_pages["count"] = page["total_pages"]
+                yield page
+        
+        for chunk in iter_page_chunks(pages(), chunk_size, overlap):
+            # Prepare metadata
+            metadata = {
+                "source_pdf": pdf_name,
+                "page": chunk["page"],
+                "end_page": chunk["end_page"],
+                "char_start": chunk["char_start"],
+                "char_end": chunk["char_end"],
+                "chunk_index": chunk["chunk_index"],
+                "total_pages": total_pages["count"]
+            }
+            yield chunk["text"], metadata
+    
+    def _embed_batches(self, chunks: Iterable[Tuple[str, Dict[str, Any]]], batch_size: int):
+        """Embed chunks one micro-batch at a time"""
+        for batch in batched(chunks, batch_size):
+            texts = [text for text, _ in batch]
+            metadata_list = [metadata for _, metadata in batch]
+            yield self.embedding_service.embed_batch(texts), texts, metadata_list
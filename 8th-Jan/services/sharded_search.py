@@ -0,0 +1,214 @@
+"""
+Brute-force search fanned out over a pool of worker processes.
+
+The store's float32 rows live in a file-backed shared mapping (on tmpfs where
+there is one): the store allocates its matrix there and writes appended rows in
+place, and each worker maps the same file and scores its own contiguous slice
+of it. So a query uses every core and the index exists once, however many
+workers there are. The workers send back their best top_k, and the parent
+merges them and attaches the texts and metadata from its own store.
+
+The workers only remap when the store moves to a new matrix (it grew, or a
+compaction renumbered the rows); tombstones go into a small shared bitmap. Each
+file is removed when the parent drops its array, and on POSIX the workers keep
+their mapping until they move on.
+"""
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+import numpy as np
+from services.vector_store import VectorStore
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Windows refuses while a worker still maps it; it stays in the temp directory
+
+
+def _map(path: Optional[str], shape, dtype) -> Optional[np.ndarray]:
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape) if path is not None else None
+
+
+def _shard_worker(conn, shard: int, n_shards: int):
+    """Worker loop: score this process's slice of the shared rows for each query batch"""
+    matrix = dead = None
+    while True:
+        message = conn.recv()
+        kind = message[0]
+        if kind == "close":
+            break
+        if kind == "attach":
+            # A matrix path of None keeps the current mapping
+            _, matrix_path, dead_path, capacity, dimension = message
+            if matrix_path is not None:
+                matrix = _map(matrix_path, (capacity, dimension), np.float32)
+            dead = _map(dead_path, (len(matrix),), np.bool_)
+            conn.send(True)
+            continue
+
+        _, queries, size, top_k = message
+        start, stop = shard * size // n_shards, (shard + 1) * size // n_shards
+        rows = np.full((len(queries), top_k), -1, dtype=np.int64)
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        if stop > start:
+            block_scores = queries @ matrix[start:stop].T
+            if dead is not None:
+                block_scores[:, dead[start:stop]] = -np.inf
+            k = min(top_k, stop - start)
+            top = np.argpartition(block_scores, -k, axis=1)[:, -k:] if k < stop - start else \
+                np.broadcast_to(np.arange(stop - start), (len(queries), k))
+            rows[:, :k] = top + start
+            scores[:, :k] = np.take_along_axis(block_scores, top, axis=1)
+        conn.send((rows, scores))
+
+
+class ShardedSearch:
+    """
+    Exact whole-corpus search over `store`, split across `workers` processes.
+
+    Filtered searches are not sharded: they score a small subset, which the store
+    does in-process. The shards read float32 rows, so int8-only storage is not
+    supported. Concurrent callers take turns, each using every worker.
+
+    While this is open the store allocates its float32 matrix in files under
+    `shared_dir` (default /dev/shm if present, else the temp directory).
+    """
+
+    def __init__(self, store: VectorStore, workers: Optional[int] = None, shared_dir: Optional[str] = None):
+        if not store.keeps_float_rows:
+            raise ValueError("Sharded search needs float32 rows (storage='float32' or rerank_factor > 0)")
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_dir = shared_dir or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+        self._prefix = f"vector-rows-{os.getpid()}-{id(self)}-"
+        self._lock = threading.Lock()
+        self._processes = []
+        self._connections = []
+        self._matrix: Optional[np.ndarray] = None  # Store matrix the workers have mapped
+        self._synced_size = 0
+        self._synced_dead = None  # Store bitmap last copied into the shared one
+        self._dead_file: Optional[np.memmap] = None  # Shared copy the workers map
+        self.remaps = 0
+        self._closed = False
+
+    def _start(self):
+        # Spawned rather than forked: the parent runs server and ingestion threads
+        context = multiprocessing.get_context("spawn")
+        for shard in range(self.workers):
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child_end, shard, self.workers),
+                                      name=f"search-shard-{shard}", daemon=True)
+            process.start()
+            child_end.close()
+            self._processes.append(process)
+            self._connections.append(parent_end)
+        atexit.register(self.close)
+
+    def _broadcast(self, message) -> list:
+        for conn in self._connections:
+            conn.send(message)
+        return [conn.recv() for conn in self._connections]
+
+    def _new_file(self, shape, dtype) -> np.memmap:
+        fd, path = tempfile.mkstemp(dir=self.shared_dir, prefix=self._prefix)
+        os.close(fd)
+        array = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+        weakref.finalize(array, _remove_file, path)
+        return array
+
+    def _allocate_rows(self, capacity: int, dimension: int) -> np.ndarray:
+        """VectorStore.row_allocator: the store's float32 matrix, in a file workers can map"""
+        return self._new_file((capacity, dimension), np.float32)
+
+    def _is_shared(self, matrix: np.ndarray) -> bool:
+        return isinstance(matrix, np.memmap) and os.path.basename(matrix.filename or "").startswith(self._prefix)
+
+    def _sync(self):
+        """Map the store's current matrix and tombstones into the workers (caller holds the lock)"""
+        if not self._processes:
+            self._start()
+
+        snap = self.store._snapshot
+        while not self._is_shared(snap.matrix):
+            # Rows in private memory (from before sharding started, or loaded from a
+            # snapshot): move them into a shared file once
+            self.store.reallocate_rows(self._allocate_rows)
+            snap = self.store._snapshot
+
+        remap = snap.matrix is not self._matrix
+        if remap or snap.dead is not self._synced_dead:
+            dead_file = None
+            if snap.dead is not None:
+                dead_file = self._new_file((len(snap.matrix),), np.bool_)
+                dead_file[:snap.size] = snap.dead[:snap.size]
+            self._broadcast(("attach", snap.matrix.filename if remap else None,
+                             dead_file.filename if dead_file is not None else None) + snap.matrix.shape)
+            self._matrix, self._synced_dead, self._dead_file = snap.matrix, snap.dead, dead_file
+            if remap:
+                self.remaps += 1
+        self._synced_size = snap.size
+        return snap
+
+    def search_many(self, query_vectors, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Unfiltered VectorStore.search_many, scored exactly: an IVF index or int8
+        codes on the store are not used, so results match float32 brute force
+        """
+        queries = VectorStore._normalize(np.array(query_vectors, dtype=np.float32, ndmin=2))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ShardedSearch is closed")
+            snap = self.store._snapshot
+            if snap.size == snap.dead_count or top_k <= 0:
+                return [[] for _ in queries]
+            # Taken under the lock so the workers' mapping only ever moves forward
+            snap = self._sync()
+            parts = self._broadcast(("search", queries, snap.size, top_k))
+
+        # Merge the per-shard top-k lists
+        rows = np.concatenate([part[0] for part in parts], axis=1)
+        scores = np.concatenate([part[1] for part in parts], axis=1)
+        results = []
+        for query_rows, query_scores in zip(rows, scores):
+            top = VectorStore._top_k(query_scores, top_k)
+            top = top[query_scores[top] > -np.inf]
+            results.append(VectorStore._format_results(snap, query_rows[top], query_scores[top]))
+        return results
+
+    def search(self, query_vector, top_k: int = 5) -> List[Dict[str, Any]]:
+        return self.search_many([query_vector], top_k=top_k)[0]
+
+    def close(self):
+        """Stop the workers and hand the store back to private memory"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for conn in self._connections:
+                try:
+                    conn.send(("close",))
+                except (BrokenPipeError, OSError):
+                    pass
+            for process in self._processes:
+                process.join(timeout=5)
+            atexit.unregister(self.close)
+            # The store keeps its current matrix; only the ones it allocates next are private
+            self.store.row_allocator = None
+            self._matrix = self._synced_dead = self._dead_file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        matrix = self._matrix
+        return {
+            "workers": self.workers,
+            "started": bool(self._processes),
+            "shared_rows": self._synced_size,
+            "capacity": len(matrix) if matrix is not None else 0,
+            "shared_bytes": matrix.nbytes if matrix is not None else 0,
+            "remaps": self.remaps
+        }
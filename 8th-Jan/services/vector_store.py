@@ -1,57 +1,830 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence, Callable, Tuple
+import json
+import os
+import shutil
+import threading
 import numpy as np
 from datetime import datetime
+from services.ann_index import IVFIndex
+from services.persistence import (
+    BlobRecords, write_blob, read_blob, save_groups, load_groups, replace_directory, resolve_directory,
+    decode_text, decode_json, encode_json
+)
+
+SNAPSHOT_VERSION = 1
+
+
+class _Snapshot:
+    """
+    The store as of one write: what a search reads. Writers publish a new one after
+    every change and never modify a published one, so readers just take a reference.
+
+    Arrays and lists can be shared with later snapshots, but writers only append
+    past `size` or build new ones (compaction, tombstones), so the first `size` rows
+    seen through a snapshot never change. Row id groups (sources, IVF buckets) may
+    already hold later rows; live() cuts them at `size`.
+    """
+    __slots__ = ("size", "matrix", "codes", "scales", "documents", "metadata", "doc_ids",
+                 "dead", "dead_count", "source_index", "ann_index", "generation", "_dead_rows")
+
+    def __init__(self, store: "VectorStore"):
+        self.size = store._size
+        self.matrix = store._matrix
+        self.codes = store._codes
+        self.scales = store._scales
+        self.documents = store.documents
+        self.metadata = store.metadata
+        self.doc_ids = store.doc_ids
+        self.dead = store._dead if store._dead_count else None
+        self.dead_count = store._dead_count
+        self.source_index = dict(store._source_index)  # Writers add and drop keys in theirs
+        self.ann_index = store.ann_index
+        self.generation = store._generation  # Changes whenever existing rows are renumbered
+        self._dead_rows = None
+
+    @property
+    def dead_rows(self) -> Optional[np.ndarray]:
+        """Row ids of the tombstones, computed on first use"""
+        if self.dead is None:
+            return None
+        if self._dead_rows is None:
+            self._dead_rows = np.flatnonzero(self.dead[:self.size])
+        return self._dead_rows
+
+    def live(self, rows: np.ndarray) -> np.ndarray:
+        """Drop rows this snapshot cannot see: appended after it, or deleted"""
+        rows = rows[rows < self.size]
+        return rows[~self.dead[rows]] if self.dead is not None else rows
+
 
 class VectorStore:
-    def __init__(self):
-        self.vectors = []  # List of embeddings
+    name = "numpy"
+
+    def __init__(self, dimension: Optional[int] = None, initial_capacity: int = 1024,
+                 index_type: str = "flat", n_lists: Optional[int] = None, nprobe: int = 8,
+                 ann_train_size: int = 10_000, storage: str = "float32", rerank_factor: int = 0,
+                 compact_threshold: Optional[float] = 0.25):
+        """
+        index_type: "flat" for exact brute-force scoring, "ivf" for approximate search.
+        In "ivf" mode the index is trained once `ann_train_size` documents are stored;
+        until then searches stay exact. `nprobe` trades recall for latency.
+
+        storage: "float32" keeps full-precision rows, "int8" keeps one scale per row plus
+        int8 codes (~4x smaller) and scores float queries against the codes directly.
+        With rerank_factor > 0 the int8 mode also keeps float32 rows and re-scores the
+        top `top_k * rerank_factor` candidates exactly.
+
+        Deletes only set a tombstone bit that searches mask out. Once the deleted
+        fraction reaches `compact_threshold` a background thread rewrites the storage
+        without them (None turns that off; compact() can still be called directly).
+        """
+        if index_type not in ("flat", "ivf"):
+            raise ValueError(f"Unknown index_type: {index_type}")
+        if storage not in ("float32", "int8"):
+            raise ValueError(f"Unknown storage: {storage}")
+        self.storage = storage
+        self.rerank_factor = rerank_factor if storage == "int8" else 0
+        self.dimension = dimension
+        self.initial_capacity = initial_capacity
+        self.index_type = index_type
+        self.ann_train_size = ann_train_size
+        self._n_lists = n_lists
+        self.ann_index = IVFIndex(n_lists=n_lists, nprobe=nprobe) if index_type == "ivf" else None
+        self._matrix = None  # Preallocated float32 matrix of L2-normalized rows
+        # Allocates that matrix as allocate(capacity, dimension); None means np.empty
+        self.row_allocator: Optional[Callable[[int, int], np.ndarray]] = None
+        self._codes = None  # int8 codes of the same rows (int8 storage)
+        self._scales = None  # Per-row dequantization scale (int8 storage)
+        self._size = 0
         self.metadata = []  # List of metadata
         self.documents = []  # List of document texts
+        self._source_index: Dict[str, List[int]] = {}  # source_pdf -> row ids
+        self.doc_ids = []  # Stable document ids; rows move when documents are deleted
+        self._row_of: Optional[Dict[str, int]] = None  # doc id -> row, built on first use
+        self._next_id = 0  # Counter behind the default ids
+        self._dead: Optional[np.ndarray] = None  # Tombstone bitmap, allocated by the first delete
+        self._dead_count = 0
+        self._generation = 0
+        self.compact_threshold = compact_threshold
+        self.compactions = 0
+        self.embedder: Optional[str] = None  # Id of the embedder that made the vectors, kept in snapshots
+        self._compactor: Optional[threading.Thread] = None
+        self._compaction_lock = threading.Lock()
+        # Serializes writers only. Searches read the last published snapshot and
+        # never wait for it, so ingestion and compaction do not stall queries
+        self._lock = threading.RLock()
+        self.version = 0  # Bumped by every change to the contents, for result caches
+        self._publish()
         print("Initialized in-memory vector store")
-    
+
+    def _publish(self):
+        """Make the current state visible to searches (caller holds the lock)"""
+        self._snapshot = _Snapshot(self)
+
+    @property
+    def keeps_float_rows(self) -> bool:
+        return self.storage == "float32" or self.rerank_factor > 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        Stored (normalized) embeddings, deleted rows included until compaction:
+        a view for float32 storage, a dequantized copy for int8
+        """
+        if self._size == 0:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        if self._matrix is not None:
+            return self._matrix[:self._size]
+        return self._codes[:self._size].astype(np.float32) * self._scales[:self._size, None]
+
+    def _ensure_capacity(self, extra: int):
+        """Grow the storage arrays geometrically so appends are amortized O(1)"""
+        needed = self._size + extra
+        if self._dead is not None and len(self._dead) < needed:
+            self._dead = self._grow(self._dead, max(needed, 2 * len(self._dead)))
+            self._dead[self._size:] = False
+        rows = self._matrix if self._matrix is not None else self._scales
+        capacity = len(rows) if rows is not None else 0
+        if needed <= capacity:
+            return
+        if self._size == 0:
+            # Nothing to carry over: a new store, or an empty snapshot loaded back
+            # (whose arrays have no rows, so doubling could never make room)
+            capacity = max(self.initial_capacity, needed)
+            if self.keeps_float_rows:
+                self._matrix = self._empty_rows("_matrix", capacity, (self.dimension,), np.float32)
+            if self.storage == "int8":
+                self._codes = np.empty((capacity, self.dimension), dtype=np.int8)
+                self._scales = np.empty(capacity, dtype=np.float32)
+            return
+
+        while capacity < needed:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix = self._grow(self._matrix, capacity, "_matrix")
+        if self._codes is not None:
+            self._codes = self._grow(self._codes, capacity)
+            self._scales = self._grow(self._scales, capacity)
+
+    def _grow(self, array: np.ndarray, capacity: int, name: str = "") -> np.ndarray:
+        grown = self._empty_rows(name, capacity, array.shape[1:], array.dtype)
+        grown[:self._size] = array[:self._size]
+        return grown
+
+    def _empty_rows(self, name: str, capacity: int, row_shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """New storage array `name`; the float32 matrix comes from row_allocator if set"""
+        if name == "_matrix" and self.row_allocator is not None:
+            return self.row_allocator(capacity, row_shape[0])
+        return np.empty((capacity,) + tuple(row_shape), dtype=dtype)
+
+    def reallocate_rows(self, allocator: Optional[Callable[[int, int], np.ndarray]]):
+        """
+        Allocate the float32 matrix with `allocator` from now on, and move the
+        current rows into such an array. Snapshots already taken keep the old one
+        """
+        with self._lock:
+            self.row_allocator = allocator
+            if self._matrix is not None:
+                self._matrix = self._grow(self._matrix, max(len(self._matrix), self._size, 1), "_matrix")
+                self._publish()
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray):
+        """Symmetric per-row int8 quantization: row ~= codes * scale"""
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize rows in place; zero rows stay zero"""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
     def add_document(self, embedding: List[float], text: str, metadata: Dict[str, Any]):
         """Add document to vector store"""
-        self.vectors.append(embedding)
-        self.documents.append(text)
-        self.metadata.append(metadata)
-    
-    def search(self, query_vector: List[float], top_k: int = 5, pdf_filter: str = None) -> List[Dict[str, Any]]:
-        """Search for similar vectors"""
-        if not self.vectors:
+        self.add_documents([embedding], [text], [metadata])
+
+    def add_documents(self, embeddings, texts: List[str], metadata_list: List[Dict[str, Any]],
+                      ids: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Append a batch of documents with a single matrix copy. Documents get
+        sequential ids unless `ids` are given; given ids already stored are replaced.
+        """
+        batch = self._check_batch(embeddings, texts, metadata_list, ids)
+        if len(batch) == 0:
             return []
-        
-        # Convert to numpy for efficient computation
-        query_vec = np.array(query_vector)
-        vectors = np.array(self.vectors)
-        
-        # Calculate cosine similarity
-        similarities = np.dot(vectors, query_vec) / (
-            np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vec)
-        )
-        
-        # Get top_k indices
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
-        
-        # Prepare results
-        results = []
-        for idx in top_indices:
-            if pdf_filter and self.metadata[idx].get("source_pdf") != pdf_filter:
-                continue
-                
-            result = {
-                "id": idx,
-                "text": self.documents[idx],
-                "similarity": float(similarities[idx]),
-                "metadata": self.metadata[idx]
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = batch.shape[1]
+            elif batch.shape[1] != self.dimension:
+                raise ValueError(f"Embedding dimension mismatch: {batch.shape[1]} != {self.dimension}")
+
+            if ids is None:
+                ids = [str(self._next_id + i) for i in range(len(batch))]
+                self._next_id += len(batch)
+            else:
+                ids = [str(doc_id) for doc_id in ids]
+                self._tombstone([self._row_of_id[doc_id] for doc_id in ids if doc_id in self._row_of_id])
+
+            self._ensure_capacity(len(batch))
+            batch = self._normalize(batch)
+            new_rows = slice(self._size, self._size + len(batch))
+            if self._matrix is not None:
+                self._matrix[new_rows] = batch
+            if self._codes is not None:
+                self._codes[new_rows], self._scales[new_rows] = self._quantize(batch)
+            for row, meta in enumerate(metadata_list, start=self._size):
+                rows = self._source_index.setdefault(meta.get("source_pdf", ""), [])
+                if isinstance(rows, np.ndarray):  # Restored from a snapshot
+                    rows = self._source_index[meta.get("source_pdf", "")] = rows.tolist()
+                rows.append(row)
+            if self._row_of is not None:
+                self._row_of.update(zip(ids, range(self._size, self._size + len(batch))))
+            self._size += len(batch)
+            self.documents.extend(texts)
+            self.metadata.extend(metadata_list)
+            self.doc_ids.extend(ids)
+            self._update_ann_index(batch)
+            self.version += 1
+            self._publish()
+            return ids
+
+    @staticmethod
+    def _check_batch(embeddings, texts: List[str], metadata_list: List[Dict[str, Any]],
+                     ids: Optional[Sequence[str]] = None) -> np.ndarray:
+        """The batch as a float32 matrix, or ValueError if the lengths disagree"""
+        batch = np.array(embeddings, dtype=np.float32, ndmin=2)
+        if len(batch) != len(texts) or len(texts) != len(metadata_list):
+            raise ValueError("embeddings, texts and metadata_list must have the same length")
+        if ids is not None:
+            if len(ids) != len(texts):
+                raise ValueError("ids must have the same length as texts")
+            if len({str(doc_id) for doc_id in ids}) != len(ids):
+                raise ValueError("ids must be unique within a batch")
+        return batch
+
+    def add_batch(self, embeddings, texts: Sequence[str],
+                  metadata_list: Optional[Sequence[Dict[str, Any]]] = None,
+                  ids: Optional[Sequence[str]] = None) -> List[str]:
+        """VectorBackend.add_batch"""
+        if metadata_list is None:
+            metadata_list = [{} for _ in texts]
+        return self.add_documents(embeddings, list(texts), list(metadata_list), ids=ids)
+
+    @property
+    def _row_of_id(self) -> Dict[str, int]:
+        """Live document id -> row, built on first use"""
+        if self._row_of is None:
+            dead = self._dead_mask()
+            self._row_of = {
+                doc_id: row for row, doc_id in enumerate(self.doc_ids)
+                if dead is None or not dead[row]
             }
-            results.append(result)
-        
-        return results[:top_k]
-    
+        return self._row_of
+
+    def _dead_mask(self) -> Optional[np.ndarray]:
+        """Tombstone bitmap over the stored rows, or None when nothing is deleted"""
+        return self._dead[:self._size] if self._dead_count else None
+
+    def _tombstone(self, rows: Sequence[int]) -> int:
+        """
+        Mark rows deleted (caller holds the lock and publishes); returns how many
+        were live. The bitmap is copied, not updated, since snapshots share it.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if self._dead is not None:
+            rows = rows[~self._dead[rows]]
+        rows = np.unique(rows)
+        if len(rows) == 0:
+            return 0
+        if self._dead is None:
+            dead = np.zeros(max(self._size, self.initial_capacity), dtype=bool)
+        else:
+            dead = self._dead.copy()
+        dead[rows] = True
+        self._dead = dead
+        self._dead_count += len(rows)
+        if self._row_of is not None:
+            for row in rows.tolist():
+                self._row_of.pop(self.doc_ids[row], None)
+        self.version += 1
+        return len(rows)
+
+    @property
+    def dead_fraction(self) -> float:
+        return self._dead_count / self._size if self._size else 0.0
+
+    def delete(self, ids: Sequence[str]) -> int:
+        """Delete documents by id; returns how many existed"""
+        with self._lock:
+            row_of = self._row_of_id
+            deleted = self._tombstone([row_of[str(doc_id)] for doc_id in ids if str(doc_id) in row_of])
+            self._publish()
+        self._maybe_compact()
+        return deleted
+
+    def delete_source(self, source_pdf: str) -> int:
+        """Delete every chunk of one PDF; returns how many there were"""
+        with self._lock:
+            deleted = self._tombstone(self._source_index.pop(source_pdf, []))
+            self._publish()
+        self._maybe_compact()
+        return deleted
+
+    def has_source(self, source_pdf: str) -> bool:
+        return len(self._source_index.get(source_pdf, [])) > 0
+
+    def replace_document(self, source_pdf: str, embeddings, texts: List[str],
+                         metadata_list: List[Dict[str, Any]]) -> List[str]:
+        """
+        Swap all chunks of `source_pdf` for new ones. Both steps are published as
+        one snapshot, so readers see either the old chunks or the new ones, never
+        both or neither.
+        """
+        with self._lock:
+            # Check the new chunks before dropping the old ones: a failed add would
+            # leave the tombstones for the next write to publish
+            if texts:
+                batch = self._check_batch(embeddings, texts, metadata_list)
+                if self.dimension is not None and batch.shape[1] != self.dimension:
+                    raise ValueError(f"Embedding dimension mismatch: {batch.shape[1]} != {self.dimension}")
+            self._tombstone(self._source_index.pop(source_pdf, []))
+            ids = self.add_documents(embeddings, texts, metadata_list) if texts else []
+            self._publish()
+        self._maybe_compact()
+        return ids
+
+    def _maybe_compact(self):
+        """Start a background compaction once enough of the store is tombstones"""
+        if self.compact_threshold is None or self.dead_fraction < self.compact_threshold:
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """
+        Rewrite storage without the deleted rows. The copy is made outside the lock,
+        so writes carry on meanwhile (searches never wait in any case); rows added or
+        deleted during the copy are carried over when the result is swapped in.
+        """
+        with self._compaction_lock:
+            with self._lock:
+                if not self._dead_count:
+                    return
+                size0 = self._size
+                keep0 = ~self._dead[:size0]
+                arrays = {name: getattr(self, name) for name in ("_matrix", "_codes", "_scales")}
+                documents, metadata, doc_ids = self.documents, self.metadata, self.doc_ids
+
+            kept = np.flatnonzero(keep0)
+            capacity = max(self.initial_capacity, len(kept) + len(kept) // 4)
+            compacted, new_documents, new_metadata, new_doc_ids = self._copy_rows(
+                kept, capacity, arrays, documents, metadata, doc_ids
+            )
+
+            with self._lock:
+                size = self._size
+                keep = np.ones(size, dtype=bool)
+                keep[:size0] = keep0
+                new_size = len(kept) + size - size0
+                for name, array in compacted.items():
+                    if new_size > len(array):
+                        grown = self._empty_rows(name, 2 * new_size, array.shape[1:], array.dtype)
+                        grown[:len(kept)] = array[:len(kept)]
+                        array = compacted[name] = grown
+                    array[len(kept):new_size] = getattr(self, name)[size0:size]
+
+                new_row = np.cumsum(keep) - 1
+                dead = np.zeros(len(next(iter(compacted.values()))) if compacted else capacity, dtype=bool)
+                dead[new_row[keep & self._dead[:size]]] = True
+
+                def remap(rows):
+                    rows = np.asarray(rows, dtype=np.int64)
+                    return new_row[rows[keep[rows]]].tolist()
+
+                self._source_index = {
+                    source: remapped for source, rows in self._source_index.items()
+                    if (remapped := remap(rows))
+                }
+                if self.ann_index is not None and self.ann_index.is_trained:
+                    index = self._new_ann_index()
+                    index.restore(self.ann_index.centroids, [remap(rows) for rows in self.ann_index._lists])
+                    self.ann_index = index
+                for name, array in compacted.items():
+                    setattr(self, name, array)
+                self.documents = new_documents + self.documents[size0:size]
+                self.metadata = new_metadata + self.metadata[size0:size]
+                self.doc_ids = new_doc_ids + self.doc_ids[size0:size]
+                self._dead = dead
+                self._dead_count = int(dead.sum())
+                self._row_of = None
+                self._size = new_size
+                self._generation += 1
+                self.compactions += 1
+                self.version += 1
+                self._publish()
+
+    def _copy_rows(self, kept: np.ndarray, capacity: int, arrays: Dict[str, Optional[np.ndarray]],
+                   documents, metadata, doc_ids):
+        """
+        The expensive part of compact(), run without the lock: rows that existed
+        when it started are never modified in place, so they can be read unlocked
+        """
+        compacted = {}
+        for name, array in arrays.items():
+            if array is not None:
+                compacted[name] = self._empty_rows(name, capacity, array.shape[1:], array.dtype)
+                compacted[name][:len(kept)] = array[kept]
+        return (compacted, [documents[row] for row in kept], [metadata[row] for row in kept],
+                [doc_ids[row] for row in kept])
+
+    def _update_ann_index(self, batch: np.ndarray):
+        """Train the ANN index once enough data exists, then insert incrementally"""
+        if self.ann_index is None:
+            return
+        if self.ann_index.is_trained:
+            self.ann_index.add(np.arange(self._size - len(batch), self._size), batch)
+        elif self._size >= self.ann_train_size:
+            self.rebuild_index()
+
+    def rebuild_index(self):
+        """Retrain the ANN centroids on the current corpus and reassign every row"""
+        with self._lock:
+            if self.ann_index is None or self._size == 0:
+                return
+            # Trained as a new index: searches may still be using the current one
+            index = self._new_ann_index()
+            vectors = self.vectors
+            index.train(vectors)
+            index.add(np.arange(self._size), vectors)
+            self.ann_index = index
+            self.version += 1  # Approximate results may change
+            self._publish()
+
+    def _new_ann_index(self) -> IVFIndex:
+        return IVFIndex(n_lists=self._n_lists, nprobe=self.ann_index.nprobe)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Positions of the top_k scores, best first, in O(n + k log k)"""
+        if top_k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if top_k < len(scores):
+            candidates = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    def _score(self, snap: _Snapshot, queries: np.ndarray, rows: Optional[np.ndarray] = None,
+               block_size: int = 16384) -> np.ndarray:
+        """(queries x rows) similarity matrix; rows=None scores the whole snapshot"""
+        if self.storage == "float32":
+            candidates = snap.matrix[:snap.size] if rows is None else snap.matrix[rows]
+            return queries @ candidates.T
+
+        # Asymmetric scoring: float queries against int8 codes, dequantized a
+        # block at a time so no full float copy of the corpus is ever made
+        n = snap.size if rows is None else len(rows)
+        scores = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            block = slice(start, stop) if rows is None else rows[start:stop]
+            scores[:, start:stop] = (queries @ snap.codes[block].T.astype(np.float32)) * snap.scales[block]
+        return scores
+
+    def _rank(self, snap: _Snapshot, query: np.ndarray, scores: np.ndarray,
+              rows: Optional[np.ndarray], top_k: int):
+        """
+        Top-k (row ids, similarities), re-scoring int8 candidates exactly if enabled.
+        Masked (-inf) rows only reach the top when fewer than top_k rows are live,
+        and are dropped here.
+        """
+        if self.rerank_factor:
+            top = self._top_k(scores, top_k * self.rerank_factor)
+            top = top[scores[top] > -np.inf]
+            ids = top if rows is None else rows[top]
+            exact = snap.matrix[ids] @ query
+            order = self._top_k(exact, top_k)
+            return ids[order], exact[order]
+
+        top = self._top_k(scores, top_k)
+        top = top[scores[top] > -np.inf]
+        ids = top if rows is None else rows[top]
+        return ids, scores[top]
+
+    @staticmethod
+    def _format_results(snap: _Snapshot, ids: np.ndarray, similarities: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": int(idx),
+                "text": snap.documents[idx],
+                "similarity": float(sim),
+                "metadata": snap.metadata[idx]
+            }
+            for idx, sim in zip(ids, similarities)
+        ]
+
+    def search(self, query_vector: List[float], top_k: int = 5, pdf_filter: str = None,
+               nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors"""
+        return self.search_many([query_vector], top_k=top_k, pdf_filter=pdf_filter, nprobe=nprobe)[0]
+
+    def search_many(self, query_vectors, top_k: int = 5, pdf_filter: str = None,
+                    nprobe: Optional[int] = None, block_size: int = 256,
+                    where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Score a batch of queries with one matrix-matrix product per block of queries.
+        `where` keeps only documents whose metadata has all of the given values.
+        Result ids are row numbers, which compaction changes; doc_ids are stable.
+        """
+        return self._search(self._snapshot, query_vectors, top_k, pdf_filter, nprobe, block_size, where)
+
+    def _search(self, snap: _Snapshot, query_vectors, top_k: int, pdf_filter: Optional[str],
+                nprobe: Optional[int], block_size: int,
+                where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        queries = np.array(query_vectors, dtype=np.float32, ndmin=2)
+        # Rows are stored normalized, so cosine similarity is a plain product
+        queries = self._normalize(queries)
+        if snap.size == snap.dead_count:
+            return [[] for _ in queries]
+
+        # Restrict to the filtered rows before ranking so a filter never
+        # eats into top_k and only the subset gets scored
+        if pdf_filter or where:
+            rows = self._filter_rows(snap, pdf_filter, where)
+            if len(rows) == 0:
+                return [[] for _ in queries]
+        elif snap.ann_index is not None and snap.ann_index.is_trained:
+            return self._search_ann(snap, queries, top_k, nprobe)
+        else:
+            rows = None
+
+        # Whole-corpus scoring masks tombstones in the score matrix it already
+        # has, rather than copying the live rows out
+        dead_rows = snap.dead_rows if rows is None else None
+        results = []
+        # Blocking bounds the (queries x corpus) score matrix
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            block_scores = self._score(snap, block, rows)
+            if dead_rows is not None:
+                block_scores[:, dead_rows] = -np.inf
+            for query, query_scores in zip(block, block_scores):
+                ids, sims = self._rank(snap, query, query_scores, rows, top_k)
+                results.append(self._format_results(snap, ids, sims))
+        return results
+
+    @staticmethod
+    def _filter_rows(snap: _Snapshot, pdf_filter: Optional[str], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Sorted live row ids matching both filters; source_pdf goes through the source index"""
+        where = dict(where or {})
+        if pdf_filter:
+            if where.setdefault("source_pdf", pdf_filter) != pdf_filter:
+                return np.empty(0, dtype=np.int64)
+        rows = None
+        if "source_pdf" in where:
+            rows = snap.live(np.sort(np.asarray(snap.source_index.get(where.pop("source_pdf"), []), dtype=np.int64)))
+        if where:
+            candidates = range(snap.size) if rows is None else rows.tolist()
+            rows = np.asarray([
+                row for row in candidates
+                if all(snap.metadata[row].get(key) == value for key, value in where.items())
+            ], dtype=np.int64)
+        return snap.live(rows)
+
+    def search_batch(self, query_vectors, top_k: int = 5,
+                     where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """VectorBackend.search_batch: search_many with hits keyed by document id"""
+        snap = self._snapshot  # Row numbers are only meaningful within one snapshot
+        return [
+            [
+                {"id": snap.doc_ids[hit["id"]], "text": hit["text"],
+                 "metadata": hit["metadata"], "similarity": hit["similarity"]}
+                for hit in hits
+            ]
+            for hits in self._search(snap, query_vectors, top_k, None, None, 256, where)
+        ]
+
+    def _search_ann(self, snap: _Snapshot, queries: np.ndarray, top_k: int,
+                    nprobe: Optional[int]) -> List[List[Dict[str, Any]]]:
+        """Exact re-scoring of the rows in each query's probed IVF buckets"""
+        results = []
+        for query, rows in zip(queries, snap.ann_index.candidates(queries, nprobe)):
+            rows = snap.live(rows)
+            ids, sims = self._rank(snap, query, self._score(snap, query[None], rows)[0], rows, top_k)
+            results.append(self._format_results(snap, ids, sims))
+        return results
+
+    def _bytes_per_vector(self) -> int:
+        if not self.dimension:
+            return 0
+        size = 0
+        if self.keeps_float_rows:
+            size += 4 * self.dimension
+        if self.storage == "int8":
+            size += self.dimension + 4  # codes + float32 scale
+        return size
+
+    def save(self, path: str):
+        """
+        Write a snapshot directory: raw .npy arrays for the vectors and row id groups,
+        and offsets + concatenated UTF-8 blobs for texts and metadata. Deleted rows
+        are left out, so a snapshot is always compact.
+
+        The published read snapshot is written, so writers are only held up for
+        the moment it takes to pick it up, not for the I/O. One process at a time
+        may save to a given path.
+        """
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        with self._lock:
+            snap = self._snapshot
+            next_id = self._next_id
+
+        n = snap.size
+        dead = snap.dead[:n] if snap.dead is not None else None
+        new_row = np.cumsum(~dead) - 1 if dead is not None else None
+        rows = np.flatnonzero(~dead) if dead is not None else slice(0, n)
+        live = rows.tolist() if dead is not None else range(n)
+
+        def remap(group):
+            # Groups may already hold rows added after the snapshot
+            group = snap.live(np.asarray(group, dtype=np.int64))
+            return new_row[group] if new_row is not None else group
+
+        if snap.matrix is not None:
+            np.save(os.path.join(tmp_path, "vectors.npy"), snap.matrix[:n][rows])
+        if snap.codes is not None:
+            np.save(os.path.join(tmp_path, "codes.npy"), snap.codes[:n][rows])
+            np.save(os.path.join(tmp_path, "scales.npy"), snap.scales[:n][rows])
+        write_blob(tmp_path, "documents", (snap.documents[row].encode("utf-8") for row in live))
+        write_blob(tmp_path, "metadata", (encode_json(snap.metadata[row]) for row in live))
+        write_blob(tmp_path, "ids", (snap.doc_ids[row].encode("utf-8") for row in live))
+        save_groups(tmp_path, "sources", [remap(group) for group in snap.source_index.values()])
+
+        ann_trained = snap.ann_index is not None and snap.ann_index.is_trained
+        if ann_trained:
+            np.save(os.path.join(tmp_path, "ivf_centroids.npy"), snap.ann_index.centroids)
+            save_groups(tmp_path, "ivf", [remap(group) for group in snap.ann_index._lists])
+
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "size": len(live),
+            "dimension": self.dimension,
+            "storage": self.storage,
+            "rerank_factor": self.rerank_factor,
+            "index_type": self.index_type,
+            "nprobe": snap.ann_index.nprobe if snap.ann_index is not None else None,
+            "n_lists": snap.ann_index.n_lists if snap.ann_index is not None else None,
+            "ann_train_size": self.ann_train_size,
+            "ann_trained": ann_trained,
+            "sources": list(snap.source_index),
+            "next_id": next_id,
+            "embedder": self.embedder
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        replace_directory(tmp_path, path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(resolve_directory(path), "manifest.json"))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorStore":
+        """
+        Open a snapshot written by save(). With mmap=True arrays and blobs are mapped
+        read-only, so opening is O(1) and workers share pages through the page cache;
+        the first append copies the vectors into private memory.
+        """
+        for attempt in range(3):
+            # Resolved once per attempt, so every file comes from the same version
+            version_path = resolve_directory(path)
+            try:
+                return cls._load_version(version_path, mmap)
+            except FileNotFoundError:
+                # Saves kept replacing the snapshot until this version was removed
+                if attempt == 2 or resolve_directory(path) == version_path:
+                    raise
+
+    @classmethod
+    def _load_version(cls, path: str, mmap: bool) -> "VectorStore":
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {manifest['version']}")
+
+        store = cls(
+            dimension=manifest["dimension"],
+            index_type=manifest["index_type"],
+            n_lists=manifest["n_lists"],
+            nprobe=manifest["nprobe"] or 8,
+            ann_train_size=manifest["ann_train_size"],
+            storage=manifest["storage"],
+            rerank_factor=manifest["rerank_factor"]
+        )
+        mode = "r" if mmap else None
+
+        def load_array(name):
+            file_path = os.path.join(path, f"{name}.npy")
+            return np.load(file_path, mmap_mode=mode) if os.path.exists(file_path) else None
+
+        store._matrix = load_array("vectors")
+        store._codes = load_array("codes")
+        store._scales = load_array("scales")
+        store._size = manifest["size"]
+        store.documents = BlobRecords(*read_blob(path, "documents", mmap), decode_text)
+        store.metadata = BlobRecords(*read_blob(path, "metadata", mmap), decode_json)
+        store._source_index = dict(zip(manifest["sources"], load_groups(path, "sources", mmap)))
+        if os.path.exists(os.path.join(path, "ids.bin")):
+            store.doc_ids = BlobRecords(*read_blob(path, "ids", mmap), decode_text)
+        else:  # Written before documents had ids: they were numbered by row
+            store.doc_ids = [str(row) for row in range(store._size)]
+        store._next_id = manifest.get("next_id", store._size)
+        store.embedder = manifest.get("embedder")  # None: saved before embedders were recorded
+
+        if manifest["ann_trained"]:
+            store.ann_index.restore(load_array("ivf_centroids"), load_groups(path, "ivf", mmap))
+
+        store._publish()
+        return store
+
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics"""
         return {
-            "total_documents": len(self.documents),
-            "vector_dimension": len(self.vectors[0]) if self.vectors else 0,
-            "unique_sources": len(set(m.get("source_pdf", "") for m in self.metadata))
-        }
\ No newline at end of file
+            "total_documents": self._size - self._dead_count,
+            "deleted_documents": self._dead_count,
+            "compactions": self.compactions,
+            "vector_dimension": self.dimension if self._size else 0,
+            "unique_sources": len(self._source_index),
+            "memory_bytes": sum(int(a.nbytes) for a in (self._matrix, self._codes, self._scales) if a is not None),
+            "storage": self.storage,
+            "bytes_per_vector": self._bytes_per_vector(),
+            "index_type": self.index_type,
+            "ann_index": self.ann_index.get_stats() if self.ann_index is not None else None,
+            "embedder": self.embedder
+        }
+
+    def flush(self):
+        """Nothing to do: this store lives in memory (MmapVectorStore persists)"""
+
+    def stats(self) -> Dict[str, Any]:
+        """VectorBackend.stats; memory_bytes counts private memory, mapped_bytes the mapped snapshot"""
+        arrays = [a for a in (self._matrix, self._codes, self._scales) if a is not None]
+        return {
+            "backend": self.name,
+            "documents": self._size - self._dead_count,
+            "dimension": self.dimension if self._size else 0,
+            "memory_bytes": sum(int(a.nbytes) for a in arrays if not isinstance(a, np.memmap)),
+            "mapped_bytes": sum(int(a.nbytes) for a in arrays if isinstance(a, np.memmap)),
+            "storage": self.storage,
+            "index_type": self.index_type
+        }
+
+
+class MmapVectorStore(VectorStore):
+    """
+    VectorStore persisted as a snapshot directory and opened memory-mapped, so the
+    vectors sit in the page cache rather than in process memory. Writes collect in
+    memory until flush() writes a new snapshot and maps it again.
+    """
+    name = "numpy-mmap"
+
+    def __init__(self, path: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    @classmethod
+    def open(cls, path: str, **kwargs) -> "MmapVectorStore":
+        """Map the snapshot at `path`, or start an empty store (with `kwargs`) that flushes there"""
+        store = cls.load(path, mmap=True) if cls.exists(path) else cls(**kwargs)
+        store.path = path
+        return store
+
+    def flush(self):
+        # Reloading renumbers rows, so a compaction must not be between its copy
+        # and its swap (it would merge stale row numbers); same order as compact()
+        with self._compaction_lock, self._lock:
+            self.save(self.path)
+            mapped = self.load(self.path, mmap=True)
+            state = {
+                name: value for name, value in mapped.__dict__.items()
+                if name not in ("path", "_lock", "_compaction_lock", "_compactor", "compact_threshold", "compactions",
+                                "row_allocator")
+            }
+            state["version"] = self.version + 1  # Deleted rows are gone, so row numbers changed
+            state["_generation"] = self._generation + 1
+            self.__dict__.update(state)
+            self._publish()
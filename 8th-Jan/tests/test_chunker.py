@@ -0,0 +1,54 @@
+import pytest
+from services.chunker import word_spans, split_text, iter_page_chunks
+
+
+def legacy_split(text, chunk_size, overlap):
+    words = text.split()
+    chunks = []
+    for i in range(0, len(words), chunk_size - overlap):
+        chunks.append(' '.join(words[i:i + chunk_size]))
+        if i + chunk_size >= len(words):
+            break
+    return chunks
+
+
+TEXT = "  Alpha beta\tgamma\n\ndelta épsilon  ζeta　eta theta iota kappa lambda mu nu xi "
+
+
+def test_word_spans_match_str_split():
+    starts, ends = word_spans(TEXT)
+    assert [TEXT[s:e] for s, e in zip(starts, ends)] == TEXT.split()
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(3, 1), (4, 0), (5, 4), (14, 2), (50, 10)])
+def test_split_text_matches_legacy_word_windows(chunk_size, overlap):
+    chunks = split_text(TEXT, chunk_size, overlap)
+    assert [" ".join(c.split()) for c in chunks] == legacy_split(TEXT, chunk_size, overlap)
+
+
+def test_invalid_window_rejected():
+    with pytest.raises(ValueError):
+        split_text(TEXT, 5, 5)
+
+
+def pages(*texts):
+    return [{"text": t, "page_number": i + 1} for i, t in enumerate(texts)]
+
+
+def test_page_chunks_per_page_match_split_text():
+    docs = pages("a b c d e f g", "", "h i j", "k l m n o p q r s")
+    chunks = list(iter_page_chunks(docs, chunk_size=4, overlap=1, across_pages=False))
+    expected = [(p["page_number"], c) for p in docs for c in split_text(p["text"], 4, 1)]
+    assert [(c["page"], c["text"]) for c in chunks] == expected
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_page_chunks_cross_page_boundaries_with_spans():
+    docs = pages("a b c d e", "f g h", "i j k l m n")
+    chunks = list(iter_page_chunks(docs, chunk_size=4, overlap=1))
+    assert [" ".join(c["text"].split()) for c in chunks] == legacy_split("a b c d e f g h i j k l m n", 4, 1)
+
+    crossing = chunks[1]  # d e | f g
+    assert (crossing["page"], crossing["end_page"]) == (1, 2)
+    assert docs[0]["text"][crossing["char_start"]:] == "d e"
+    assert docs[1]["text"][:crossing["char_end"]] == "f g"
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from services.embedding import EmbeddingService
+from services.embedding_cache import EmbeddingCache
+
+TEXTS = ["Vector databases store embeddings", "Embedding models convert text to vectors",
+         "The cat sat on the mat", "", "  !!  "]
+
+
+def make_service(**kwargs) -> EmbeddingService:
+    return EmbeddingService(cache=EmbeddingCache(), **kwargs)
+
+
+def test_batch_is_a_normalized_float32_matrix():
+    embeddings = make_service(dimension=64).embed_batch(TEXTS)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (len(TEXTS), 64)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+    assert make_service().embed_batch([]).shape == (0, 384)
+
+
+def test_same_vector_alone_in_a_batch_or_from_the_cache():
+    service = make_service()
+    batch = service.embed_batch(TEXTS)
+
+    for text, row in zip(TEXTS, batch):
+        np.testing.assert_array_equal(make_service()._compute_embeddings([text])[0], row)
+        assert service.get_embedding(text) == row.tolist()
+    assert service.cache.get_stats()["memory_hits"] == len(TEXTS)
+
+
+def test_shared_words_score_higher():
+    query, related, unrelated = make_service().embed_batch(
+        ["vector embeddings", TEXTS[0], TEXTS[2]])
+    assert query @ related > query @ unrelated
+
+
+def test_stable_across_processes_and_threads():
+    """Different hash seeds in a child process must not change the vectors"""
+    script = ("import sys; from services.embedding import EmbeddingService; "
+              "from services.embedding_cache import EmbeddingCache; "
+              f"sys.stdout.write(EmbeddingService(cache=EmbeddingCache()).embed_batch({TEXTS!r}).tobytes().hex())")
+    env = dict(os.environ, PYTHONHASHSEED="12345")
+    child = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+    expected = make_service().embed_batch(TEXTS)
+    assert bytes.fromhex(child.stdout.strip().splitlines()[-1]) == expected.tobytes()
+
+    texts = [f"chunk {i} about topic {i % 13}" for i in range(2000)]
+    serial = make_service()._compute_embeddings(texts)
+    service = make_service()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        parts = list(pool.map(service._compute_embeddings, [texts[i:i + 100] for i in range(0, len(texts), 100)]))
+    np.testing.assert_array_equal(np.concatenate(parts), serial)
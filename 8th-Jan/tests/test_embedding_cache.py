@@ -0,0 +1,39 @@
+import numpy as np
+from services.embedding_cache import EmbeddingCache
+
+
+def test_memory_tier_hits_and_normalizes_whitespace():
+    cache = EmbeddingCache()
+    cache.put("m", "hello   world", [1.0, 2.0])
+
+    assert cache.get("m", " hello world\n").tolist() == [1.0, 2.0]
+    assert cache.get("other-model", "hello world") is None
+    assert cache.get_stats()["memory_hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_lru_eviction_respects_byte_budget():
+    cache = EmbeddingCache(max_bytes=3 * 16)  # three 4-dim float32 vectors
+    for i in range(4):
+        cache.put("m", f"t{i}", np.full(4, i))
+    cache.get("m", "t1")  # t1 becomes most recent
+    cache.put("m", "t4", np.full(4, 4))
+
+    assert cache.get("m", "t0") is None
+    assert cache.get("m", "t2") is None
+    assert cache.get("m", "t1") is not None
+    assert cache.get_stats()["memory_bytes"] <= 3 * 16
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    EmbeddingCache(path=path).put_many("m", ["a", "b"], [[0.5, 0.25], None])
+
+    reopened = EmbeddingCache(path=path)
+    hits = reopened.get_many("m", ["a", "b"])
+
+    assert hits[0].tolist() == [0.5, 0.25]
+    assert hits[1] is None
+    assert reopened.get_stats()["disk_hits"] == 1
+    reopened.get("m", "a")
+    assert reopened.get_stats()["memory_hits"] == 1
@@ -0,0 +1,78 @@
+import os
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api import endpoints
+from services.jobs import IngestionJobManager
+from services.search import SearchService
+from test_pdf_processor import write_pdf
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(endpoints, "search_service", SearchService(index_path=""))
+    monkeypatch.setattr(endpoints, "ingestion_jobs", IngestionJobManager(max_concurrent=1, max_queued=1))
+    app = FastAPI()
+    app.include_router(endpoints.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        yield client
+
+
+def upload(client, path, **params):
+    with open(path, "rb") as file:
+        return client.post("/api/v1/upload-pdf", params=params,
+                           files={"file": (os.path.basename(path), file, "application/pdf")})
+
+
+def upload_dir_files():
+    return sorted(os.listdir("data/uploaded_pdfs"))
+
+
+def test_upload_is_indexed_and_its_job_polled(client, tmp_path):
+    pdf_path = write_pdf(tmp_path / "report.pdf", ["alpha beta gamma", "delta epsilon"])
+
+    response = upload(client, pdf_path, wait=True, chunk_size=2, overlap=0)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["status"], body["total_chunks"]) == ("completed", 3)
+    assert upload_dir_files() == ["report.pdf"]  # The per-job copy was moved into place
+
+    job = client.get(f"/api/v1/jobs/{body['job_id']}").json()
+    assert (job["filename"], job["status"], job["chunks_indexed"]) == ("report.pdf", "completed", 3)
+    assert (job["pages_done"], job["total_pages"]) == (2, 2)
+    assert client.get("/api/v1/jobs/missing").status_code == 404
+    assert endpoints.search_service.vector_store.has_source("report.pdf")
+
+
+def test_busy_uploads_leave_the_saved_file_alone(client, tmp_path):
+    pdf_path = write_pdf(tmp_path / "report.pdf", ["first version"])
+    assert upload(client, pdf_path, wait=True).status_code == 200
+    saved = open("data/uploaded_pdfs/report.pdf", "rb").read()
+
+    release = threading.Event()
+
+    def blocked(progress):
+        release.wait(5)
+        return 0
+
+    jobs = endpoints.ingestion_jobs
+    os.makedirs(tmp_path / "newer")
+    newer = write_pdf(tmp_path / "newer" / "report.pdf", ["second version"])
+    try:
+        # Queue full: refused before anything replaces the indexed file
+        jobs.submit("a.pdf", blocked)
+        jobs.submit("b.pdf", blocked)
+        assert upload(client, newer).status_code == 429
+
+        # Same name as a pending job: refused, and so is deleting it meanwhile
+        jobs.max_queued += 1
+        jobs.submit("report.pdf", blocked)
+        assert upload(client, newer).status_code == 409
+        assert client.delete("/api/v1/pdf/report.pdf").status_code == 409
+
+        assert open("data/uploaded_pdfs/report.pdf", "rb").read() == saved
+        assert upload_dir_files() == ["report.pdf"]
+    finally:
+        release.set()
@@ -0,0 +1,102 @@
+import threading
+import pytest
+from services.jobs import IngestionJobManager, JobConflictError, QueueFullError
+
+
+def blocking_work(release: threading.Event, chunks: int = 3):
+    def work(progress):
+        release.wait(5)
+        return chunks
+    return work
+
+
+def test_exclusive_refused_while_a_job_for_the_file_is_pending():
+    manager = IngestionJobManager(max_concurrent=1, max_queued=5)
+    release = threading.Event()
+    running = manager.submit("a.pdf", blocking_work(release))
+    queued = manager.submit("b.pdf", blocking_work(release))
+
+    for filename in ("a.pdf", "b.pdf"):
+        with pytest.raises(JobConflictError):
+            with manager.exclusive(filename):
+                pass
+    with manager.exclusive("c.pdf"):
+        # New jobs for a held file are refused until the block ends
+        with pytest.raises(JobConflictError):
+            manager.submit("c.pdf", blocking_work(release))
+
+    release.set()
+    assert running.future.result() == queued.future.result() == 3
+    with manager.exclusive("a.pdf"):
+        pass
+    assert manager.submit("c.pdf", blocking_work(release)).future.result() == 3
+
+
+def test_progress_is_reported_while_running():
+    manager = IngestionJobManager(max_concurrent=1, max_queued=5)
+    reported, release = threading.Event(), threading.Event()
+
+    def work(progress):
+        progress(2, 10, 16)
+        reported.set()
+        release.wait(5)
+        progress(10, 10, 80)
+        return 80
+
+    job = manager.submit("a.pdf", work)
+    assert reported.wait(5)
+    state = job.to_dict()
+    assert (state["status"], state["pages_done"], state["total_pages"], state["chunks_indexed"]) == \
+        ("running", 2, 10, 16)
+    assert manager.get_stats()["running"] == 1
+
+    release.set()
+    assert job.future.result() == 80
+    assert manager.get(job.job_id).to_dict()["status"] == "completed"
+    assert job.to_dict()["chunks_indexed"] == 80 and job.finished_at is not None
+
+
+def test_failed_job_records_its_error():
+    manager = IngestionJobManager(max_concurrent=1, max_queued=5)
+
+    def work(progress):
+        raise ValueError("not a PDF")
+
+    job = manager.submit("a.pdf", work)
+    with pytest.raises(ValueError):
+        job.future.result()
+    assert (job.status, job.error) == ("failed", "not a PDF")
+    # A failed job no longer blocks the file
+    assert manager.submit("a.pdf", lambda progress: 1).future.result() == 1
+
+
+def test_queue_full_and_one_pending_job_per_file():
+    manager = IngestionJobManager(max_concurrent=1, max_queued=1)
+    release = threading.Event()
+    manager.submit("a.pdf", blocking_work(release))
+    with pytest.raises(JobConflictError):
+        manager.submit("a.pdf", blocking_work(release))
+    manager.submit("b.pdf", blocking_work(release))
+    with pytest.raises(QueueFullError):
+        manager.submit("c.pdf", blocking_work(release))
+    stats = manager.get_stats()
+    assert stats["queued"] + stats["running"] == 2 and stats["completed"] == stats["failed"] == 0
+    release.set()
+
+
+def test_oldest_finished_jobs_are_pruned():
+    manager = IngestionJobManager(max_concurrent=1, max_queued=5, max_history=2)
+    finished = [manager.submit(f"{i}.pdf", lambda progress: 1) for i in range(3)]
+    for job in finished:
+        job.future.result()
+    release = threading.Event()
+    pending = [manager.submit(f"p{i}.pdf", blocking_work(release)) for i in range(2)]
+
+    # Pending jobs are kept even beyond max_history; finished ones go oldest first
+    assert all(manager.get(job.job_id) is not None for job in pending)
+    assert [manager.get(job.job_id) is not None for job in finished] == [False, False, False]
+    release.set()
+    for job in pending:
+        job.future.result()
+    manager.submit("last.pdf", lambda progress: 1).future.result()
+    assert [manager.get(job.job_id) is not None for job in pending] == [False, True]
@@ -0,0 +1,42 @@
+import pytest
+from services.pdf_processor import PDFProcessor
+
+
+def write_pdf(path, page_texts):
+    """Minimal PDF with one line of Helvetica text per page ("" makes a blank page)"""
+    n = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(n)) + b"] /Count %d >>" % n,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        content = b"BT /F1 12 Tf 72 720 Td (%s) Tj ET" % text.encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pages_stream_in_order(tmp_path, workers):
+    texts = [f"page {i + 1}" if i % 5 else "" for i in range(40)]
+    pdf_path = write_pdf(tmp_path / "doc.pdf", texts)
+
+    pages = list(PDFProcessor.iter_pages(pdf_path, workers=workers, pages_per_shard=3, min_parallel_pages=10))
+
+    expected = [i + 1 for i, text in enumerate(texts) if text]
+    assert [page["page_number"] for page in pages] == expected
+    assert all(page["text"].strip() == f"page {page['page_number']}" for page in pages)
+    assert {(page["total_pages"], page["pdf_name"]) for page in pages} == {(40, "doc.pdf")}
@@ -0,0 +1,34 @@
+import pytest
+from services.pipeline import pipelined, batched
+
+
+def test_pipelined_preserves_order_through_stages():
+    stage = pipelined((i * 2 for i in range(1000)), maxsize=4)
+    assert list(batched(pipelined(stage, maxsize=2), 300)) == [
+        list(range(0, 600, 2)), list(range(600, 1200, 2)), list(range(1200, 1800, 2)), list(range(1800, 2000, 2))
+    ]
+
+
+def test_pipelined_reraises_producer_errors():
+    def failing():
+        yield 1
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(pipelined(failing(), maxsize=1))
+
+
+def test_closing_consumer_stops_producer():
+    closed = []
+
+    def source():
+        try:
+            for i in range(10_000):
+                yield i
+        finally:
+            closed.append(True)
+
+    stage = pipelined(source(), maxsize=2)
+    assert next(stage) == 0
+    stage.close()
+    assert closed == [True]
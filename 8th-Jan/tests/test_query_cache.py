@@ -0,0 +1,56 @@
+import numpy as np
+from services.query_cache import QueryCache
+from services.search import SearchService
+
+
+def test_keys_cover_every_parameter():
+    key = QueryCache.make_key(query="q", top_k=5, pdf_filter=None)
+
+    assert key == QueryCache.make_key(pdf_filter=None, top_k=5, query="q")
+    assert key != QueryCache.make_key(query="q", top_k=6, pdf_filter=None)
+    assert key != QueryCache.make_key(query="q", top_k=5, pdf_filter="a.pdf")
+    assert QueryCache.make_key(vectors=np.array([0.5, 1.0])) == QueryCache.make_key(vectors=[0.5, 1.0])
+
+
+def test_version_bump_invalidates():
+    cache = QueryCache()
+    cache.put(b"k", 1, "old")
+
+    assert cache.get(b"k", 1) == "old"
+    assert cache.get(b"k", 2) is None
+    cache.put(b"k", 2, "new")
+    cache.put(b"stale", 1, "computed before the bump")
+    assert cache.get(b"k", 2) == "new"
+    assert cache.get(b"stale", 2) is None
+    assert cache.get_stats()["hit_rate"] == 0.5
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = QueryCache(max_entries=2, ttl_seconds=10)
+    now = [100.0]
+    monkeypatch.setattr("services.query_cache.time.monotonic", lambda: now[0])
+    cache.put(b"a", 0, 1)
+    cache.put(b"b", 0, 2)
+    cache.get(b"a", 0)
+    cache.put(b"c", 0, 3)
+
+    assert cache.get(b"b", 0) is None
+    assert cache.get(b"a", 0) == 1
+    now[0] += 11
+    assert cache.get(b"c", 0) is None
+
+
+def test_search_service_serves_repeats_until_index_changes():
+    service = SearchService(index_path="")
+    first = service.search_documents("vector databases", top_k=2)
+    again = service.search_documents("vector databases", top_k=2)
+    assert again["chunks"] == first["chunks"]
+    assert service.query_cache.get_stats()["hits"] == 1
+
+    service.search_many(["vector databases", "neural networks"], top_k=2)
+    assert service.query_cache.get_stats()["hits"] == 2
+
+    text = "Vector databases index embeddings for similarity search."
+    service.vector_store.add_document(service.embedding_service.get_embedding(text), text, {"source_pdf": "new.pdf"})
+    service.search_documents("vector databases", top_k=2)
+    assert service.query_cache.get_stats()["hits"] == 2
@@ -0,0 +1,55 @@
+import time
+import numpy as np
+from services.search import SearchService
+from services.vector_store import VectorStore
+
+
+def test_index_is_saved_periodically_and_on_close(tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    monkeypatch.setenv("VECTOR_SAVE_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("VECTOR_COMPACT_THRESHOLD", "1.0")  # No background version bumps
+    service = SearchService(index_path=path)
+    assert service.delete_pdf("ai_basics.pdf") == 2
+    assert not VectorStore.exists(path)  # Not rewritten per change
+
+    service.close()
+    assert VectorStore.load(path).get_stats()["total_documents"] == 3
+    assert not service.save_index(force=False)
+
+    monkeypatch.setenv("VECTOR_SAVE_INTERVAL_SECONDS", "0.05")
+    reopened = SearchService(index_path=path)
+    try:
+        reopened.delete_pdf("vector_db.pdf")
+        deadline = time.monotonic() + 5
+        while VectorStore.load(path).get_stats()["total_documents"] != 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert VectorStore.load(path).get_stats()["total_documents"] == 1
+    finally:
+        reopened.close()
+
+
+def test_index_from_another_embedder_is_reembedded(tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    monkeypatch.setenv("VECTOR_SAVE_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("VECTOR_COMPACT_THRESHOLD", "1.0")
+    monkeypatch.setenv("EMBEDDING_DIMENSION", "384")
+    service = SearchService(index_path=path)
+    service.delete_pdf("embeddings.pdf")
+    service.close()
+    assert VectorStore.load(path).embedder == "text-embedding-ada-002/hashed-384"
+
+    # A new dimension used to fail every search with a shape mismatch
+    monkeypatch.setenv("EMBEDDING_DIMENSION", "64")
+    service = SearchService(index_path=path)
+    results = service.search_documents("vector databases", top_k=2)
+    assert results["chunks"][0]["source_pdf"] == "vector_db.pdf"
+    assert service.vector_store.get_stats()["total_documents"] == 4
+    service.close()
+
+    saved = VectorStore.load(path)
+    assert (saved.embedder, saved.dimension) == ("text-embedding-ada-002/hashed-64", 64)
+    # Same embedder: the saved vectors are used as they are
+    reopened = SearchService(index_path=path)
+    np.testing.assert_array_equal(reopened.vector_store.vectors, saved.vectors)
+    assert list(reopened.vector_store.doc_ids) == list(saved.doc_ids)
+    reopened.close()
@@ -0,0 +1,110 @@
+import gc
+import numpy as np
+import pytest
+from services.sharded_search import ShardedSearch
+from services.vector_store import VectorStore
+
+DIM = 16
+
+
+def make_batch(rng, n: int, start: int = 0):
+    embeddings = rng.normal(size=(n, DIM)).astype(np.float32)
+    texts = [f"doc {start + i}" for i in range(n)]
+    metadata = [{"source_pdf": f"doc_{(start + i) % 7}.pdf"} for i in range(n)]
+    return embeddings, texts, metadata
+
+
+def assert_same_results(sharded, store, queries, top_k):
+    expected = store.search_many(queries, top_k=top_k)
+    found = sharded.search_many(queries, top_k=top_k)
+    for want, got in zip(expected, found):
+        assert [hit["id"] for hit in got] == [hit["id"] for hit in want]
+        assert [hit["text"] for hit in got] == [hit["text"] for hit in want]
+        np.testing.assert_allclose([hit["similarity"] for hit in got],
+                                   [hit["similarity"] for hit in want], rtol=1e-5)
+
+
+@pytest.fixture
+def store():
+    return VectorStore(initial_capacity=64, compact_threshold=None)
+
+
+@pytest.fixture
+def sharded(store):
+    search = ShardedSearch(store, workers=2)
+    yield search
+    search.close()
+
+
+def test_sharded_results_match_store_as_it_changes(store, sharded):
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(5, DIM)).astype(np.float32)
+    assert sharded.search_many(queries, top_k=3) == [[] for _ in queries]
+
+    store.add_documents(*make_batch(rng, 300))
+    assert_same_results(sharded, store, queries, top_k=10)
+    # The store's own matrix is the shared one: no second copy of the rows
+    assert sharded._is_shared(store._matrix) and sharded.remaps == 1
+
+    # Appends that fit are written straight into the shared rows
+    store.add_documents(*make_batch(rng, 700, start=300))
+    sharded.search(queries[0])
+    remaps = sharded.remaps
+    store.add_documents(*make_batch(rng, 20, start=1000))
+    assert_same_results(sharded, store, queries, top_k=10)
+    assert sharded.remaps == remaps
+
+    # Tombstones are masked, and compaction renumbers rows into a new matrix
+    store.delete_source("doc_3.pdf")
+    assert_same_results(sharded, store, queries, top_k=10)
+    store.compact()
+    assert_same_results(sharded, store, queries, top_k=10)
+    assert sharded.remaps == remaps + 1 and sharded._is_shared(store._matrix)
+
+    # Outgrowing the matrix also remaps
+    store.add_documents(*make_batch(rng, 2000, start=1020))
+    assert_same_results(sharded, store, queries, top_k=10)
+    assert sharded.remaps == remaps + 2
+    assert sharded.get_stats()["shared_rows"] == store._snapshot.size
+
+
+def test_shared_files_follow_the_store(tmp_path):
+    rng = np.random.default_rng(2)
+    store = VectorStore(initial_capacity=64, compact_threshold=None)
+    store.add_documents(*make_batch(rng, 100))
+    store.save(str(tmp_path / "index"))
+    loaded = VectorStore.load(str(tmp_path / "index"), mmap=True)
+
+    shared_dir = tmp_path / "shm"
+    shared_dir.mkdir()
+    sharded = ShardedSearch(loaded, workers=2, shared_dir=str(shared_dir))
+    try:
+        queries = rng.normal(size=(3, DIM)).astype(np.float32)
+        assert_same_results(sharded, store, queries, top_k=5)
+        assert sharded._is_shared(loaded._matrix)  # Moved out of the snapshot's mapping
+        loaded.add_documents(*make_batch(rng, 500, start=100))
+        loaded.delete([loaded.doc_ids[0]])
+        sharded.search(queries[0])
+    finally:
+        sharded.close()
+
+    # Files the store moved on from are gone; its current matrix stays until it is dropped
+    assert len(list(shared_dir.iterdir())) == 1
+    assert loaded.search(queries[0], top_k=3)
+    del loaded, sharded
+    gc.collect()
+    assert list(shared_dir.iterdir()) == []
+
+
+def test_top_k_larger_than_a_shard(store, sharded):
+    rng = np.random.default_rng(1)
+    store.add_documents(*make_batch(rng, 5))
+    store.delete([store.doc_ids[0]])
+    results = sharded.search(rng.normal(size=DIM), top_k=10)
+    assert len(results) == 4
+    assert all(hit["text"] != "doc 0" for hit in results)
+
+
+def test_int8_only_storage_is_rejected():
+    with pytest.raises(ValueError):
+        ShardedSearch(VectorStore(storage="int8"), workers=2)
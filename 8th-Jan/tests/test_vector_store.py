@@ -0,0 +1,439 @@
+import os
+import shutil
+import threading
+import numpy as np
+import pytest
+from services import persistence
+from services.backend import VectorBackend
+from services.vector_store import MmapVectorStore, VectorStore
+
+DIM = 16
+
+
+def make_store(n=50, sources=("a.pdf", "b.pdf"), seed=0):
+    rng = np.random.default_rng(seed)
+    store = VectorStore(initial_capacity=4)
+    vectors = rng.random((n, DIM), dtype=np.float32)
+    for i, vec in enumerate(vectors):
+        store.add_document(vec.tolist(), f"chunk {i}", {"source_pdf": sources[i % len(sources)], "chunk_index": i})
+    return store, vectors
+
+
+def test_search_matches_bruteforce_cosine():
+    store, vectors = make_store()
+    query = np.random.default_rng(1).random(DIM)
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+
+    results = store.search(query.tolist(), top_k=5)
+
+    assert [r["id"] for r in results] == list(np.argsort(expected)[::-1][:5])
+    assert results[0]["similarity"] == pytest.approx(expected.max(), rel=1e-5)
+
+
+def test_matrix_grows_and_keeps_rows():
+    store, vectors = make_store(n=37)
+    assert store.get_stats()["total_documents"] == 37
+    assert store.vectors.dtype == np.float32
+    assert store.vectors.shape == (37, DIM)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.testing.assert_allclose(store.vectors, normalized, rtol=1e-5)
+
+
+def test_dimension_mismatch_rejected():
+    store, _ = make_store(n=3)
+    with pytest.raises(ValueError):
+        store.add_document([0.1] * (DIM + 1), "bad", {})
+
+
+def test_empty_store_returns_no_results():
+    store = VectorStore()
+    assert store.search([0.1] * DIM) == []
+    assert store.get_stats()["vector_dimension"] == 0
+
+
+def test_filtered_search_returns_full_top_k():
+    store, vectors = make_store(n=60, sources=("a.pdf", "b.pdf", "c.pdf"))
+    query = np.random.default_rng(2).random(DIM)
+
+    results = store.search(query.tolist(), top_k=7, pdf_filter="b.pdf")
+
+    assert len(results) == 7
+    assert all(r["metadata"]["source_pdf"] == "b.pdf" for r in results)
+    rows = np.arange(1, 60, 3)
+    sims = vectors[rows] @ query / (np.linalg.norm(vectors[rows], axis=1) * np.linalg.norm(query))
+    assert [r["id"] for r in results] == list(rows[np.argsort(sims)[::-1][:7]])
+
+
+def test_filter_on_unknown_source_is_empty():
+    store, _ = make_store()
+    assert store.search([0.5] * DIM, pdf_filter="missing.pdf") == []
+
+
+def test_top_k_larger_than_corpus():
+    store, _ = make_store(n=4)
+    results = store.search([0.5] * DIM, top_k=10)
+    sims = [r["similarity"] for r in results]
+    assert len(results) == 4
+    assert sims == sorted(sims, reverse=True)
+
+
+def test_search_many_matches_single_queries():
+    store, _ = make_store(n=40)
+    queries = np.random.default_rng(3).random((5, DIM))
+
+    batch = store.search_many(queries, top_k=3, block_size=2)
+
+    assert len(batch) == 5
+    for query, results in zip(queries, batch):
+        assert [r["id"] for r in results] == [r["id"] for r in store.search(query.tolist(), top_k=3)]
+
+
+def test_ivf_index_trains_and_inserts_incrementally():
+    rng = np.random.default_rng(4)
+    centers = rng.normal(size=(8, DIM))
+    vectors = (centers[rng.integers(0, 8, 400)] + 0.05 * rng.normal(size=(400, DIM))).astype(np.float32)
+    store = VectorStore(index_type="ivf", n_lists=8, nprobe=2, ann_train_size=300)
+    store.add_documents(vectors[:300], [""] * 300, [{} for _ in range(300)])
+    assert store.ann_index.is_trained
+
+    store.add_documents(vectors[300:], [""] * 100, [{} for _ in range(100)])
+    assert sum(len(bucket) for bucket in store.ann_index._lists) == 400
+
+    # Searching for a stored vector finds itself, including late inserts
+    for row in (5, 350):
+        assert store.search(vectors[row].tolist(), top_k=1)[0]["id"] == row
+        assert store.search(vectors[row].tolist(), top_k=1, nprobe=8)[0]["id"] == row
+
+
+def test_ivf_with_all_lists_probed_is_exact():
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(200, DIM)).astype(np.float32)
+    exact = VectorStore()
+    ann = VectorStore(index_type="ivf", n_lists=4, ann_train_size=50)
+    for store in (exact, ann):
+        store.add_documents(vectors, [""] * 200, [{} for _ in range(200)])
+    query = rng.normal(size=DIM)
+    assert [r["id"] for r in ann.search(query, top_k=10, nprobe=4)] == \
+        [r["id"] for r in exact.search(query, top_k=10)]
+
+
+def test_int8_storage_ranks_close_to_float32():
+    rng = np.random.default_rng(6)
+    vectors = rng.normal(size=(300, DIM)).astype(np.float32)
+    exact = VectorStore()
+    quantized = VectorStore(storage="int8", initial_capacity=16)
+    for store in (exact, quantized):
+        store.add_documents(vectors, [""] * 300, [{"source_pdf": "a.pdf"} for _ in range(300)])
+    query = rng.normal(size=DIM)
+
+    expected = exact.search(query, top_k=5)
+    got = quantized.search(query, top_k=5)
+
+    assert expected[0]["id"] in {r["id"] for r in got}
+    assert got[0]["similarity"] == pytest.approx(expected[0]["similarity"], abs=0.02)
+    assert quantized.get_stats()["bytes_per_vector"] == DIM + 4
+    assert quantized._matrix is None
+
+
+def test_int8_rerank_returns_exact_similarities():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(300, DIM)).astype(np.float32)
+    exact = VectorStore()
+    quantized = VectorStore(storage="int8", rerank_factor=4)
+    for store in (exact, quantized):
+        store.add_documents(vectors, [""] * 300, [{} for _ in range(300)])
+    query = rng.normal(size=DIM)
+
+    expected = exact.search(query, top_k=5)
+    got = quantized.search(query, top_k=5)
+
+    assert [r["id"] for r in got] == [r["id"] for r in expected]
+    assert [r["similarity"] for r in got] == pytest.approx([r["similarity"] for r in expected])
+    assert quantized.get_stats()["bytes_per_vector"] == 5 * DIM + 4
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("options", [{}, {"storage": "int8", "rerank_factor": 2}])
+def test_save_and_load_roundtrip(tmp_path, mmap, options):
+    store = VectorStore(**options)
+    rng = np.random.default_rng(8)
+    vectors = rng.normal(size=(30, DIM)).astype(np.float32)
+    metas = [{"source_pdf": f"{i % 3}.pdf", "page": i} for i in range(30)]
+    store.add_documents(vectors, [f"chunk é {i}" for i in range(30)], metas)
+    path = str(tmp_path / "index")
+    store.save(path)
+
+    loaded = VectorStore.load(path, mmap=mmap)
+    query = rng.normal(size=DIM)
+
+    assert loaded.search(query, top_k=4, pdf_filter="1.pdf") == store.search(query, top_k=4, pdf_filter="1.pdf")
+    assert loaded.get_stats()["total_documents"] == 30
+    assert loaded.get_stats()["unique_sources"] == 3
+    assert loaded.documents[7] == "chunk é 7"
+
+    # Loaded stores stay writable, and can be saved over their own files
+    loaded.add_document(vectors[0], "new", {"source_pdf": "1.pdf"})
+    assert loaded.search(vectors[0], top_k=2, pdf_filter="1.pdf")[0]["text"] in ("new", "chunk é 0")
+    loaded.save(path)
+    assert VectorStore.load(path).get_stats()["total_documents"] == 31
+
+
+def test_save_and_load_keeps_ivf_index(tmp_path):
+    rng = np.random.default_rng(9)
+    vectors = rng.normal(size=(120, DIM)).astype(np.float32)
+    store = VectorStore(index_type="ivf", n_lists=4, nprobe=2, ann_train_size=100)
+    store.add_documents(vectors, [""] * 120, [{} for _ in range(120)])
+    store.save(str(tmp_path / "index"))
+
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    np.testing.assert_array_equal(loaded.ann_index.centroids, store.ann_index.centroids)
+    query = rng.normal(size=DIM)
+    assert loaded.search(query, top_k=5) == store.search(query, top_k=5)
+    loaded.add_document(vectors[3], "", {})
+    assert sum(len(bucket) for bucket in loaded.ann_index._lists) == 121
+
+
+def test_load_empty_snapshot(tmp_path):
+    VectorStore().save(str(tmp_path / "index"))
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    assert loaded.search([0.1] * DIM) == []
+    loaded.add_document([0.1] * DIM, "x", {})
+    assert loaded.search([0.1] * DIM)[0]["text"] == "x"
+
+
+@pytest.mark.parametrize("options", [{}, {"storage": "int8"}, {"storage": "int8", "rerank_factor": 2}])
+def test_store_emptied_by_deletes_roundtrips(tmp_path, options):
+    """Saved with every row deleted, the loaded arrays have no rows yet must grow"""
+    store = VectorStore(compact_threshold=None, **options)
+    store.add_documents(np.eye(3, DIM, dtype=np.float32), ["a", "b", "c"], [{"source_pdf": "a.pdf"}] * 3)
+    store.delete_source("a.pdf")
+    store.save(str(tmp_path / "index"))
+
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    assert loaded.search([0.1] * DIM) == []
+    loaded.add_document([0.1] * DIM, "x", {})
+    assert loaded.search([0.1] * DIM)[0]["text"] == "x"
+
+
+def test_stores_conform_to_backend_protocol(tmp_path):
+    assert isinstance(VectorStore(), VectorBackend)
+    assert isinstance(MmapVectorStore.open(str(tmp_path / "index")), VectorBackend)
+
+
+@pytest.mark.parametrize("options", [{}, {"storage": "int8", "rerank_factor": 2},
+                                     {"index_type": "ivf", "n_lists": 4, "nprobe": 4, "ann_train_size": 20}])
+def test_delete_tombstones_then_compact_keeps_ids(options):
+    rng = np.random.default_rng(10)
+    vectors = rng.normal(size=(40, DIM)).astype(np.float32)
+    store = VectorStore(compact_threshold=None, **options)
+    ids = store.add_batch(vectors, [f"chunk {i}" for i in range(40)],
+                          [{"source_pdf": f"{i % 2}.pdf"} for i in range(40)])
+
+    assert store.delete(ids[:10] + ["missing"]) == 10
+    assert store.delete(ids[:10]) == 0
+    assert store.get_stats()["deleted_documents"] == 10
+
+    for _ in range(2):  # Tombstoned, then compacted
+        assert store.stats()["documents"] == 30
+        hit = store.search_batch([vectors[25]], top_k=1)[0][0]
+        assert (hit["id"], hit["text"]) == (ids[25], "chunk 25")
+        everything = store.search_batch([vectors[3]], top_k=40)[0]
+        assert len(everything) == 30 and all(h["id"] not in ids[:10] for h in everything)
+        assert [r["text"] for r in store.search(vectors[11], top_k=1, pdf_filter="1.pdf")] == ["chunk 11"]
+        store.compact()
+
+    assert store.get_stats()["deleted_documents"] == 0
+    assert store.get_stats()["compactions"] == 1
+    if store.ann_index is not None:
+        assert sum(len(bucket) for bucket in store.ann_index._lists) == 30
+
+
+def test_add_batch_with_existing_ids_replaces_documents():
+    store = VectorStore()
+    store.add_batch(np.eye(DIM, dtype=np.float32)[:2], ["a", "b"], ids=["x", "y"])
+    store.add_batch(np.eye(DIM, dtype=np.float32)[2:3], ["c"], ids=["x"])
+
+    assert store.stats()["documents"] == 2
+    assert store.search_batch([np.eye(DIM)[2]], top_k=1)[0][0] == \
+        {"id": "x", "text": "c", "metadata": {}, "similarity": pytest.approx(1.0)}
+
+
+def test_search_batch_where_matches_all_keys():
+    store, _ = make_store(n=30, sources=("a.pdf", "b.pdf", "c.pdf"))
+    hits = store.search_batch(np.ones((2, DIM)), top_k=50, where={"source_pdf": "b.pdf", "chunk_index": 4})
+    assert [[h["text"] for h in q] for q in hits] == [["chunk 4"], ["chunk 4"]]
+    assert store.search_batch([np.ones(DIM)], where={"chunk_index": 99}) == [[]]
+
+
+def test_mmap_store_flushes_and_reopens(tmp_path):
+    path = str(tmp_path / "index")
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(20, DIM)).astype(np.float32)
+    store = MmapVectorStore.open(path)
+    ids = store.add_batch(vectors, [f"chunk {i}" for i in range(20)])
+    store.flush()
+    assert store.stats()["memory_bytes"] == 0 and store.stats()["mapped_bytes"] > 0
+
+    store.delete(ids[:5])
+    store.flush()
+    reopened = MmapVectorStore.open(path)
+    assert reopened.stats()["documents"] == 15
+    assert reopened.search_batch([vectors[7]], top_k=1)[0][0]["id"] == ids[7]
+    assert reopened.add_batch(vectors[:1], ["new"]) == ["20"]
+
+
+def test_mmap_flush_waits_for_compaction(tmp_path, monkeypatch):
+    rng = np.random.default_rng(12)
+    vectors = rng.normal(size=(10, DIM)).astype(np.float32)
+    store = MmapVectorStore.open(str(tmp_path / "index"), compact_threshold=None)
+    ids = store.add_batch(vectors, [f"t{i}" for i in range(10)])
+    store.flush()
+    store.delete(ids[:3])
+    copy_rows = store._copy_rows
+    flusher = threading.Thread(target=store.flush)
+
+    def copy_while_flushing(*args):
+        flusher.start()
+        flusher.join(timeout=0.2)
+        assert flusher.is_alive()  # Blocked until the swap is done
+        return copy_rows(*args)
+
+    monkeypatch.setattr(store, "_copy_rows", copy_while_flushing)
+    store.compact()
+    flusher.join()
+
+    new_ids = store.add_batch(vectors[:3], ["n0", "n1", "n2"])
+    store.delete(new_ids[:1])
+    found = {h["text"] for h in store.search_batch([vectors[0]], top_k=20)[0]}
+    assert found == {f"t{i}" for i in range(3, 10)} | {"n1", "n2"}
+
+
+def test_delete_source_and_background_compaction():
+    store, vectors = make_store(n=40, sources=("a.pdf", "b.pdf", "c.pdf", "d.pdf"))
+    store.compact_threshold = 0.4
+
+    assert store.delete_source("a.pdf") == 10
+    assert store.delete_source("a.pdf") == 0
+    assert store._compactor is None  # 25% deleted: below the threshold
+    assert store.search(vectors[0], top_k=40, pdf_filter="a.pdf") == []
+    assert "a.pdf" not in {r["metadata"]["source_pdf"] for r in store.search(vectors[0], top_k=40)}
+
+    store.delete_source("b.pdf")
+    store._compactor.join()
+    stats = store.get_stats()
+    assert (stats["total_documents"], stats["deleted_documents"], stats["unique_sources"]) == (20, 0, 2)
+    assert [r["text"] for r in store.search(vectors[2], top_k=1)] == ["chunk 2"]
+    assert store.search(vectors[2], top_k=40, pdf_filter="c.pdf")[0]["text"] == "chunk 2"
+
+
+def test_compaction_carries_over_concurrent_writes(monkeypatch):
+    store, vectors = make_store(n=20)
+    store.compact_threshold = None
+    ids = list(store.doc_ids)
+    store.delete(ids[:5])
+    copy_rows = store._copy_rows
+
+    def copy_while_writing(*args):
+        # Runs unlocked: simulate a writer landing mid-compaction
+        store.delete(ids[5:7])
+        store.add_batch(vectors[:2], ["late 0", "late 1"], [{"source_pdf": "a.pdf"}] * 2, ids=["x", "y"])
+        store.delete(["x"])
+        return copy_rows(*args)
+
+    monkeypatch.setattr(store, "_copy_rows", copy_while_writing)
+    store.compact()
+
+    assert store.get_stats()["total_documents"] == 14
+    assert store.get_stats()["deleted_documents"] == 3  # Deleted during the copy: tombstoned again
+    found = {h["id"] for h in store.search_batch([vectors[0]], top_k=50)[0]}
+    assert found == set(ids[7:]) | {"y"}
+    assert [h["text"] for h in store.search_batch([vectors[1]], top_k=1, where={"source_pdf": "a.pdf"})[0]] == ["late 1"]
+
+
+def test_replace_document_is_atomic_for_readers():
+    store, _ = make_store(n=20, sources=("a.pdf", "b.pdf"))
+    rng = np.random.default_rng(12)
+    stop = threading.Event()
+    seen = []
+
+    def reader():
+        while not stop.is_set():
+            texts = {r["text"].split()[0] for r in store.search(np.ones(DIM), top_k=100, pdf_filter="a.pdf")}
+            seen.append(texts)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for generation in range(30):
+            store.replace_document("a.pdf", rng.random((10, DIM)), [f"gen{generation} {i}" for i in range(10)],
+                                   [{"source_pdf": "a.pdf"} for _ in range(10)])
+    finally:
+        stop.set()
+        thread.join()
+
+    assert all(len(texts) == 1 for texts in seen)
+    assert {r["text"] for r in store.search(np.ones(DIM), top_k=100, pdf_filter="a.pdf")} == \
+        {f"gen29 {i}" for i in range(10)}
+    assert store.get_stats()["total_documents"] == 20
+
+
+def test_failed_replace_keeps_the_old_chunks():
+    store, _ = make_store(n=20, sources=("a.pdf", "b.pdf"))
+    rng = np.random.default_rng(13)
+    with pytest.raises(ValueError):
+        store.replace_document("a.pdf", rng.random((2, DIM + 1)), ["x", "y"], [{"source_pdf": "a.pdf"}] * 2)
+    with pytest.raises(ValueError):
+        store.replace_document("a.pdf", rng.random((2, DIM)), ["x"], [{"source_pdf": "a.pdf"}])
+
+    # A later, unrelated write must not publish a half-done replace
+    store.add_document(rng.random(DIM), "other", {"source_pdf": "c.pdf"})
+    assert store.has_source("a.pdf")
+    assert store.get_stats()["total_documents"] == 21
+    assert len(store.search(np.ones(DIM), top_k=100, pdf_filter="a.pdf")) == 10
+
+
+def test_save_leaves_out_deleted_rows(tmp_path):
+    store, vectors = make_store(n=30, sources=("a.pdf", "b.pdf", "c.pdf"))
+    store.compact_threshold = None
+    store.delete_source("b.pdf")
+    store.save(str(tmp_path / "index"))
+
+    loaded = VectorStore.load(str(tmp_path / "index"))
+    assert loaded.get_stats()["total_documents"] == 20
+    assert loaded.search(vectors[3], top_k=1)[0]["text"] == "chunk 3"
+    assert loaded.search(vectors[3], top_k=30, pdf_filter="b.pdf") == []
+    assert loaded.search(vectors[2], top_k=5, pdf_filter="c.pdf")[0]["text"] == "chunk 2"
+
+
+@pytest.mark.parametrize("use_symlinks", [True, False])
+def test_save_swaps_snapshot_versions_atomically(tmp_path, monkeypatch, use_symlinks):
+    monkeypatch.setattr(persistence, "USE_SYMLINKS", use_symlinks)  # False: the Windows pointer file
+    path = str(tmp_path / "index")
+    store, vectors = make_store(n=20)
+    store.save(str(tmp_path / "other"))
+    shutil.copytree(persistence.resolve_directory(str(tmp_path / "other")), path)  # Laid out before versioning
+
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                assert VectorStore.load(path, mmap=True).get_stats()["total_documents"] >= 20
+            except Exception as e:
+                errors.append(repr(e))
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(10):
+            store.add_document(vectors[i], f"more {i}", {"source_pdf": "c.pdf"})
+            store.save(path)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert errors == []
+    assert os.path.islink(path) if use_symlinks else os.path.isfile(os.path.join(path, "CURRENT"))
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("index.v")]) == 2
+    assert VectorStore.load(path).get_stats()["total_documents"] == 30
@@ -0,0 +1,130 @@
+import threading
+import time
+import numpy as np
+import pytest
+from services.vector_store import VectorStore
+
+DIM = 16
+SWAP_CHUNKS = 10
+
+
+def vector_of(key: int) -> np.ndarray:
+    return np.random.default_rng(key).normal(size=DIM).astype(np.float32)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> float:
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def swap_batch(generation: int):
+    keys = [1_000_000 + generation * SWAP_CHUNKS + i for i in range(SWAP_CHUNKS)]
+    return ([vector_of(k) for k in keys], [f"gen{generation} {i}" for i in range(SWAP_CHUNKS)],
+            [{"source_pdf": "swap.pdf", "key": k} for k in keys])
+
+
+@pytest.mark.parametrize("options", [{}, {"index_type": "ivf", "n_lists": 8, "nprobe": 8, "ann_train_size": 300}])
+def test_searches_stay_consistent_under_mixed_load(options):
+    """Ingest, deletes, replaces and compactions race readers that check every hit"""
+    store = VectorStore(initial_capacity=64, compact_threshold=0.1, **options)
+    store.replace_document("swap.pdf", *swap_batch(0))
+    stop = threading.Event()
+    errors = []
+    added = []
+    counts = {"searches": 0, "deleted": 0}
+
+    def guarded(work):
+        def run():
+            try:
+                work()
+            except Exception as e:  # Surface failures from worker threads
+                errors.append(repr(e))
+                stop.set()
+        return threading.Thread(target=run)
+
+    def ingest():
+        n = 0
+        while not stop.is_set() and n < 4000:
+            keys = range(n, n + 20)
+            store.add_batch([vector_of(k) for k in keys], [f"doc {k}" for k in keys],
+                            [{"source_pdf": f"s{k % 5}.pdf", "key": k} for k in keys],
+                            ids=[f"d{k}" for k in keys])
+            added.extend(keys)
+            n += 20
+
+    def delete():
+        rng = np.random.default_rng(1)
+        while not stop.is_set():
+            if len(added) > 50:
+                picks = rng.choice(len(added), 10, replace=False)
+                counts["deleted"] += store.delete([f"d{added[i]}" for i in picks])
+            time.sleep(0.001)
+
+    def replace():
+        generation = 0
+        while not stop.is_set():
+            generation += 1
+            store.replace_document("swap.pdf", *swap_batch(generation))
+            time.sleep(0.002)
+
+    def read(seed):
+        rng = np.random.default_rng(seed)
+        while not stop.is_set():
+            query = rng.normal(size=DIM).astype(np.float32)
+            hits = store.search_batch([query], top_k=20)[0]
+            similarities = [hit["similarity"] for hit in hits]
+            assert similarities == sorted(similarities, reverse=True)
+            assert len({hit["id"] for hit in hits}) == len(hits)
+            for hit in hits:
+                # Vector, text, metadata and id of a hit must all be the same document
+                key = hit["metadata"]["key"]
+                assert hit["similarity"] == pytest.approx(cosine(query, vector_of(key)), abs=1e-4)
+                if hit["metadata"]["source_pdf"] != "swap.pdf":
+                    assert (hit["id"], hit["text"]) == (f"d{key}", f"doc {key}")
+
+            swapped = store.search(query, top_k=100, pdf_filter="swap.pdf")
+            assert len(swapped) == SWAP_CHUNKS
+            assert len({hit["text"].split()[0] for hit in swapped}) == 1  # One generation only
+            counts["searches"] += 1
+
+    threads = [guarded(ingest), guarded(delete), guarded(replace)] + [guarded(lambda s=s: read(s)) for s in range(3)]
+    for thread in threads:
+        thread.start()
+    threads[0].join(timeout=30)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    if store._compactor is not None:
+        store._compactor.join()
+
+    assert errors == []
+    assert counts["searches"] > 0 and store.compactions > 0
+    stats = store.get_stats()
+    assert stats["total_documents"] == len(added) - counts["deleted"] + SWAP_CHUNKS
+
+
+def test_search_does_not_wait_for_writers():
+    store = VectorStore()
+    store.add_batch(np.eye(DIM, dtype=np.float32), [f"doc {i}" for i in range(DIM)])
+    results = []
+
+    with store._lock:  # A writer mid-update
+        reader = threading.Thread(target=lambda: results.append(store.search(np.eye(DIM)[3], top_k=1)))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+
+    assert results[0][0]["text"] == "doc 3"
+
+
+def test_snapshot_ignores_later_writes():
+    store = VectorStore(compact_threshold=None)
+    store.add_batch(np.eye(DIM, dtype=np.float32)[:4], ["a", "b", "c", "d"], ids=["a", "b", "c", "d"])
+    snapshot = store._snapshot
+
+    store.delete(["a"])
+    store.add_batch(np.eye(DIM, dtype=np.float32)[4:6], ["e", "f"])
+    store.compact()
+
+    old = store._search(snapshot, np.ones((1, DIM)), 10, None, None, 256, None)[0]
+    assert sorted(hit["text"] for hit in old) == ["a", "b", "c", "d"]
+    assert sorted(hit["text"] for hit in store.search(np.ones(DIM), top_k=10)) == ["b", "c", "d", "e", "f"]